@@ -0,0 +1,12 @@
+from django import forms
+
+from ideasbox.forms import OptimizeImagesMixin
+
+from .models import Content
+
+
+class ContentForm(OptimizeImagesMixin, forms.ModelForm):
+
+    class Meta:
+        model = Content
+        fields = '__all__'
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='content',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+            preserve_default=True,
+        ),
+    ]
@@ -1,10 +1,13 @@
 from django.contrib.admin.views.decorators import staff_member_required
 from django.views.generic import (ListView, DetailView, UpdateView, CreateView)
 
+from ideasbox.pagination import KeysetPaginationMixin
+
+from .forms import ContentForm
 from .models import Content
 
 
-class Index(ListView):
+class Index(KeysetPaginationMixin, ListView):
     model = Content
     queryset = Content.objects.published()
     template_name = 'blog/index.html'
@@ -26,9 +29,11 @@ content_detail = ContentDetail.as_view()
 
 class ContentUpdate(UpdateView):
     model = Content
+    form_class = ContentForm
 content_update = staff_member_required(ContentUpdate.as_view())
 
 
 class ContentCreate(CreateView):
     model = Content
+    form_class = ContentForm
 content_create = staff_member_required(ContentCreate.as_view())
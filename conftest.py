@@ -2,6 +2,7 @@ import pytest
 import django_webtest
 
 from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
 
 from ideasbox.tests.factories import UserFactory
 
@@ -44,3 +45,42 @@ def staffapp(app, staffuser):
     form.submit().follow()
     setattr(app, 'user', staffuser)  # for later use, if needed
     return app
+
+
+@pytest.fixture(autouse=True)
+def synchronous_jobs(settings, tmpdir):
+    """Run jobs at once, in the test thread and transaction."""
+    settings.JOBS_ASYNC = False
+    settings.JOBS_ROOT = str(tmpdir.join('jobs'))
+
+
+@pytest.yield_fixture(scope='session', autouse=True)
+def session_cache():
+    """Keep the cache entries written while the test database is created
+    out of STORAGE_ROOT."""
+    with override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(settings, tmpdir):
+    """Give each test its own empty cache."""
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': str(tmpdir),
+        }
+    }
+
+
+@pytest.fixture(autouse=True)
+def storage_roots(settings, tmpdir):
+    """Keep the caches and files written by the tests out of STORAGE_ROOT."""
+    settings.THUMBNAIL_ROOT = str(tmpdir.join('thumbnails'))
+    settings.LIBRARY_CACHE_ROOT = str(tmpdir.join('library'))
+    settings.LIBRARY_EDITIONS_PATH = str(tmpdir.join('editions.sqlite'))
+    settings.MEDIA_GC_QUARANTINE = str(tmpdir.join('quarantine'))
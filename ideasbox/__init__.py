@@ -1,3 +1,5 @@
 VERSION = (0, 0, 1)
 
 __version__ = ".".join(map(str, VERSION))
+
+default_app_config = 'ideasbox.apps.IdeasboxConfig'
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.core.signals import request_started
+
+
+class IdeasboxConfig(AppConfig):
+    name = 'ideasbox'
+    verbose_name = 'Ideasbox'
+
+    def ready(self):
+        from .jobs import start_worker
+        # Not started here: management commands and the tests would run
+        # the jobs too.
+        request_started.connect(start_worker)
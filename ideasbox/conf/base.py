@@ -144,6 +144,110 @@ DATABASES = {
     }
 }
 
+# Shared by all the processes serving the box.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(STORAGE_ROOT, 'cache', 'django'),
+    }
+}
+
+# Counts of the paginated lists are cached in the PAGINATION_CACHE cache for
+# at most PAGINATION_COUNT_TTL seconds; saving or deleting an object of
+# their model invalidates them (see ideasbox.pagination).
+PAGINATION_CACHE = 'default'
+PAGINATION_COUNT_TTL = 60 * 60
+
+# Thumbnails of the uploaded images (see ideasbox.thumbnails), by preset
+# name: (max width, max height). They are made on first request and kept in
+# THUMBNAIL_ROOT, within THUMBNAIL_MAX_SIZE bytes.
+THUMBNAIL_PRESETS = {
+    'small': (150, 150),
+    'medium': (300, 300),
+    'large': (800, 800),
+}
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_ROOT = os.path.join(STORAGE_ROOT, 'cache', 'thumbnails')
+THUMBNAIL_MAX_SIZE = 200 * 1024 * 1024
+
+# Uploaded images are turned upright, reduced to fit IMAGE_MAX_SIZE and
+# re-encoded (JPEG at IMAGE_QUALITY) by a job (see ideasbox.images). With
+# IMAGE_KEEP_ORIGINALS, a copy of the uploaded file is kept in "originals/"
+# in the media.
+IMAGE_MAX_SIZE = (2048, 2048)
+IMAGE_QUALITY = 85
+IMAGE_KEEP_ORIGINALS = False
+
+# Media files are served by ideasbox.media, with byte ranges and ETags. Set
+# MEDIA_SENDFILE to 'x-sendfile' (Apache mod_xsendfile) or
+# 'x-accel-redirect' (nginx, with an internal MEDIA_ACCEL_PREFIX location
+# aliased to MEDIA_ROOT) to let the web server send them.
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Staff can ingest into the mediacenter the files of directories under
+# INGEST_ROOTS (where USB drives are mounted), hashed by INGEST_WORKERS
+# processes (one by CPU when None).
+INGEST_ROOTS = ['/media', '/mnt']
+INGEST_WORKERS = None
+
+# Kinds of documents guessed from their content are cached in SNIFF_CACHE.
+SNIFF_CACHE = 'default'
+
+# Document originals can be uploaded by chunks (see mediacenter.uploads) of
+# at most UPLOAD_CHUNK_MAX_SIZE bytes; uploads left unfinished for
+# UPLOAD_TTL seconds are removed.
+UPLOAD_CHUNK_MAX_SIZE = 8 * 1024 * 1024
+UPLOAD_TTL = 60 * 60 * 24
+
+# Media files no object uses (see ideasbox.mediagc) are moved to
+# MEDIA_GC_QUARANTINE, out of the backups, by the cleanmedia command. Files
+# modified less than MEDIA_GC_MIN_AGE seconds ago, and the MEDIA_GC_IGNORE
+# directories of MEDIA_ROOT, are kept. Besides the FileField columns, the
+# MEDIA_GC_REFERENCES columns ("app_label.Model.field") hold media names.
+MEDIA_GC_QUARANTINE = os.path.join(STORAGE_ROOT, 'quarantine')
+MEDIA_GC_MIN_AGE = 60 * 60 * 24 * 2
+MEDIA_GC_IGNORE = ['originals']
+MEDIA_GC_REFERENCES = ['mediacenter.Upload.name']
+
+# Searches are logged by batches of SEARCH_LOG_BATCH_SIZE, or every
+# SEARCH_LOG_FLUSH_INTERVAL seconds; at most SEARCH_LOG_BUFFER_SIZE searches
+# are kept in memory meanwhile.
+SEARCH_LOG_BUFFER_SIZE = 1000
+SEARCH_LOG_BATCH_SIZE = 50
+SEARCH_LOG_FLUSH_INTERVAL = 60
+
+# OpenLibrary notices and book covers are cached in LIBRARY_CACHE_ROOT for
+# LIBRARY_CACHE_TTL seconds, within LIBRARY_CACHE_MAX_SIZE bytes. ISBNs
+# OpenLibrary has no notice for are asked again after
+# LIBRARY_CACHE_MISSING_TTL seconds.
+LIBRARY_CACHE_ROOT = os.path.join(STORAGE_ROOT, 'cache', 'library')
+LIBRARY_CACHE_TTL = 60 * 60 * 24 * 365
+LIBRARY_CACHE_MISSING_TTL = 60 * 60 * 24 * 7
+LIBRARY_CACHE_MAX_SIZE = 500 * 1024 * 1024
+# ISBNs are resolved from this OpenLibrary editions store before asking
+# OpenLibrary; build it with the loadeditions command.
+LIBRARY_EDITIONS_PATH = os.path.join(STORAGE_ROOT, 'editions.sqlite')
+
+# Outbound HTTP requests (see ideasbox.http_client): timeouts in seconds,
+# retries of failed requests, waiting HTTP_BACKOFF seconds then twice longer
+# each time, and the circuit breaker of a host opens for
+# HTTP_BREAKER_COOLDOWN seconds after HTTP_BREAKER_THRESHOLD failures.
+HTTP_CONNECT_TIMEOUT = 5
+HTTP_READ_TIMEOUT = 15
+HTTP_RETRIES = 2
+HTTP_BACKOFF = 0.5
+HTTP_BREAKER_THRESHOLD = 5
+HTTP_BREAKER_COOLDOWN = 60
+
+# Long operations run as background jobs (see ideasbox.jobs), by a worker
+# thread that also looks for new jobs every JOBS_POLL_INTERVAL seconds. With
+# JOBS_ASYNC = False, jobs run at once, in the request. Files given to jobs
+# are kept in JOBS_ROOT.
+JOBS_ASYNC = True
+JOBS_POLL_INTERVAL = 30
+JOBS_ROOT = os.path.join(STORAGE_ROOT, 'jobs')
+
 SERVICES = [
     {'name': 'apache2', 'description': _('Daemon which provides web content')},
     {'name': 'bind9', 'description': _('Daemon which provides local DNS')},
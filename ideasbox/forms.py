@@ -0,0 +1,28 @@
+from .images import is_image
+from .jobs import enqueue
+
+
+class OptimizeImagesMixin(object):
+    """ModelForm mixin optimizing, in a job, the images uploaded through its
+    file fields."""
+
+    def save(self, commit=True):
+        instance = super(OptimizeImagesMixin, self).save(commit)
+        if commit:
+            self.optimize_images(instance)
+        return instance
+
+    def optimize_images(self, instance):
+        for name in self.uploaded_fields():
+            file_ = getattr(instance, name, None)
+            if file_ and is_image(file_.name):
+                self.optimize_image(instance, name)
+
+    def optimize_image(self, instance, name):
+        """Enqueue the optimization of the image of the `name` field."""
+        enqueue('ideasbox.optimize_image',
+                image=getattr(instance, name).name)
+
+    def uploaded_fields(self):
+        """Return the names of the fields given a new file."""
+        return [name for name in self.changed_data if name in self.files]
@@ -0,0 +1,253 @@
+"""Shared client for outbound HTTP requests.
+
+Boxes are often offline, or behind a slow uplink: every request has connect
+and read timeouts, failed requests are retried with backoff, and a circuit
+breaker per host fails fast for a cool-down period after repeated failures,
+so a dead uplink costs milliseconds. Connections are kept alive and reused,
+by thread.
+"""
+import httplib
+import logging
+import socket
+import threading
+import time
+import urlparse
+from collections import Counter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+MAX_REDIRECTS = 5
+REDIRECTS = (301, 302, 303, 307, 308)
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+
+class HTTPClientError(Exception):
+    pass
+
+
+class CircuitOpenError(HTTPClientError):
+    pass
+
+
+class Response(object):
+
+    def __init__(self, url, status, headers, content=None):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.content = content
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+
+class Breaker(object):
+    """Circuit breaker of one host: opens after `threshold` consecutive
+    failures, and lets one request try again after `cooldown` seconds."""
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trying = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return CLOSED
+        if time.time() - self.opened_at < self.cooldown:
+            return OPEN
+        return HALF_OPEN
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self.trying:
+                self.trying = True
+                return True
+            return False
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trying = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trying or self.failures >= self.threshold:
+                self.opened_at = time.time()
+            self.trying = False
+
+
+class HTTPClient(object):
+    """Thread safe HTTP client. Server errors (5xx) and network errors are
+    retried, then count as failures for the circuit breaker of the host."""
+
+    def __init__(self, connect_timeout=5, read_timeout=15, retries=2,
+                 backoff=0.5, threshold=5, cooldown=60):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.breakers = {}
+        self.counters = {}
+
+    @classmethod
+    def from_settings(cls):
+        return cls(connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+                   read_timeout=settings.HTTP_READ_TIMEOUT,
+                   retries=settings.HTTP_RETRIES,
+                   backoff=settings.HTTP_BACKOFF,
+                   threshold=settings.HTTP_BREAKER_THRESHOLD,
+                   cooldown=settings.HTTP_BREAKER_COOLDOWN)
+
+    def _host(self, host):
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = Breaker(self.threshold, self.cooldown)
+                self.counters[host] = Counter()
+            return self.breakers[host], self.counters[host]
+
+    def count(self, counter, **values):
+        with self.lock:
+            counter.update(values)
+
+    def metrics(self):
+        """Return the counters and the breaker state of each host."""
+        with self.lock:
+            hosts = sorted(self.breakers.items())
+        metrics = []
+        for host, breaker in hosts:
+            counter = self.counters[host]
+            metrics.append(dict(counter, host=host, state=breaker.state,
+                                average=(counter['duration'] /
+                                         (counter['requests'] or 1))))
+        return metrics
+
+    def reset(self):
+        """Forget metrics and breakers states, and close the connections of
+        the current thread."""
+        with self.lock:
+            self.breakers = {}
+            self.counters = {}
+        for connection in getattr(self.local, 'connections', {}).values():
+            connection.close()
+        self.local.connections = {}
+
+    def connection(self, scheme, netloc):
+        connections = self.local.__dict__.setdefault('connections', {})
+        key = (scheme, netloc)
+        if key not in connections:
+            class_ = (httplib.HTTPSConnection if scheme == 'https'
+                      else httplib.HTTPConnection)
+            connections[key] = class_(netloc, timeout=self.connect_timeout)
+        connection = connections[key]
+        if connection.sock is None:
+            connection.timeout = self.connect_timeout
+            connection.connect()
+            connection.sock.settimeout(self.read_timeout)
+        return connection
+
+    def drop(self, scheme, netloc):
+        connection = self.local.connections.pop((scheme, netloc), None)
+        if connection:
+            connection.close()
+
+    def get(self, url, stream_to=None):
+        """GET `url` and return a Response, following redirects. The body is
+        written to the `stream_to` file if given, else kept in
+        `response.content`. Raise HTTPClientError when the request fails,
+        or when the circuit of the host is open."""
+        for i in range(MAX_REDIRECTS + 1):
+            response = self._get(url, stream_to)
+            location = response.headers.get('location')
+            if response.status not in REDIRECTS or not location:
+                return response
+            url = urlparse.urljoin(url, location)
+        raise HTTPClientError('Too many redirects: {0}'.format(url))
+
+    def _get(self, url, stream_to):
+        parts = urlparse.urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise HTTPClientError('Unsupported URL: {0}'.format(url))
+        breaker, counter = self._host(parts.netloc)
+        if not breaker.allow():
+            self.count(counter, rejected=1)
+            raise CircuitOpenError('{0} is unreachable'.format(parts.netloc))
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        start = time.time()
+        self.count(counter, requests=1)
+        succeeded = False
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    self.count(counter, retries=1)
+                    time.sleep(self.backoff * 2 ** (attempt - 1))
+                if stream_to is not None:
+                    stream_to.seek(0)
+                    stream_to.truncate()
+                try:
+                    response = self._request(parts.scheme, parts.netloc,
+                                             path, stream_to)
+                except (socket.error, httplib.HTTPException) as e:
+                    self.drop(parts.scheme, parts.netloc)
+                    error = e
+                    continue
+                if response.status < 500:
+                    break
+                error = 'HTTP {0}'.format(response.status)
+            else:
+                logger.warning('GET %s failed: %s', url, error)
+                raise HTTPClientError('GET {0} failed: {1}'.format(url, error))
+            succeeded = True
+        finally:
+            # Whatever the error, so a half-open breaker is never stuck.
+            duration = (time.time() - start) * 1000
+            if succeeded:
+                self.count(counter, duration=duration, bytes=response.size)
+                breaker.success()
+            else:
+                self.count(counter, failures=1, duration=duration)
+                breaker.failure()
+        return response
+
+    def _request(self, scheme, netloc, path, stream_to):
+        connection = self.connection(scheme, netloc)
+        connection.request('GET', path, headers={'User-Agent': 'ideasbox'})
+        raw = connection.getresponse()
+        size = 0
+        content = [] if stream_to is None else None
+        while True:
+            chunk = raw.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            # Keep error pages out of the file.
+            if content is not None:
+                content.append(chunk)
+            elif 200 <= raw.status < 300:
+                stream_to.write(chunk)
+        response = Response(scheme + '://' + netloc + path, raw.status,
+                            dict(raw.getheaders()),
+                            ''.join(content) if content is not None else None)
+        response.size = size
+        return response
+
+
+client = HTTPClient.from_settings()
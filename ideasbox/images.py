@@ -0,0 +1,100 @@
+"""Optimization of the uploaded images.
+
+Phone photos come big, often rotated by an EXIF tag only, and as baseline
+JPEGs. Once uploaded, an image is turned upright, reduced to fit
+IMAGE_MAX_SIZE, and re-encoded (progressive JPEG at IMAGE_QUALITY, or
+optimized PNG), in place, by an `ideasbox.optimize_image` job.
+"""
+import os
+import stat
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image
+
+EXTENSIONS = ('.jpg', '.jpeg', '.png')
+ORIENTATION = 274  # EXIF tag.
+TRANSPOSES = {
+    2: [Image.FLIP_LEFT_RIGHT],
+    3: [Image.ROTATE_180],
+    4: [Image.FLIP_TOP_BOTTOM],
+    5: [Image.FLIP_LEFT_RIGHT, Image.ROTATE_90],
+    6: [Image.ROTATE_270],
+    7: [Image.FLIP_LEFT_RIGHT, Image.ROTATE_270],
+    8: [Image.ROTATE_90],
+}
+
+
+def is_image(name):
+    return name.lower().endswith(EXTENSIONS)
+
+
+def orientation(image):
+    try:
+        exif = image._getexif() or {}
+    except (AttributeError, IndexError, KeyError, SyntaxError, IOError):
+        # No EXIF (PNG), or broken EXIF.
+        return 1
+    return exif.get(ORIENTATION, 1)
+
+
+def upright(image):
+    """Return `image` turned as its EXIF orientation tells."""
+    for method in TRANSPOSES.get(orientation(image), []):
+        image = image.transpose(method)
+    return image
+
+
+def optimize_image(path, max_size=None, quality=None):
+    """Rewrite the JPEG or PNG image at `path`, upright, fitting `max_size`
+    and re-encoded. The file is kept as is if this would not make it
+    smaller nor change it. Return its size in bytes, before and after."""
+    max_size = max_size or settings.IMAGE_MAX_SIZE
+    quality = quality or settings.IMAGE_QUALITY
+    before = os.path.getsize(path)
+    try:
+        image = Image.open(path)
+    except IOError:
+        # Not an image, whatever its name says.
+        return before, before
+    format_ = image.format
+    if format_ not in ('JPEG', 'PNG'):
+        return before, before
+    info = image.info
+    size = sorted(image.size)
+    turned = orientation(image) in TRANSPOSES
+    image = upright(image)
+    # Decodes JPEGs at a reduced scale when much bigger than max_size.
+    image.thumbnail(max_size, Image.ANTIALIAS)
+    resized = sorted(image.size) != size
+    if format_ == 'JPEG':
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        options = {'quality': quality, 'progressive': True, 'optimize': True}
+    else:
+        options = {'optimize': True}
+    if info.get('icc_profile'):
+        options['icc_profile'] = info['icc_profile']
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, format_, **options)
+        after = os.path.getsize(tmp)
+        if after < before or turned or resized:
+            # mkstemp makes it readable by its owner only: keep the mode the
+            # upload got from FILE_UPLOAD_PERMISSIONS or the umask.
+            os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+            os.rename(tmp, path)
+            return before, after
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return before, before
+
+
+def keep_original(name):
+    """Copy the `name` file of the default storage under "originals/", and
+    return the name of the copy."""
+    with default_storage.open(name) as f:
+        return default_storage.save(os.path.join('originals', name), f)
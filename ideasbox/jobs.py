@@ -0,0 +1,196 @@
+"""Long operations (imports, backups, reindex...) run out of the HTTP request.
+
+Handlers are registered by name with the `register` decorator, in a `jobs`
+module of any app. `enqueue` saves a Job row and wakes up the worker thread,
+which runs the pending jobs one after the other. A handler receives the job
+and its params as keyword arguments; it can report its progress and the
+errors it went through with `job.report`, and returns a JSON serializable
+result. Pending jobs can also be run by a separate process, with the runjobs
+command.
+
+The worker thread is started by the first request the process serves, so
+the jobs left pending by a restart are run without waiting for a new one.
+Running jobs whose process died are failed, and their files removed.
+"""
+import errno
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from . import images
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def register(name):
+    """Register the decorated function as the handler of `name` jobs."""
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def get_handler(name):
+    if name not in registry:
+        autodiscover_modules('jobs')
+    return registry[name]
+
+
+def store_file(file_):
+    """Save an uploaded file in JOBS_ROOT, for a job to use it, and return
+    its path."""
+    storage = FileSystemStorage(location=settings.JOBS_ROOT)
+    return storage.path(storage.save(os.path.basename(file_.name), file_))
+
+
+def enqueue(name, user=None, **params):
+    """Create a job calling the `name` handler with `params`, and return it.
+    It is run at once if JOBS_ASYNC is False."""
+    get_handler(name)  # Fail early on unknown jobs.
+    job = Job.objects.create(name=name, user=user, params=json.dumps(params))
+    if settings.JOBS_ASYNC:
+        worker.wake()
+    else:
+        run(job)
+        job = Job.objects.get(pk=job.pk)
+    return job
+
+
+def run(job):
+    """Run `job`, unless another worker already took it."""
+    taken = Job.objects.filter(pk=job.pk, status=Job.PENDING).update(
+        status=Job.RUNNING, started_at=timezone.now(), pid=os.getpid())
+    if not taken:
+        return
+    try:
+        result = get_handler(job.name)(job, **job.get_params())
+    except Exception as e:
+        logger.exception('Job %s failed', job)
+        job.report(errors=[u'{0}: {1}'.format(e.__class__.__name__, e)])
+        status, result = Job.FAILED, None
+    else:
+        status = Job.DONE
+    Job.objects.filter(pk=job.pk).update(status=status,
+                                         result=json.dumps(result or {}),
+                                         finished_at=timezone.now())
+
+
+def run_pending():
+    """Run the pending jobs, oldest first, and return how many were run."""
+    count = 0
+    while True:
+        job = Job.objects.filter(status=Job.PENDING).order_by('pk').first()
+        if not job:
+            return count
+        run(job)
+        count += 1
+
+
+def is_alive(pid):
+    """Return whether the process `pid` is running."""
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        return e.errno == errno.EPERM
+    return True
+
+
+def remove_files(job):
+    """Remove the files of JOBS_ROOT given to `job`."""
+    root = os.path.join(os.path.abspath(settings.JOBS_ROOT), '')
+    for value in job.get_params().values():
+        if (isinstance(value, basestring)
+                and os.path.abspath(value).startswith(root)
+                and os.path.isfile(value)):
+            os.remove(value)
+
+
+def recover():
+    """Fail the running jobs whose process is gone (killed, or restarted),
+    remove their files, and return how many were failed."""
+    count = 0
+    for job in Job.objects.filter(status=Job.RUNNING):
+        if job.pid and is_alive(job.pid):
+            continue
+        failed = Job.objects.filter(pk=job.pk, status=Job.RUNNING,
+                                    pid=job.pid).update(
+            status=Job.FAILED, finished_at=timezone.now())
+        if not failed:
+            continue
+        logger.warning('Job %s interrupted', job)
+        job.report(errors=[u'Interrupted: its process stopped.'])
+        remove_files(job)
+        count += 1
+    return count
+
+
+class Worker(object):
+    """Thread running the pending jobs when woken up, and every
+    JOBS_POLL_INTERVAL seconds (for jobs created by other processes)."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start the thread, unless it is running, for a first pass at
+        once."""
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self.loop,
+                                           name='jobs-worker')
+            self.thread.daemon = True
+            self.thread.start()
+        self.event.set()
+
+    def wake(self):
+        self.start()
+        self.event.set()
+
+    def loop(self):
+        while True:
+            self.event.wait(settings.JOBS_POLL_INTERVAL)
+            self.event.clear()
+            try:
+                recover()
+            except Exception:
+                logger.exception('Jobs recovery error')
+            try:
+                run_pending()
+            except Exception:
+                logger.exception('Jobs worker error')
+            finally:
+                # Don't keep a connection opened by this thread while idle.
+                connection.close()
+
+
+worker = Worker()
+
+
+def start_worker(sender, **kwargs):
+    """Start the worker with the first request, if JOBS_ASYNC."""
+    if settings.JOBS_ASYNC:
+        worker.start()
+
+
+@register('ideasbox.optimize_image')
+def optimize_image(job, image):
+    """Optimize the `image` file of the default storage."""
+    if settings.IMAGE_KEEP_ORIGINALS:
+        images.keep_original(image)
+    before, after = images.optimize_image(default_storage.path(image))
+    return {'message': u'{0}: {1} bytes saved ({2} to {3}).'.format(
+        image, before - after, before, after),
+        'before': before, 'after': after}
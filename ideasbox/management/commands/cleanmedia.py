@@ -0,0 +1,42 @@
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ideasbox.mediagc import BATCH_SIZE, collect
+
+
+class Command(BaseCommand):
+    help = ('Move the media files no object uses anymore to '
+            'MEDIA_GC_QUARANTINE, or delete them.')
+    option_list = BaseCommand.option_list + (
+        make_option('--dry-run', action='store_true', default=False,
+                    help='Only list the orphan files and their size.'),
+        make_option('--delete', action='store_true', default=False,
+                    help='Delete the orphan files instead of moving them.'),
+        make_option('--min-age', type='int', default=None,
+                    help='Keep the files modified less than this many '
+                         'seconds ago (MEDIA_GC_MIN_AGE by default).'),
+        make_option('--batch', type='int', default=BATCH_SIZE,
+                    help='Number of files checked at once.'),
+    )
+
+    def handle(self, *args, **options):
+        verbose = options['dry_run'] or int(options['verbosity']) > 1
+
+        def log(name, size):
+            if verbose:
+                self.stdout.write(u'{0} ({1} bytes)'.format(name, size))
+
+        count, size = collect(min_age=options['min_age'],
+                              delete=options['delete'],
+                              dry_run=options['dry_run'],
+                              batch_size=options['batch'], log=log)
+        if options['dry_run']:
+            action = 'would be reclaimed'
+        elif options['delete']:
+            action = 'deleted'
+        else:
+            action = 'moved to {0}'.format(settings.MEDIA_GC_QUARANTINE)
+        self.stdout.write('{0} orphan files, {1:.1f} MB {2}.'.format(
+            count, size / 1024.0 / 1024, action))
@@ -0,0 +1,27 @@
+import time
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ideasbox import jobs
+
+
+class Command(BaseCommand):
+    help = ('Run the pending background jobs, eg. from a process separated '
+            'from the web server.')
+    option_list = BaseCommand.option_list + (
+        make_option('--loop', action='store_true', default=False,
+                    help='Keep looking for new jobs every '
+                         'JOBS_POLL_INTERVAL seconds.'),
+    )
+
+    def handle(self, *args, **options):
+        while True:
+            jobs.recover()
+            count = jobs.run_pending()
+            if count:
+                self.stdout.write('Ran {0} jobs.'.format(count))
+            if not options['loop']:
+                break
+            time.sleep(settings.JOBS_POLL_INTERVAL)
@@ -0,0 +1,144 @@
+"""Serving of the media files, with what audio and video players need: byte
+ranges (to seek), and ETag and Last-Modified validators (to not download
+twice).
+
+With MEDIA_SENDFILE, the response only names the file, and the web server
+sends it (ranges and validators included): "x-sendfile" for Apache with
+mod_xsendfile, "x-accel-redirect" for nginx, where MEDIA_ACCEL_PREFIX is an
+internal location aliased to MEDIA_ROOT.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (HttpResponse, HttpResponseNotModified,
+                         StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.static import was_modified_since
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+SENDFILE_HEADERS = {
+    'x-sendfile': 'X-Sendfile',
+    'x-accel-redirect': 'X-Accel-Redirect',
+}
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def make_etag(stat):
+    return '"{0:x}-{1:x}"'.format(int(stat.st_mtime), stat.st_size)
+
+
+def parse_range(header, size):
+    """Return the (first, last) bytes asked for by a Range `header`, or None
+    to send the whole file (no header, or several ranges). Raise
+    RangeNotSatisfiable if the range is out of the file."""
+    match = RANGE_RE.match((header or '').strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last bytes.
+        length = int(last)
+        if not length or not size:
+            raise RangeNotSatisfiable()
+        return max(0, size - length), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first > last:
+        raise RangeNotSatisfiable()
+    return first, last
+
+
+def read_range(path, first, length):
+    with open(path, 'rb') as f:
+        f.seek(first)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def not_modified(request, etag, mtime, size):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        tags = [t.strip() for t in if_none_match.split(',')]
+        return etag in tags or '*' in tags
+    return not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                                  mtime, size)
+
+
+def range_applies(request, etag, mtime):
+    """Tell whether the Range of `request` is for this version of the
+    file."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    date = parse_http_date_safe(if_range)
+    return date is not None and int(mtime) <= date
+
+
+def serve_file(request, root, name, sendfile=None):
+    """Return a response sending the `name` file of the `root` directory.
+    Raise OSError if there is no such file, SuspiciousFileOperation if
+    `name` goes out of `root`."""
+    try:
+        path = safe_join(root, name)
+    except ValueError:
+        raise SuspiciousFileOperation(
+            'Attempted access to {0!r} denied.'.format(name))
+    stat = os.stat(path)
+    if not os.path.isfile(path):
+        raise OSError('Not a file: {0}'.format(name))
+    etag = make_etag(stat)
+    if not_modified(request, etag, stat.st_mtime, stat.st_size):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    content_type, encoding = mimetypes.guess_type(path)
+    content_type = content_type or 'application/octet-stream'
+    if sendfile:
+        response = HttpResponse(content_type=content_type)
+        if sendfile == 'x-accel-redirect':
+            value = settings.MEDIA_ACCEL_PREFIX + name.lstrip('/')
+        else:
+            value = path
+        response[SENDFILE_HEADERS[sendfile]] = value.encode('utf-8')
+    else:
+        size = stat.st_size
+        first, last = 0, size - 1
+        status = 200
+        try:
+            if range_applies(request, etag, stat.st_mtime):
+                asked = parse_range(request.META.get('HTTP_RANGE'), size)
+                if asked:
+                    first, last = asked
+                    status = 206
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */{0}'.format(size)
+            return response
+        length = last - first + 1
+        response = StreamingHttpResponse(read_range(path, first, length),
+                                         content_type=content_type,
+                                         status=status)
+        response['Content-Length'] = length
+        if status == 206:
+            response['Content-Range'] = 'bytes {0}-{1}/{2}'.format(
+                first, last, size)
+        response['Accept-Ranges'] = 'bytes'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
@@ -0,0 +1,151 @@
+"""Garbage collection of the media files no object uses anymore.
+
+Deleting an object, or replacing one of its files, leaves the old file in
+MEDIA_ROOT, where every backup then copies it. The names used by the
+FileField and ImageField columns of all the models, and by the
+MEDIA_GC_REFERENCES columns, are loaded in a set, one column at a time
+through an iterator; MEDIA_ROOT is then walked in sorted order, and its
+files are checked against that set by batches, so the files found are never
+all in memory. The orphans are moved to MEDIA_GC_QUARANTINE, or deleted.
+
+Files modified less than MEDIA_GC_MIN_AGE seconds ago are kept: they may
+belong to an object not committed yet, or to an upload in progress. So are
+the MEDIA_GC_IGNORE directories and the caches that live under MEDIA_ROOT.
+"""
+import os
+import shutil
+import stat
+import sys
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import FileField
+
+BATCH_SIZE = 1000
+
+
+def columns():
+    """Yield the (model, field name) of the columns holding media names."""
+    for model in apps.get_models():
+        for field in model._meta.local_fields:
+            if isinstance(field, FileField):
+                yield model, field.name
+    for column in settings.MEDIA_GC_REFERENCES:
+        label, name = column.rsplit('.', 1)
+        yield apps.get_model(label), name
+
+
+def referenced_names():
+    """Return the set of the media names used in the database."""
+    names = set()
+    for model, name in columns():
+        values = (model._default_manager.exclude(**{name: ''})
+                                        .values_list(name, flat=True))
+        names.update(values.iterator())
+    return names
+
+
+def encode_path(path):
+    """Return `path` as a byte string of the file system encoding."""
+    if isinstance(path, unicode):
+        return path.encode(sys.getfilesystemencoding() or 'utf-8')
+    return path
+
+
+def decode_name(name):
+    """Return the file name `name` as unicode, as the database has it, or
+    None if it can't be decoded."""
+    for encoding in (sys.getfilesystemencoding(), 'utf-8'):
+        try:
+            return name.decode(encoding or 'utf-8').replace(os.sep, '/')
+        except UnicodeDecodeError:
+            pass
+    return None
+
+
+def ignored_paths(root):
+    """Return the absolute paths under `root` never collected."""
+    paths = [os.path.join(root, name) for name in settings.MEDIA_GC_IGNORE]
+    paths += [settings.THUMBNAIL_ROOT, settings.LIBRARY_CACHE_ROOT,
+              settings.MEDIA_GC_QUARANTINE, settings.JOBS_ROOT]
+    return set(encode_path(os.path.abspath(path)) for path in paths)
+
+
+def scan(root):
+    """Yield the (name relative to `root`, size, mtime) of the files under
+    `root`, sorted. Names are byte strings, as the file system has them."""
+    ignored = ignored_paths(root)
+    for directory, dirs, names in os.walk(root):
+        dirs[:] = sorted(d for d in dirs
+                         if os.path.join(directory, d) not in ignored)
+        for name in sorted(names):
+            path = os.path.join(directory, name)
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                yield os.path.relpath(path, root), st.st_size, st.st_mtime
+
+
+def batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def find_orphans(root=None, min_age=None, batch_size=BATCH_SIZE):
+    """Yield batches of the (name, size) of the files of `root` (MEDIA_ROOT
+    by default) used by no object, and older than `min_age` seconds. Names
+    are byte strings; a name that can't be decoded is never collected."""
+    root = encode_path(os.path.abspath(root or settings.MEDIA_ROOT))
+    if min_age is None:
+        min_age = settings.MEDIA_GC_MIN_AGE
+    limit = time.time() - min_age
+    referenced = referenced_names()
+    for batch in batches(scan(root), batch_size):
+        orphans = []
+        for name, size, mtime in batch:
+            text = decode_name(name)
+            if mtime < limit and text is not None and text not in referenced:
+                orphans.append((name, size))
+        if orphans:
+            yield orphans
+
+
+def collect(root=None, min_age=None, delete=False, dry_run=False,
+            batch_size=BATCH_SIZE, log=None):
+    """Move the orphan files of `root` to MEDIA_GC_QUARANTINE, or delete
+    them, unless `dry_run`. `log(name, size)` is called for each of them.
+    Return the number of orphans and their total size."""
+    root = encode_path(os.path.abspath(root or settings.MEDIA_ROOT))
+    quarantine = os.path.join(encode_path(settings.MEDIA_GC_QUARANTINE),
+                              time.strftime('%Y%m%d-%H%M%S'))
+    count = total = 0
+    for orphans in find_orphans(root, min_age, batch_size):
+        for name, size in orphans:
+            path = os.path.join(root, name)
+            try:
+                if dry_run:
+                    pass
+                elif delete:
+                    os.remove(path)
+                else:
+                    target = os.path.join(quarantine, name)
+                    if not os.path.isdir(os.path.dirname(target)):
+                        os.makedirs(os.path.dirname(target))
+                    shutil.move(path, target)
+            except (IOError, OSError):
+                # Gone meanwhile, or not ours to remove.
+                continue
+            count += 1
+            total += size
+            if log:
+                log(decode_name(name), size)
+    return count, total
@@ -1,3 +1,6 @@
+import json
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.core.urlresolvers import reverse
 from django.db import models
@@ -10,7 +13,7 @@ class TimeStampedModel(models.Model):
     updating ``created_at`` and ``modified_at`` fields.
     """
     created_at = models.DateTimeField(auto_now_add=True)
-    modified_at = models.DateTimeField(auto_now=True)
+    modified_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         abstract = True
@@ -259,3 +262,76 @@ class BurundiMakambaUser(AbstractUser, ProfileMixin, SwahiliLangMixin,
     User for Makamba Box, run by the PNUD, and not in a refugees camp.
     """
     pass
+
+
+class Job(models.Model):
+    """A long operation, run out of the HTTP request (see ideasbox.jobs)."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, _('pending')),
+        (RUNNING, _('running')),
+        (DONE, _('done')),
+        (FAILED, _('failed')),
+    )
+
+    name = models.CharField(max_length=100)
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=PENDING, db_index=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True,
+                             on_delete=models.SET_NULL)
+    # Keyword arguments of the handler, and what it returned, as JSON.
+    params = models.TextField(default='{}')
+    result = models.TextField(default='{}')
+    done = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    # What went wrong, one message by line.
+    errors = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Process running the job, to fail the job if that process dies.
+    pid = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __unicode__(self):
+        return u'{0} #{1}'.format(self.name, self.pk)
+
+    def get_absolute_url(self):
+        return reverse('job_detail', kwargs={'pk': self.pk})
+
+    def get_params(self):
+        return json.loads(self.params)
+
+    def get_result(self):
+        return json.loads(self.result)
+
+    def get_errors(self):
+        return self.errors.splitlines()
+
+    @property
+    def finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    @property
+    def percent(self):
+        if self.status == self.DONE:
+            return 100
+        if not self.total:
+            return None
+        return min(100, self.done * 100 // self.total)
+
+    def report(self, done=None, total=None, errors=None):
+        """Save the progress of the job, and append `errors` messages."""
+        if done is not None:
+            self.done = done
+        if total is not None:
+            self.total = total
+        if errors:
+            self.errors += u''.join(u'{0}\n'.format(e) for e in errors)
+        Job.objects.filter(pk=self.pk).update(done=self.done, total=self.total,
+                                              errors=self.errors)
@@ -0,0 +1,311 @@
+"""Keyset pagination for the list views.
+
+Instead of OFFSET and a COUNT(*) on every page, the next and previous links
+carry a cursor: the ordering values of the last (or first) object of the
+page, the pk breaking ties. Fetching a page is then an index range scan,
+whatever its depth. A bare `?page=N` (old links, bookmarks) still works,
+with an OFFSET.
+
+The total number of pages comes from a cached count, kept until an object
+of one of the models of the query is saved or deleted: each model has a
+version, bumped by signals (or by `touch`, after bulk changes that send no
+signals), which is part of the cache key of the counts.
+"""
+import base64
+import hashlib
+import json
+import math
+import operator
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.paginator import EmptyPage, InvalidPage, PageNotAnInteger
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_save
+from django.db.models.sql.datastructures import EmptyResultSet
+from django.dispatch import receiver
+from django.http import Http404
+from django.utils.functional import cached_property
+
+VERSION_KEY = 'pagination:version:{0}'
+COUNT_KEY = 'pagination:count:{0}'
+GROUP_COUNT_KEY = 'pagination:groups:{0}'
+
+
+def get_cache():
+    return caches[settings.PAGINATION_CACHE]
+
+
+def version_key(model):
+    opts = model._meta.concrete_model._meta
+    return VERSION_KEY.format(opts.db_table)
+
+
+def touch(model):
+    """Invalidate the cached counts of the queries on `model`."""
+    cache, key = get_cache(), version_key(model)
+    version = cache.get(key)
+    if version is None:
+        # Start from the time, not 0, so a version lost by the cache can't
+        # come back and match old counts.
+        version = int(time.time() * 1000)
+    # Not cache.incr: most backends save the key again with the default
+    # timeout, and the version would expire.
+    cache.set(key, version + 1, None)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def touch_sender(sender, **kwargs):
+    touch(sender)
+
+
+def versions(queryset):
+    """Return the versions of the models of the tables `queryset` uses."""
+    models = dict((m._meta.db_table, m) for m in apps.get_models())
+    keys = [version_key(models[table])
+            for table in sorted(set(queryset.query.tables))
+            if table in models]
+    found = get_cache().get_many(keys)
+    return [(key, found.get(key)) for key in keys]
+
+
+def cached_count(queryset):
+    """Return `queryset.count()`, cached by the SQL of the query and the
+    versions of its models."""
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    signature = repr((sql, params, versions(queryset)))
+    key = COUNT_KEY.format(hashlib.sha1(signature).hexdigest())
+    cache = get_cache()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.PAGINATION_COUNT_TTL)
+    return count
+
+
+def cached_group_counts(queryset, *fields):
+    """Return the number of objects of `queryset` by values of `fields`, as
+    a list of (values, count), in one grouped query, cached like
+    `cached_count`."""
+    queryset = queryset.order_by().values_list(*fields).annotate(
+        count=Count('pk'))
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return []
+    signature = repr((sql, params, versions(queryset)))
+    key = GROUP_COUNT_KEY.format(hashlib.sha1(signature).hexdigest())
+    cache = get_cache()
+    counts = cache.get(key)
+    if counts is None:
+        counts = [(row[:-1], row[-1]) for row in queryset]
+        cache.set(key, counts, settings.PAGINATION_COUNT_TTL)
+    return counts
+
+
+def parse_ordering(queryset):
+    """Return the ordering of `queryset` as a list of (field, descending),
+    ending with the pk."""
+    names = queryset.query.order_by or queryset.model._meta.ordering
+    opts = queryset.model._meta
+    ordering = []
+    for name in names:
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        if name == 'pk':
+            name = opts.pk.name
+        if name == '?' or '__' in name:
+            raise ImproperlyConfigured(
+                'Cannot paginate by cursor on {0}'.format(name))
+        ordering.append((opts.get_field(name), descending))
+        if name == opts.pk.name:
+            break
+    else:
+        descending = ordering[0][1] if ordering else False
+        ordering.append((opts.pk, descending))
+    return ordering
+
+
+def cursor_value(field, obj):
+    """Return the value of `field` of `obj` as a string, without losing
+    the digits of floats that str() drops in Python 2."""
+    value = getattr(obj, field.attname)
+    if isinstance(value, float):
+        return repr(value)
+    return field.value_to_string(obj)
+
+
+class KeysetPage(object):
+
+    def __init__(self, object_list, number, paginator, has_previous,
+                 has_next):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_previous = has_previous
+        self._has_next = has_next
+
+    def __repr__(self):
+        return '<Page {0}>'.format(self.number)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    @property
+    def next_cursor(self):
+        if self._has_next:
+            return self.paginator.cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return self.paginator.cursor(self.object_list[0])
+
+
+class KeysetPaginator(object):
+    """Paginate a queryset by cursors. The fields of its ordering must not be
+    nullable, and should be indexed."""
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True):
+        self.ordering = parse_ordering(object_list)
+        self.object_list = object_list.order_by(*[
+            ('-' if descending else '') + field.name
+            for field, descending in self.ordering])
+        self.per_page = int(per_page)
+        self.allow_empty_first_page = allow_empty_first_page
+
+    @cached_property
+    def count(self):
+        return cached_count(self.object_list)
+
+    @property
+    def num_pages(self):
+        if not self.count and not self.allow_empty_first_page:
+            return 0
+        return max(1, int(math.ceil(self.count / float(self.per_page))))
+
+    def cursor(self, obj):
+        values = [cursor_value(field, obj) for field, _ in self.ordering]
+        return base64.urlsafe_b64encode(json.dumps(values)).rstrip('=')
+
+    def decode(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(
+                str(cursor) + '=' * (-len(cursor) % 4)))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [field.to_python(value)
+                    for (field, _), value in zip(self.ordering, values)]
+        except Exception:
+            raise InvalidPage('Invalid cursor')
+
+    def seek(self, values, backward=False):
+        """Return the queryset of the objects after the `values` cursor, or
+        before it if `backward`, nearest first."""
+        clauses = []
+        for i, (field, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != backward else 'gt'
+            clause = dict((f.name, v) for (f, _), v
+                          in zip(self.ordering[:i], values[:i]))
+            clause['{0}__{1}'.format(field.name, lookup)] = values[i]
+            clauses.append(Q(**clause))
+        queryset = self.object_list.filter(reduce(operator.or_, clauses))
+        return queryset.reverse() if backward else queryset
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number=1, after=None, before=None):
+        """Return the page `number`, made of the objects following the
+        `after` cursor, or preceding the `before` one, or at its offset."""
+        number = self.validate_number(number)
+        size = self.per_page
+        if before:
+            rows = list(self.seek(self.decode(before), backward=True)
+                        [:size + 1])
+            has_previous, has_next = len(rows) > size, True
+            rows = rows[:size][::-1]
+        else:
+            if after:
+                queryset = self.seek(self.decode(after))
+            else:
+                start = (number - 1) * size
+                queryset = self.object_list[start:]
+            rows = list(queryset[:size + 1])
+            has_previous = bool(after) or number > 1
+            has_next = len(rows) > size
+            rows = rows[:size]
+        if not rows and (number > 1 or not self.allow_empty_first_page):
+            raise EmptyPage('That page contains no results')
+        return KeysetPage(rows, number, self, has_previous, has_next)
+
+
+class KeysetPaginationMixin(object):
+    """ListView mixin paginating by cursors. The page gets `next_query` and
+    `previous_query`, the query strings of its neighbours."""
+    paginator_class = KeysetPaginator
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.get_paginator(
+            queryset, page_size, orphans=self.get_paginate_orphans(),
+            allow_empty_first_page=self.get_allow_empty())
+        params = self.request.GET
+        try:
+            page = paginator.page(params.get(self.page_kwarg) or 1,
+                                  after=params.get('after'),
+                                  before=params.get('before'))
+        except InvalidPage as e:
+            raise Http404(str(e))
+        page.next_query = self.page_query(page.next_page_number(),
+                                          after=page.next_cursor)
+        # The first page is always reached by its offset.
+        page.previous_query = self.page_query(
+            page.previous_page_number(),
+            before=page.previous_page_number() > 1 and page.previous_cursor)
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def page_query(self, number, **cursor):
+        """Return the current query string, pointing to another page."""
+        params = self.request.GET.copy()
+        for key in (self.page_kwarg, 'after', 'before'):
+            params.pop(key, None)
+        params[self.page_kwarg] = number
+        for key, value in cursor.items():
+            if value:
+                params[key] = value
+        return params.urlencode()
@@ -4,6 +4,8 @@ from django import template
 from django.utils.safestring import mark_safe
 from django.utils.translation.trans_real import language_code_prefix_re
 
+from .. import thumbnails
+
 register = template.Library()
 
 
@@ -33,3 +35,20 @@ i18n_pattern = re.compile(language_code_prefix_re)
 def remove_i18n(url):
     """Remove i18n prefix from an URL."""
     return i18n_pattern.sub("/", url)
+
+
+@register.filter()
+def thumbnail(file_, preset='medium'):
+    """Return the URL of the `preset` thumbnail of an image field file."""
+    if not file_:
+        return ''
+    return thumbnails.thumbnail_url(file_.name, preset)
+
+
+@register.filter()
+def srcset(file_):
+    """Return the thumbnails of an image field file, for a srcset
+    attribute."""
+    if not file_:
+        return ''
+    return thumbnails.srcset(file_.name)
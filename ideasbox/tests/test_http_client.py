@@ -0,0 +1,178 @@
+import BaseHTTPServer
+import SocketServer
+import socket
+import threading
+import time
+from collections import Counter
+from StringIO import StringIO
+
+import pytest
+
+from ideasbox.http_client import (CircuitOpenError, HTTPClient,
+                                  HTTPClientError)
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.hits[self.path] += 1
+        self.server.clients.add(self.client_address)
+        if self.path == '/slow':
+            time.sleep(0.5)
+        if self.path == '/redirect':
+            return self.reply(302, '', location='/ok')
+        if self.path == '/error':
+            return self.reply(500, 'error')
+        if self.path == '/flaky' and self.server.hits[self.path] == 1:
+            return self.reply(503, 'error')
+        if self.path == '/missing':
+            return self.reply(404, 'missing')
+        self.reply(200, 'content of ' + self.path)
+
+    def reply(self, status, content, **headers):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+@pytest.yield_fixture()
+def server():
+    server = Server(('127.0.0.1', 0), Handler)
+    server.hits = Counter()
+    server.clients = set()
+    server.url = 'http://127.0.0.1:{0}'.format(server.server_port)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def client():
+    return HTTPClient(connect_timeout=0.5, read_timeout=0.2, retries=2,
+                      backoff=0, threshold=2, cooldown=0.2)
+
+
+@pytest.fixture()
+def dead_url():
+    # A port nobody listens on.
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return 'http://127.0.0.1:{0}/'.format(port)
+
+
+def test_get_returns_content(server, client):
+    response = client.get(server.url + '/ok?x=1')
+    assert response.ok
+    assert response.content == 'content of /ok?x=1'
+
+
+def test_get_reuses_connections(server, client):
+    for i in range(3):
+        client.get(server.url + '/ok')
+    assert len(server.clients) == 1
+
+
+def test_get_follows_redirects(server, client):
+    response = client.get(server.url + '/redirect')
+    assert response.content == 'content of /ok'
+
+
+def test_get_streams_to_file(server, client):
+    f = StringIO()
+    response = client.get(server.url + '/ok', stream_to=f)
+    assert response.content is None
+    assert f.getvalue() == 'content of /ok'
+
+
+def test_client_errors_are_not_retried(server, client):
+    response = client.get(server.url + '/missing')
+    assert response.status == 404
+    assert server.hits['/missing'] == 1
+
+
+def test_server_errors_are_retried(server, client):
+    f = StringIO()
+    response = client.get(server.url + '/flaky', stream_to=f)
+    assert response.ok
+    assert f.getvalue() == 'content of /flaky'
+    assert server.hits['/flaky'] == 2
+    with pytest.raises(HTTPClientError):
+        client.get(server.url + '/error')
+    assert server.hits['/error'] == 3
+
+
+def test_read_timeout(server, client):
+    start = time.time()
+    with pytest.raises(HTTPClientError):
+        client.get(server.url + '/slow')
+    # 3 attempts of 0.2s, not 3 * 0.5s.
+    assert time.time() - start < 1.2
+
+
+def test_circuit_opens_after_repeated_failures(client, dead_url):
+    for i in range(2):
+        with pytest.raises(HTTPClientError):
+            client.get(dead_url)
+    start = time.time()
+    with pytest.raises(CircuitOpenError):
+        client.get(dead_url)
+    assert time.time() - start < 0.01
+    metrics = client.metrics()[0]
+    assert metrics['state'] == 'open'
+    assert metrics['requests'] == 2
+    assert metrics['failures'] == 2
+    assert metrics['retries'] == 4
+    assert metrics['rejected'] == 1
+
+
+def test_circuit_lets_one_request_try_after_cooldown(server, client):
+    host = server.url
+    for i in range(2):
+        with pytest.raises(HTTPClientError):
+            client.get(host + '/error')
+    with pytest.raises(CircuitOpenError):
+        client.get(host + '/ok')
+    time.sleep(0.2)
+    assert client.metrics()[0]['state'] == 'half-open'
+    assert client.get(host + '/ok').ok
+    assert client.metrics()[0]['state'] == 'closed'
+
+
+def test_circuit_should_not_stay_half_open_on_other_errors(server, client,
+                                                         monkeypatch):
+    host = server.url
+    for i in range(2):
+        with pytest.raises(HTTPClientError):
+            client.get(host + '/error')
+    time.sleep(0.2)
+
+    def broken(*args):
+        raise ValueError('Bad body')
+    monkeypatch.setattr(client, '_request', broken)
+    with pytest.raises(ValueError):
+        client.get(host + '/ok')
+    assert client.metrics()[0]['state'] == 'open'
+    monkeypatch.undo()
+    time.sleep(0.2)
+    assert client.get(host + '/ok').ok
+
+
+def test_unsupported_urls(client):
+    with pytest.raises(HTTPClientError):
+        client.get('ftp://example.org/file')
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import struct
+from StringIO import StringIO
+
+import pytest
+from PIL import Image
+from webtest import Upload
+
+from django.core.files.storage import default_storage
+from django.core.urlresolvers import reverse
+
+from mediacenter.models import Document
+
+from ..images import optimize_image, orientation
+from ..models import Job
+
+
+def exif(value):
+    """Return raw EXIF data with only the orientation tag."""
+    tiff = ('II*\x00' + struct.pack('<I', 8) + struct.pack('<H', 1) +
+            struct.pack('<HHII', 274, 3, 1, value) + struct.pack('<I', 0))
+    return 'Exif\x00\x00' + tiff
+
+
+def save_image(path, size=(3000, 2000), format_='JPEG', **options):
+    # Noise, so the JPEG is not trivially small.
+    image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    image.save(str(path), format_, **options)
+    return str(path)
+
+
+def test_big_photo_should_be_reduced_and_progressive(tmpdir, settings):
+    settings.IMAGE_MAX_SIZE = (1000, 1000)
+    path = save_image(tmpdir.join('photo.jpg'), quality=95)
+    before, after = optimize_image(path)
+    assert after == os.path.getsize(path)
+    assert after < before
+    image = Image.open(path)
+    assert image.size == (1000, 666)
+    assert image.info.get('progressive') or image.info.get('progression')
+
+
+def test_optimized_image_should_keep_its_mode(tmpdir):
+    path = save_image(tmpdir.join('photo.jpg'), quality=95)
+    os.chmod(path, 0o644)
+    before, after = optimize_image(path)
+    assert after < before
+    assert os.stat(path).st_mode & 0o777 == 0o644
+
+
+def test_rotated_photo_should_be_turned_upright(tmpdir):
+    path = save_image(tmpdir.join('photo.jpg'), size=(300, 200),
+                      exif=exif(6))
+    assert orientation(Image.open(path)) == 6
+    optimize_image(path)
+    image = Image.open(path)
+    assert image.size == (200, 300)
+    assert orientation(image) == 1
+
+
+def test_png_should_stay_png(tmpdir):
+    path = str(tmpdir.join('logo.png'))
+    Image.new('RGBA', (300, 200), 'blue').save(path, 'PNG')
+    optimize_image(path)
+    image = Image.open(path)
+    assert image.format == 'PNG'
+    assert image.mode == 'RGBA'
+
+
+def test_image_should_be_kept_if_not_smaller(tmpdir):
+    path = save_image(tmpdir.join('photo.jpg'), size=(100, 100), quality=20)
+    with open(path, 'rb') as f:
+        content = f.read()
+    before, after = optimize_image(path)
+    assert before == after
+    with open(path, 'rb') as f:
+        assert f.read() == content
+    assert tmpdir.listdir() == [tmpdir.join('photo.jpg')]
+
+
+@pytest.mark.parametrize('name,content', [
+    ('broken.jpg', 'xxxxxx'),
+    ('anim.gif', 'GIF89a'),
+])
+def test_other_files_should_be_left_alone(tmpdir, name, content):
+    path = tmpdir.join(name)
+    path.write(content)
+    assert optimize_image(str(path)) == (len(content), len(content))
+    assert path.read() == content
+
+
+@pytest.mark.django_db
+def test_uploaded_image_should_be_optimized_by_a_job(staffapp, settings,
+                                                      tmpdir):
+    settings.IMAGE_MAX_SIZE = (500, 500)
+    settings.IMAGE_KEEP_ORIGINALS = True
+    content = StringIO()
+    Image.frombytes('RGB', (800, 600), os.urandom(800 * 600 * 3)).save(
+        content, 'JPEG', quality=95)
+    form = staffapp.get(reverse('mediacenter:document_create')).forms[
+        'model_form']
+    form['title'] = 'my document title'
+    form['summary'] = 'my document summary'
+    form['credits'] = 'my document credits'
+    form['original'] = Upload('photo.jpg', content.getvalue(), 'image/jpeg')
+    form.submit().follow()
+    name = Document.objects.get().original.name
+    job = Job.objects.get(name='mediacenter.optimize_original')
+    result = job.get_result()
+    assert result['image'] == name
+    assert result['before'] == len(content.getvalue())
+    assert result['after'] == default_storage.size(name)
+    assert result['after'] < result['before']
+    assert Image.open(default_storage.path(name)).size == (500, 375)
+    # Kept under the name of the blob uploaded.
+    digest = hashlib.sha256(content.getvalue()).hexdigest()
+    original = 'originals/mediacenter/document/{0}/{1}/{2}.jpg'.format(
+        digest[:2], digest[2:4], digest)
+    assert default_storage.size(original) == result['before']
+    default_storage.delete(name)
+    default_storage.delete(original)
@@ -0,0 +1,188 @@
+import json
+import os
+import subprocess
+
+import pytest
+from django.core.urlresolvers import reverse
+
+from ideasbox import jobs
+from ideasbox.models import Job
+
+pytestmark = pytest.mark.django_db
+
+
+@jobs.register('tests.add')
+def add(job, a, b):
+    job.report(total=2, done=1, errors=['first'])
+    job.report(done=2, errors=['second'])
+    return {'message': 'Sum is {0}'.format(a + b)}
+
+
+@jobs.register('tests.fail')
+def fail(job):
+    job.report(errors=['Before failing'])
+    raise ValueError('Boom')
+
+
+def test_enqueue_runs_job_at_once_when_not_async():
+    job = jobs.enqueue('tests.add', a=1, b=2)
+    assert job.status == Job.DONE
+    assert job.get_params() == {'a': 1, 'b': 2}
+    assert job.get_result() == {'message': 'Sum is 3'}
+    assert job.get_errors() == ['first', 'second']
+    assert job.percent == 100
+    assert job.started_at and job.finished_at
+
+
+def test_failing_job_is_reported():
+    job = jobs.enqueue('tests.fail')
+    assert job.status == Job.FAILED
+    assert job.get_errors() == ['Before failing', 'ValueError: Boom']
+
+
+def test_enqueue_unknown_job():
+    with pytest.raises(KeyError):
+        jobs.enqueue('tests.unknown')
+    assert not Job.objects.count()
+
+
+def test_enqueue_wakes_worker_when_async(settings, monkeypatch):
+    settings.JOBS_ASYNC = True
+    woken = []
+    monkeypatch.setattr(jobs.worker, 'wake', lambda: woken.append(True))
+    job = jobs.enqueue('tests.add', a=1, b=2)
+    assert job.status == Job.PENDING
+    assert woken
+    assert jobs.run_pending() == 1
+    assert Job.objects.get(pk=job.pk).status == Job.DONE
+    assert jobs.run_pending() == 0
+
+
+def test_run_does_not_run_a_job_twice():
+    job = Job.objects.create(name='tests.add', params='{"a": 1, "b": 2}',
+                             status=Job.RUNNING)
+    jobs.run(job)
+    assert Job.objects.get(pk=job.pk).status == Job.RUNNING
+
+
+def test_percent():
+    assert Job(done=5).percent is None
+    assert Job(done=5, total=20).percent == 25
+    assert Job(done=5, total=20, status=Job.DONE).percent == 100
+
+
+def test_worker_runs_pending_jobs_in_a_thread(monkeypatch):
+    ran = []
+    monkeypatch.setattr(jobs, 'run_pending', lambda: ran.append(True))
+    worker = jobs.Worker()
+    worker.wake()
+    worker.thread.join(0.5)
+    assert ran
+    assert worker.thread.daemon
+
+
+def test_run_records_the_process():
+    job = Job.objects.create(name='tests.add', params='{"a": 1, "b": 2}')
+    jobs.run(job)
+    assert Job.objects.get(pk=job.pk).pid == os.getpid()
+
+
+def dead_pid():
+    process = subprocess.Popen(['true'])
+    process.wait()
+    return process.pid
+
+
+def test_recover_fails_jobs_of_dead_processes(settings):
+    os.makedirs(settings.JOBS_ROOT)
+    path = os.path.join(settings.JOBS_ROOT, 'notices.csv')
+    open(path, 'w').close()
+    interrupted = Job.objects.create(
+        name='library.import', status=Job.RUNNING, pid=dead_pid(),
+        params=json.dumps({'path': path, 'files_format': 'csv'}))
+    running = Job.objects.create(name='tests.add', status=Job.RUNNING,
+                                 pid=os.getpid())
+    pending = Job.objects.create(name='tests.add')
+    assert jobs.recover() == 1
+    job = Job.objects.get(pk=interrupted.pk)
+    assert job.status == Job.FAILED
+    assert job.finished_at
+    assert job.get_errors() == ['Interrupted: its process stopped.']
+    assert not os.path.exists(path)
+    assert Job.objects.get(pk=running.pk).status == Job.RUNNING
+    assert Job.objects.get(pk=pending.pk).status == Job.PENDING
+    assert jobs.recover() == 0
+
+
+def test_recover_keeps_files_out_of_jobs_root(settings, tmpdir):
+    path = tmpdir.join('notices.csv')
+    path.write('')
+    Job.objects.create(name='library.import', status=Job.RUNNING,
+                       params=json.dumps({'path': str(path)}))
+    assert jobs.recover() == 1
+    assert path.check()
+
+
+def test_worker_recovers_then_runs_pending_jobs(monkeypatch):
+    calls = []
+    monkeypatch.setattr(jobs, 'recover', lambda: calls.append('recover'))
+    monkeypatch.setattr(jobs, 'run_pending', lambda: calls.append('run'))
+    worker = jobs.Worker()
+    worker.start()
+    worker.thread.join(0.5)
+    assert calls == ['recover', 'run']
+
+
+def test_first_request_starts_the_worker(app, settings, monkeypatch):
+    started = []
+    monkeypatch.setattr(jobs.worker, 'start', lambda: started.append(True))
+    app.get(reverse('index'))
+    assert not started
+    settings.JOBS_ASYNC = True
+    app.get(reverse('index'))
+    assert started
+
+
+def test_job_detail_refreshes_until_finished(staffapp):
+    job = Job.objects.create(name='tests.add', done=3, total=4,
+                             errors='Line 3: oops\n')
+    response = staffapp.get(reverse('job_detail', kwargs={'pk': job.pk}))
+    assert response.pyquery('meta[http-equiv="refresh"]')
+    assert response.pyquery('progress').attr('value') == '75'
+    assert 'Line 3: oops' in response.pyquery('.errors').text()
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE)
+    response = staffapp.get(reverse('job_detail', kwargs={'pk': job.pk}))
+    assert not response.pyquery('meta[http-equiv="refresh"]')
+
+
+def test_job_detail_limits_errors(staffapp, monkeypatch):
+    monkeypatch.setattr('ideasbox.views.JobDetail.MAX_ERRORS', 2)
+    job = Job.objects.create(name='tests.add', errors='1\n2\n3\n4\n')
+    response = staffapp.get(reverse('job_detail', kwargs={'pk': job.pk}))
+    assert len(response.pyquery('.errors li')) == 3
+    assert 'And 2 more.' in response.content
+
+
+def test_job_pages_are_for_staff(loggedapp):
+    job = Job.objects.create(name='tests.add')
+    loggedapp.get(reverse('job_detail', kwargs={'pk': job.pk}), status=302)
+    loggedapp.get(reverse('job_list'), status=302)
+
+
+def test_job_list_starts_reindex(staffapp):
+    response = staffapp.get(reverse('job_list'))
+    response = response.forms['start-job'].submit('name').follow()
+    job = Job.objects.get()
+    assert job.name == 'search.reindex'
+    assert job.status == Job.DONE
+    assert job.user == staffapp.user
+    assert 'items indexed' in response.content
+    assert job.get_absolute_url() in staffapp.get(reverse('job_list'))
+
+
+def test_job_list_only_starts_allowed_jobs(staffapp):
+    response = staffapp.get(reverse('job_list'))
+    token = response.forms['start-job']['csrfmiddlewaretoken'].value
+    staffapp.post(reverse('job_list'), {'name': 'tests.add',
+                                        'csrfmiddlewaretoken': token},
+                  status=400)
@@ -0,0 +1,103 @@
+import pytest
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.http import http_date
+
+from ..media import RangeNotSatisfiable, parse_range
+
+CONTENT = ''.join(chr(i % 256) for i in range(1000))
+
+
+@pytest.yield_fixture()
+def video():
+    name = default_storage.save('tests/movie.mp4', ContentFile(CONTENT))
+    yield name
+    default_storage.delete(name)
+
+
+def url(name):
+    return '/media/' + name
+
+
+@pytest.mark.parametrize('header,expected', [
+    (None, None),
+    ('bytes=0-99', (0, 99)),
+    ('bytes=900-', (900, 999)),
+    ('bytes=-100', (900, 999)),
+    ('bytes=-5000', (0, 999)),
+    ('bytes=990-5000', (990, 999)),
+    ('bytes=0-1,5-6', None),
+    ('lines=1-2', None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize('header', ['bytes=1000-', 'bytes=5-4', 'bytes=-0'])
+def test_parse_range_should_reject_ranges_out_of_file(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 1000)
+
+
+def test_media_should_be_served_whole(app, video):
+    response = app.get(url(video))
+    assert response.body == CONTENT
+    assert response.content_type == 'video/mp4'
+    assert response['Accept-Ranges'] == 'bytes'
+    assert response['Content-Length'] == '1000'
+    assert response['ETag']
+
+
+def test_range_should_be_served_partially(app, video):
+    response = app.get(url(video), headers={'Range': 'bytes=100-199'},
+                       status=206)
+    assert response.body == CONTENT[100:200]
+    assert response['Content-Range'] == 'bytes 100-199/1000'
+    assert response['Content-Length'] == '100'
+
+
+def test_range_out_of_file_should_be_416(app, video):
+    response = app.get(url(video), headers={'Range': 'bytes=2000-'},
+                       status=416)
+    assert response['Content-Range'] == 'bytes */1000'
+
+
+def test_if_range_should_ignore_range_of_other_version(app, video):
+    response = app.get(url(video), headers={'Range': 'bytes=0-9',
+                                            'If-Range': '"other"'})
+    assert response.status_code == 200
+    assert response.body == CONTENT
+    etag = response['ETag']
+    response = app.get(url(video), headers={'Range': 'bytes=0-9',
+                                            'If-Range': etag}, status=206)
+    assert response.body == CONTENT[:10]
+
+
+def test_validators_should_give_304(app, video):
+    response = app.get(url(video))
+    app.get(url(video), headers={'If-None-Match': response['ETag']},
+            status=304)
+    app.get(url(video), headers={'If-None-Match': '"other"'}, status=200)
+    app.get(url(video),
+            headers={'If-Modified-Since': response['Last-Modified']},
+            status=304)
+    app.get(url(video), headers={'If-Modified-Since': http_date(0)},
+            status=200)
+
+
+def test_sendfile_should_only_name_the_file(app, video, settings):
+    settings.MEDIA_SENDFILE = 'x-sendfile'
+    response = app.get(url(video))
+    assert response.body == ''
+    assert response['X-Sendfile'] == default_storage.path(video)
+    assert response['ETag']
+    settings.MEDIA_SENDFILE = 'x-accel-redirect'
+    response = app.get(url(video))
+    assert response['X-Accel-Redirect'] == '/protected-media/' + video
+
+
+def test_missing_or_outside_files_should_404(app, video):
+    app.get(url('tests/missing.mp4'), status=404)
+    app.get(url('tests'), status=404)
+    app.get('/media/../../manage.py', status=404)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import os
+from StringIO import StringIO
+
+import pytest
+
+from django.core.management import call_command
+
+from library.models import Book
+from library.tests.factories import BookFactory
+from mediacenter.models import Document, Upload
+from mediacenter.tests.factories import DocumentFactory
+
+from ..mediagc import collect, referenced_names
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.yield_fixture()
+def media(settings, tmpdir):
+    root = tmpdir.mkdir('media')
+    settings.MEDIA_ROOT = str(root)
+    settings.MEDIA_GC_QUARANTINE = str(tmpdir.join('quarantine'))
+    settings.THUMBNAIL_ROOT = str(root.join('thumbnails'))
+    for name in ('mediacenter/document/used.pdf',
+                 'mediacenter/document/deleted.pdf',
+                 'mediacenter/document/uploading.mp4',
+                 'mediacenter/preview/replaced.jpg',
+                 'originals/mediacenter/preview/photo.jpg',
+                 'thumbnails/small/photo.jpg',
+                 u'library/cover/café.jpg'.encode('utf-8')):
+        path = root.join(name)
+        path.write('x' * 10, ensure=True)
+        os.utime(str(path), (1, 1))
+    document = DocumentFactory()
+    Document.objects.filter(pk=document.pk).update(
+        original='mediacenter/document/used.pdf')
+    upload = Upload.objects.create(name='mediacenter/document/uploading.mp4',
+                                   size=100)
+    book = BookFactory()
+    Book.objects.filter(pk=book.pk).update(cover=u'library/cover/café.jpg')
+    yield root
+    document.delete()
+    upload.delete()
+    book.delete()
+
+
+def test_referenced_names(media):
+    names = referenced_names()
+    assert 'mediacenter/document/used.pdf' in names
+    assert 'mediacenter/document/uploading.mp4' in names
+    assert '' not in names
+
+
+def test_collect_should_quarantine_orphans(media, settings):
+    logged = []
+    count, size = collect(log=lambda name, size: logged.append(name))
+    assert (count, size) == (2, 20)
+    assert logged == ['mediacenter/document/deleted.pdf',
+                      'mediacenter/preview/replaced.jpg']
+    assert not media.join('mediacenter/document/deleted.pdf').check()
+    assert media.join('mediacenter/document/used.pdf').check()
+    assert media.join('mediacenter/document/uploading.mp4').check()
+    assert media.join('originals/mediacenter/preview/photo.jpg').check()
+    assert media.join('thumbnails/small/photo.jpg').check()
+    assert media.join(u'library/cover/café.jpg'.encode('utf-8')).check()
+    moved = [os.path.relpath(os.path.join(d, n),
+                             settings.MEDIA_GC_QUARANTINE)
+             for d, _, names in os.walk(settings.MEDIA_GC_QUARANTINE)
+             for n in names]
+    assert sorted(n.split(os.sep, 1)[1] for n in moved) == logged
+
+
+def test_collect_can_delete_orphans(media, settings):
+    assert collect(delete=True, batch_size=1) == (2, 20)
+    assert not media.join('mediacenter/preview/replaced.jpg').check()
+    assert not os.path.exists(settings.MEDIA_GC_QUARANTINE)
+
+
+def test_collect_should_keep_recent_files(media):
+    media.join('mediacenter/document/new.pdf').write('new')
+    assert collect(dry_run=True) == (2, 20)
+    assert collect(dry_run=True, min_age=-60) == (3, 23)
+
+
+def test_cleanmedia_dry_run(media):
+    stdout = StringIO()
+    call_command('cleanmedia', dry_run=True, stdout=stdout)
+    output = stdout.getvalue()
+    assert 'mediacenter/document/deleted.pdf (10 bytes)' in output
+    assert '2 orphan files, 0.0 MB would be reclaimed.' in output
+    assert media.join('mediacenter/document/deleted.pdf').check()
+
+
+def test_cleanmedia(media):
+    stdout = StringIO()
+    call_command('cleanmedia', delete=True, stdout=stdout)
+    assert '2 orphan files, 0.0 MB deleted.' in stdout.getvalue()
+    assert not media.join('mediacenter/document/deleted.pdf').check()
+
+
+def test_collect_should_decode_file_names(media):
+    orphan = media.join(u'library/cover/été.jpg'.encode('utf-8'))
+    orphan.write('x' * 5)
+    os.utime(str(orphan), (1, 1))
+    logged = []
+    assert collect(delete=True,
+                   log=lambda name, size: logged.append(name)) == (3, 25)
+    assert u'library/cover/été.jpg' in logged
+    assert not orphan.check()
+    assert media.join(u'library/cover/café.jpg'.encode('utf-8')).check()
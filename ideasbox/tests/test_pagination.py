@@ -0,0 +1,189 @@
+import time
+
+import pytest
+
+from django.core.paginator import InvalidPage
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from library.models import Book
+from library.tests.factories import BookFactory, BookSpecimenFactory
+from mediacenter.models import Document
+from mediacenter.tests.factories import DocumentFactory
+
+from ..models import Job
+from ..pagination import (KeysetPaginator, cached_count, cached_group_counts,
+                          parse_ordering, touch)
+
+pytestmark = pytest.mark.django_db
+
+
+def titles(page):
+    return [book.title for book in page]
+
+
+@pytest.fixture()
+def books():
+    # Same titles, so the pk has to break the ties.
+    return [BookFactory(title=title) for title in 'ABBBCDDEF']
+
+
+def test_parse_ordering_should_add_pk():
+    ordering = parse_ordering(Job.objects.all())
+    assert [(f.name, d) for f, d in ordering] == [('created_at', True),
+                                                 ('id', True)]
+    ordering = parse_ordering(Book.objects.order_by('title', '-pk'))
+    assert [(f.name, d) for f, d in ordering] == [('title', False),
+                                                 ('id', True)]
+
+
+def test_next_cursors_should_walk_all_objects_once(books):
+    paginator = KeysetPaginator(Book.objects.all(), 2)
+    page = paginator.page()
+    seen = list(page)
+    while page.has_next():
+        page = paginator.page(page.next_page_number(),
+                              after=page.next_cursor)
+        assert page.has_previous()
+        seen.extend(page)
+    assert page.number == 5
+    assert seen == sorted(books, key=lambda b: (b.title, b.pk))
+
+
+def test_previous_cursor_should_go_back(books):
+    paginator = KeysetPaginator(Book.objects.all(), 2)
+    first = paginator.page()
+    second = paginator.page(2, after=first.next_cursor)
+    third = paginator.page(3, after=second.next_cursor)
+    back = paginator.page(2, before=third.previous_cursor)
+    assert list(back) == list(second)
+    assert back.has_previous()
+    assert back.has_next()
+    back = paginator.page(1, before=back.previous_cursor)
+    assert list(back) == list(first)
+    assert not back.has_previous()
+
+
+def test_descending_datetime_ordering_should_paginate():
+    for i in range(5):
+        Job.objects.create(name='job {0}'.format(i))
+    paginator = KeysetPaginator(Job.objects.all(), 2)
+    page = paginator.page()
+    seen = list(page)
+    while page.has_next():
+        page = paginator.page(page.number + 1, after=page.next_cursor)
+        seen.extend(page)
+    assert seen == list(Job.objects.order_by('-created_at', '-pk'))
+
+
+@pytest.mark.parametrize('ordering', ['duration', '-duration'])
+def test_float_cursors_should_keep_every_digit(ordering):
+    for duration in (32.23510204081633, 32.23510204081634, 61.5,
+                     7.123456789012345):
+        DocumentFactory(duration=duration)
+    queryset = Document.objects.order_by(ordering)
+    paginator = KeysetPaginator(queryset, 1)
+    page = paginator.page()
+    seen = list(page)
+    # A repeated row would loop forever.
+    while page.has_next() and len(seen) < 10:
+        page = paginator.page(page.number + 1, after=page.next_cursor)
+        seen.extend(page)
+    assert seen == list(queryset.order_by(ordering, 'pk'))
+    for document in Document.objects.all():
+        document.delete()
+
+
+def test_page_number_alone_should_use_offset(books):
+    paginator = KeysetPaginator(Book.objects.all(), 2)
+    page = paginator.page(3)
+    assert titles(page) == ['C', 'D']
+    assert page.has_previous()
+    assert page.has_next()
+    with pytest.raises(InvalidPage):
+        paginator.page(6)
+
+
+def test_broken_cursor_should_be_invalid(books):
+    paginator = KeysetPaginator(Book.objects.all(), 2)
+    with pytest.raises(InvalidPage):
+        paginator.page(2, after='garbage')
+
+
+def test_seek_should_not_count(books):
+    paginator = KeysetPaginator(Book.objects.all(), 2)
+    cursor = paginator.page().next_cursor
+    sql = str(paginator.seek(paginator.decode(cursor)).query).upper()
+    assert 'COUNT(' not in sql
+    assert 'OFFSET' not in sql
+
+
+def test_count_should_be_cached_until_model_changes(books):
+    queryset = Book.objects.all()
+    assert cached_count(queryset) == 9
+    with CaptureQueriesContext(connection) as queries:
+        assert cached_count(Book.objects.all()) == 9
+    assert not queries.captured_queries
+    BookFactory()
+    assert cached_count(queryset) == 10
+    Book.objects.first().delete()
+    assert cached_count(queryset) == 9
+
+
+def test_count_should_depend_on_query(books):
+    assert cached_count(Book.objects.filter(title='B')) == 3
+    assert cached_count(Book.objects.filter(title='D')) == 2
+
+
+def test_touch_should_invalidate_counts(books):
+    assert cached_count(Book.objects.all()) == 9
+    Book.objects.bulk_create([Book(title='G', section=Book.OTHER)])
+    assert cached_count(Book.objects.all()) == 9
+    touch(Book)
+    assert cached_count(Book.objects.all()) == 10
+
+
+def test_versions_should_not_expire_on_file_cache(books, settings, tmpdir,
+                                                  monkeypatch):
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmpdir.join('django')),
+        }
+    }
+    now = time.time()
+    clock = [now]
+    monkeypatch.setattr(time, 'time', lambda: clock[0])
+    BookFactory()
+    BookFactory()
+    assert cached_count(Book.objects.all()) == 11
+    # Past the default timeout of the cache, twice.
+    for i in range(2):
+        clock[0] += 301
+        assert cached_count(Book.objects.all()) == 11 + i
+        BookFactory()
+        assert cached_count(Book.objects.all()) == 12 + i
+
+
+def test_count_should_follow_joined_models(books):
+    queryset = Book.objects.filter(specimens__serial='123')
+    assert cached_count(queryset) == 0
+    BookSpecimenFactory(book=books[0], serial='123')
+    assert cached_count(queryset) == 1
+
+
+def test_group_counts_should_be_cached_until_model_changes(books):
+    assert sorted(cached_group_counts(Book.objects.all(), 'title')) == [
+        (('A',), 1), (('B',), 3), (('C',), 1), (('D',), 2), (('E',), 1),
+        (('F',), 1)]
+    with CaptureQueriesContext(connection) as queries:
+        counts = cached_group_counts(Book.objects.all(), 'title')
+    assert not queries.captured_queries
+    assert dict(counts)[('B',)] == 3
+    BookFactory(title='B')
+    assert dict(cached_group_counts(Book.objects.all(), 'title'))[('B',)] == 4
+
+
+def test_num_pages_should_round_up(books):
+    assert KeysetPaginator(Book.objects.all(), 2).num_pages == 5
+    assert KeysetPaginator(Book.objects.none(), 2).num_pages == 1
@@ -0,0 +1,129 @@
+import os
+import threading
+from StringIO import StringIO
+
+import pytest
+from PIL import Image
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.urlresolvers import reverse
+
+from library.tests.factories import BookFactory
+
+from .. import thumbnails
+from ..templatetags.ideasbox_tags import srcset, thumbnail
+
+
+def make_image(format_='JPEG', size=(1200, 900), mode='RGB'):
+    content = StringIO()
+    Image.new(mode, size, 'red').save(content, format_)
+    return ContentFile(content.getvalue())
+
+
+@pytest.yield_fixture()
+def photo(settings, tmpdir):
+    settings.THUMBNAIL_ROOT = str(tmpdir.join('thumbnails'))
+    name = default_storage.save('tests/photo.jpg', make_image())
+    yield name
+    default_storage.delete(name)
+
+
+def get(app, name, preset='small', status=200):
+    return app.get(reverse('thumbnail', kwargs={'preset': preset,
+                                                'path': name}),
+                   status=status)
+
+
+def test_thumbnail_should_fit_preset(app, photo):
+    response = get(app, photo)
+    assert response.content_type == 'image/jpeg'
+    assert 'max-age' in response['Cache-Control']
+    image = Image.open(StringIO(response.body))
+    assert image.size == (150, 112)
+    assert len(response.body) < default_storage.size(photo)
+
+
+def test_thumbnail_should_be_made_once(app, photo, monkeypatch):
+    calls = []
+    make = thumbnails.make_thumbnail
+    monkeypatch.setattr(thumbnails, 'make_thumbnail',
+                        lambda *args: calls.append(args) or make(*args))
+    first = get(app, photo).body
+    assert get(app, photo).body == first
+    get(app, photo, preset='medium')
+    assert len(calls) == 2
+
+
+def test_concurrent_requests_should_make_thumbnail_once(photo, monkeypatch):
+    calls = []
+    make = thumbnails.make_thumbnail
+    monkeypatch.setattr(thumbnails, 'make_thumbnail',
+                        lambda *args: calls.append(args) or make(*args))
+    threads = [threading.Thread(target=thumbnails.get_thumbnail,
+                                args=(photo, 'large')) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+
+
+def test_changed_source_should_get_new_thumbnail(photo):
+    first = thumbnails.get_thumbnail(photo, 'small')
+    default_storage.delete(photo)
+    default_storage.save(photo, make_image(size=(300, 300)))
+    assert thumbnails.get_thumbnail(photo, 'small') != first
+
+
+def test_png_should_stay_png(app, settings, tmpdir):
+    settings.THUMBNAIL_ROOT = str(tmpdir)
+    name = default_storage.save('tests/logo.png',
+                                make_image('PNG', mode='RGBA'))
+    try:
+        response = get(app, name)
+    finally:
+        default_storage.delete(name)
+    assert response.content_type == 'image/png'
+    assert Image.open(StringIO(response.body)).mode == 'RGBA'
+
+
+def test_unknown_preset_should_404(app, photo):
+    get(app, photo, preset='huge', status=404)
+
+
+def test_missing_or_broken_files_should_404(app, photo):
+    get(app, 'tests/missing.jpg', status=404)
+    get(app, '../../../etc/passwd', status=404)
+    name = default_storage.save('tests/broken.jpg', ContentFile('xxx'))
+    try:
+        get(app, name, status=404)
+    finally:
+        default_storage.delete(name)
+
+
+def test_evict_should_remove_least_recently_used(photo, settings):
+    names = [thumbnails.get_thumbnail(photo, p) for p in ('small', 'large')]
+    paths = [os.path.join(settings.THUMBNAIL_ROOT, n) for n in names]
+    os.utime(paths[0], (1, 1))
+    assert thumbnails.evict_thumbnails(os.path.getsize(paths[1])) == 1
+    assert not os.path.exists(paths[0])
+    assert os.path.exists(paths[1])
+
+
+def test_srcset_filter_should_list_presets(photo):
+    value = srcset(ContentFile('', name=photo))
+    assert value.count('w, ') == 2
+    assert '/thumbnail/small/tests/photo' in value
+    assert value.endswith('800w')
+    assert srcset(None) == ''
+    assert thumbnail(None) == ''
+
+
+@pytest.mark.django_db
+def test_book_card_should_use_thumbnails(app):
+    book = BookFactory()
+    response = app.get(reverse('library:book_detail', kwargs={'pk': book.pk}))
+    img = response.pyquery('img.cover')
+    assert img.attr('src').startswith('/thumbnail/medium/')
+    assert '300w' in img.attr('srcset')
@@ -0,0 +1,68 @@
+import os
+import zipfile
+from StringIO import StringIO
+
+import pytest
+
+from .. import zipstream
+from ..zipstream import DEFLATED, STORED, is_compressed, stream_zip
+
+
+@pytest.fixture()
+def files(tmpdir):
+    text = tmpdir.join('lesson.txt')
+    text.write('All work and no play makes Jack a dull boy.\n' * 1000)
+    photo = tmpdir.join('photo.jpg')
+    photo.write(os.urandom(100000), 'wb')
+    return [(u'le\xe7on.txt', str(text)), (u'photo.jpg', str(photo))]
+
+
+def unzip(blocks):
+    archive = zipfile.ZipFile(StringIO(''.join(blocks)))
+    assert archive.testzip() is None
+    return archive
+
+
+@pytest.mark.parametrize('name,expected', [
+    ('movie.mp4', True),
+    ('photo.JPG', True),
+    ('song.ogg', True),
+    ('book.epub', True),
+    ('notes.txt.gz', True),
+    ('lesson.txt', False),
+    ('page.html', False),
+    ('unknown.dat', False),
+])
+def test_is_compressed(name, expected):
+    assert is_compressed(name) == expected
+
+
+def test_stream_zip(files):
+    archive = unzip(stream_zip(files))
+    text, photo = archive.infolist()
+    assert text.filename == u'le\xe7on.txt'
+    assert text.compress_type == DEFLATED
+    assert text.compress_size < text.file_size
+    assert photo.compress_type == STORED
+    with open(files[1][1], 'rb') as f:
+        assert archive.read('photo.jpg') == f.read()
+
+
+def test_stream_zip_should_be_lazy(files):
+    blocks = stream_zip(files)
+    first = next(blocks)
+    assert first.startswith('PK\x03\x04')
+    assert len(first) < 100
+
+
+def test_stream_zip_should_write_zip64_records(files, monkeypatch):
+    monkeypatch.setattr(zipstream, 'ZIP64_LIMIT', 1000)
+    content = ''.join(stream_zip(files))
+    assert 'PK\x06\x06' in content
+    archive = unzip([content])
+    with open(files[0][1], 'rb') as f:
+        assert archive.read(u'le\xe7on.txt') == f.read()
+
+
+def test_stream_zip_of_nothing():
+    assert not unzip(stream_zip([])).infolist()
@@ -0,0 +1,136 @@
+"""Thumbnails of the uploaded images (book covers, blog images, media
+previews), so phones don't download the originals.
+
+A thumbnail is made on its first request, for one of the THUMBNAIL_PRESETS,
+and kept in THUMBNAIL_ROOT under a name derived from the source file (name,
+size and modification time) and the preset, so a changed source gets a new
+thumbnail. The least recently used thumbnails are removed when the cache
+grows over THUMBNAIL_MAX_SIZE.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.urlresolvers import reverse
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Evict after this many thumbnails made by the process.
+EVICT_EVERY = 100
+# Seconds browsers can keep a thumbnail.
+MAX_AGE = 60 * 60 * 24
+PNG_EXTENSIONS = ('.png', '.gif')
+
+_lock = threading.Lock()
+_locks = defaultdict(threading.Lock)
+_made = [0]
+
+
+def thumbnail_url(name, preset):
+    return reverse('thumbnail', kwargs={'preset': preset, 'path': name})
+
+
+def srcset(name):
+    """Return the srcset attribute value of the thumbnails of `name`."""
+    presets = sorted(settings.THUMBNAIL_PRESETS.items(),
+                     key=lambda item: item[1])
+    return ', '.join('{0} {1}w'.format(thumbnail_url(name, preset), width)
+                     for preset, (width, height) in presets)
+
+
+def thumbnail_name(name, preset):
+    """Return the name of the thumbnail of `name` in THUMBNAIL_ROOT."""
+    stat = os.stat(default_storage.path(name))
+    width, height = settings.THUMBNAIL_PRESETS[preset]
+    key = hashlib.sha1(u'{0}:{1}:{2}:{3}x{4}:{5}'.format(
+        name, stat.st_size, stat.st_mtime, width, height,
+        settings.THUMBNAIL_QUALITY).encode('utf-8')).hexdigest()
+    ext = '.png' if name.lower().endswith(PNG_EXTENSIONS) else '.jpg'
+    return os.path.join(key[:2], key + ext)
+
+
+def get_thumbnail(name, preset):
+    """Return the name of the thumbnail of the `name` file of the default
+    storage, for `preset`, in THUMBNAIL_ROOT, making it if needed. Raise
+    IOError if the file is not an image, KeyError for an unknown preset."""
+    thumbnail = thumbnail_name(name, preset)
+    path = os.path.join(settings.THUMBNAIL_ROOT, thumbnail)
+    with _lock:
+        lock = _locks[thumbnail]
+    # Concurrent requests of the same thumbnail wait for the first one.
+    with lock:
+        made = not os.path.exists(path)
+        if made:
+            make_thumbnail(default_storage.path(name), path,
+                           settings.THUMBNAIL_PRESETS[preset])
+        else:
+            # Mark it as recently used.
+            os.utime(path, None)
+    with _lock:
+        _locks.pop(thumbnail, None)
+        _made[0] += made
+        evict = made and not _made[0] % EVICT_EVERY
+    if evict:
+        evict_thumbnails()
+    return thumbnail
+
+
+def make_thumbnail(source, destination, size):
+    directory = os.path.dirname(destination)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    image = Image.open(source)
+    image.thumbnail(size, Image.ANTIALIAS)
+    if destination.endswith('.png'):
+        options = {'format': 'PNG', 'optimize': True}
+    else:
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        options = {'format': 'JPEG', 'optimize': True, 'progressive': True,
+                   'quality': settings.THUMBNAIL_QUALITY}
+    # Other processes may be making it too: only show complete files.
+    fd, tmp = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, **options)
+        os.rename(tmp, destination)
+    except:
+        os.remove(tmp)
+        raise
+
+
+def evict_thumbnails(max_size=None):
+    """Remove the least recently used thumbnails until they fit in
+    `max_size` bytes (THUMBNAIL_MAX_SIZE by default). Return the number of
+    files removed."""
+    if max_size is None:
+        max_size = settings.THUMBNAIL_MAX_SIZE
+    files = []
+    for root, dirs, names in os.walk(settings.THUMBNAIL_ROOT):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+    size = sum(f[1] for f in files)
+    removed = 0
+    for mtime, file_size, path in sorted(files):
+        if size <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        size -= file_size
+        removed += 1
+    if removed:
+        logger.info('%d thumbnails evicted', removed)
+    return removed
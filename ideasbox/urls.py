@@ -1,12 +1,15 @@
+import re
+
 from django.conf import settings
 from django.conf.urls import include, url
 from django.conf.urls.i18n import i18n_patterns
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.contrib.auth import views as auth_views
 
 from . import views
 
+MEDIA_PREFIX = re.escape(settings.MEDIA_URL.lstrip('/'))
+
 urlpatterns = i18n_patterns('',
     url(r'^admin/', include(admin.site.urls)),
     url(r'^blog/', include('blog.urls', namespace="blog")),
@@ -25,5 +28,11 @@ urlpatterns = i18n_patterns('',
     url(r'^user/new/$', views.user_create, name='user_create'),
     url(r'^user/(?P<pk>[\d]+)/delete/$',
         views.user_delete, name='user_delete'),
+    url(r'^job/$', views.job_list, name='job_list'),
+    url(r'^job/(?P<pk>[\d]+)/$', views.job_detail, name='job_detail'),
 
-) + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) + [url(r'^i18n/', include('django.conf.urls.i18n')),]
+) + [url(r'^i18n/', include('django.conf.urls.i18n')),
+    url(r'^{0}(?P<path>.+)$'.format(MEDIA_PREFIX), views.media, name='media'),
+    url(r'^thumbnail/(?P<preset>\w+)/(?P<path>.+)$', views.thumbnail,
+        name='thumbnail'),
+]
@@ -1,8 +1,11 @@
+from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
+from django.core.exceptions import SuspiciousFileOperation
 from django.core.urlresolvers import reverse_lazy
 from django.forms.models import modelform_factory
-from django.shortcuts import render
+from django.http import Http404, HttpResponseBadRequest
+from django.shortcuts import redirect, render
 from django.views.generic import (ListView, DetailView, UpdateView, CreateView,
                                   DeleteView)
 
@@ -10,6 +13,11 @@ from blog.models import Content
 from library.models import Book
 from mediacenter.models import Document
 
+from . import jobs, thumbnails
+from .media import serve_file
+from .models import Job
+from .pagination import KeysetPaginationMixin
+
 user_model = get_user_model()
 
 
@@ -66,3 +74,59 @@ class UserDelete(DeleteView):
     context_object_name = 'user_obj'
     success_url = reverse_lazy('user_list')
 user_delete = staff_member_required(UserDelete.as_view())
+
+
+class JobList(KeysetPaginationMixin, ListView):
+    model = Job
+    template_name = 'ideasbox/job_list.html'
+    paginate_by = 20
+    # Jobs without params that can be started from the list.
+    STARTABLE = ['search.reindex']
+
+    def post(self, request, *args, **kwargs):
+        name = request.POST.get('name')
+        if name not in self.STARTABLE:
+            return HttpResponseBadRequest()
+        return redirect(jobs.enqueue(name, user=request.user))
+job_list = staff_member_required(JobList.as_view())
+
+
+class JobDetail(DetailView):
+    model = Job
+    template_name = 'ideasbox/job_detail.html'
+    # Seconds between two refreshes of the page, while the job runs.
+    REFRESH = 2
+    # How many errors are detailed.
+    MAX_ERRORS = 100
+
+    def get_context_data(self, **kwargs):
+        context = super(JobDetail, self).get_context_data(**kwargs)
+        errors = self.object.get_errors()
+        context['errors'] = errors[:self.MAX_ERRORS]
+        context['more_errors'] = max(0, len(errors) - self.MAX_ERRORS)
+        context['result'] = self.object.get_result()
+        context['refresh'] = self.REFRESH
+        return context
+job_detail = staff_member_required(JobDetail.as_view())
+
+
+def thumbnail(request, preset, path):
+    """Serve the `preset` thumbnail of the `path` media file."""
+    if preset not in settings.THUMBNAIL_PRESETS:
+        raise Http404('Unknown preset')
+    try:
+        name = thumbnails.get_thumbnail(path, preset)
+    except (IOError, OSError, SuspiciousFileOperation):
+        raise Http404('Not an image')
+    response = serve_file(request, settings.THUMBNAIL_ROOT, name)
+    response['Cache-Control'] = 'max-age={0}'.format(thumbnails.MAX_AGE)
+    return response
+
+
+def media(request, path):
+    """Serve the `path` media file."""
+    try:
+        return serve_file(request, settings.MEDIA_ROOT, path,
+                          sendfile=settings.MEDIA_SENDFILE)
+    except (OSError, SuspiciousFileOperation):
+        raise Http404('No such file')
@@ -0,0 +1,139 @@
+"""ZIP archives streamed while they are made.
+
+The zipfile module seeks back to write the CRC and sizes of each member, so
+it needs a temporary file. Here the CRC and sizes of each member follow its
+data, in a data descriptor, and the archive is yielded by blocks: the
+download starts at once, and memory use does not depend on the archive size.
+Images, audio, video and archives are stored as they are, as deflating them
+would take time to save nothing. ZIP64 records are only written when a size
+or an offset does not fit in 32 bits.
+"""
+import mimetypes
+import os
+import struct
+import time
+import zlib
+
+BLOCK_SIZE = 64 * 1024
+ZIP64_LIMIT = 0xffffffff
+# Value of the 32 bits fields given in a ZIP64 record.
+ZIP64_MARKER = 0xffffffff
+STORED = 0
+DEFLATED = 8
+# Data descriptor, UTF-8 names.
+FLAGS = 0x08 | 0x800
+COMPRESSED_EXTENSIONS = ('.zip', '.gz', '.bz2', '.xz', '.7z', '.rar', '.epub',
+                         '.docx', '.xlsx', '.pptx', '.odt', '.ods', '.odp',
+                         '.pdf')
+
+FILE_HEADER = '<4sHHHHHLLLHH'
+CENTRAL_HEADER = '<4sHHHHHHLLLHHHHHLL'
+END_RECORD = '<4sHHHHLLH'
+ZIP64_END_RECORD = '<4sQHHLLQQQQ'
+ZIP64_LOCATOR = '<4sLQL'
+
+
+def is_compressed(name):
+    """Tell whether the `name` file is compressed already."""
+    if name.lower().endswith(COMPRESSED_EXTENSIONS):
+        return True
+    content_type, encoding = mimetypes.guess_type(name)
+    return bool(encoding) or (content_type or '').split('/')[0] in (
+        'image', 'audio', 'video')
+
+
+def dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    year = max(t.tm_year, 1980)
+    return ((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+            ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday)
+
+
+def zip64_extra(*values):
+    if not values:
+        return b''
+    return struct.pack('<HH{0}Q'.format(len(values)), 1, 8 * len(values),
+                       *values)
+
+
+def stream_zip(entries, level=6):
+    """Yield the blocks of a ZIP archive of `entries`, a list of (name in
+    the archive, path of the file) tuples."""
+    offset = 0
+    members = []
+    for arcname, path in entries:
+        stat = os.stat(path)
+        name = arcname.encode('utf-8')
+        compress = not is_compressed(path)
+        method = DEFLATED if compress else STORED
+        # Deflate can make the data a bit bigger.
+        zip64 = stat.st_size + stat.st_size // 100 + 1024 >= ZIP64_LIMIT
+        version = 45 if zip64 else 20
+        mtime, mdate = dos_datetime(stat.st_mtime)
+        extra = zip64_extra(0, 0) if zip64 else b''
+        size = ZIP64_MARKER if zip64 else 0
+        header = struct.pack(FILE_HEADER, b'PK\x03\x04', version, FLAGS,
+                             method, mtime, mdate, 0, size, size, len(name),
+                             len(extra)) + name + extra
+        yield header
+        crc = compressed = uncompressed = 0
+        compressor = (zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+                      if compress else None)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+                uncompressed += len(block)
+                crc = zlib.crc32(block, crc)
+                if compressor:
+                    block = compressor.compress(block)
+                if block:
+                    compressed += len(block)
+                    yield block
+        if compressor:
+            block = compressor.flush()
+            compressed += len(block)
+            yield block
+        crc &= 0xffffffff
+        if zip64:
+            descriptor = struct.pack('<4sLQQ', b'PK\x07\x08', crc, compressed,
+                                     uncompressed)
+        else:
+            descriptor = struct.pack('<4sLLL', b'PK\x07\x08', crc, compressed,
+                                     uncompressed)
+        yield descriptor
+        members.append((name, version, method, mtime, mdate, crc, compressed,
+                        uncompressed, offset))
+        offset += len(header) + compressed + len(descriptor)
+
+    start = offset
+    for (name, version, method, mtime, mdate, crc, compressed, uncompressed,
+         member_offset) in members:
+        values = []
+        if uncompressed >= ZIP64_LIMIT:
+            values.append(uncompressed)
+            uncompressed = ZIP64_MARKER
+        if compressed >= ZIP64_LIMIT:
+            values.append(compressed)
+            compressed = ZIP64_MARKER
+        if member_offset >= ZIP64_LIMIT:
+            values.append(member_offset)
+            member_offset = ZIP64_MARKER
+        if values:
+            version = 45
+        extra = zip64_extra(*values)
+        record = struct.pack(
+            CENTRAL_HEADER, b'PK\x01\x02', (3 << 8) | version, version, FLAGS,
+            method, mtime, mdate, crc, compressed, uncompressed, len(name),
+            len(extra), 0, 0, 0, 0o100644 << 16, member_offset)
+        record += name + extra
+        offset += len(record)
+        yield record
+
+    count, size = len(members), offset - start
+    if count >= 0xffff or start >= ZIP64_LIMIT or size >= ZIP64_LIMIT:
+        yield struct.pack(ZIP64_END_RECORD, b'PK\x06\x06', 44, 45, 45, 0, 0,
+                          count, count, size, start)
+        yield struct.pack(ZIP64_LOCATOR, b'PK\x06\x07', 0, offset, 1)
+    yield struct.pack(END_RECORD, b'PK\x05\x06', 0, 0, min(count, 0xffff),
+                      min(count, 0xffff),
+                      ZIP64_MARKER if size >= ZIP64_LIMIT else size,
+                      ZIP64_MARKER if start >= ZIP64_LIMIT else start, 0)
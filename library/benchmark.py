@@ -0,0 +1,255 @@
+"""Benchmark of the OpenLibrary lookups against a local mock server, of the
+local cache, of the offline editions store, and of the library index.
+
+The mock server answers like the OpenLibrary books API, with a configurable
+latency per request, to simulate a slow uplink.
+"""
+import BaseHTTPServer
+import gzip
+import json
+import os
+import random
+import shutil
+import SocketServer
+import tempfile
+import threading
+import time
+import urlparse
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.test import RequestFactory
+
+from . import utils
+from .cache import MetadataCache
+from .editions import EditionStore
+from . import views
+from .models import Book, BookSpecimen
+
+STRATEGIES = (
+    # name, ISBNs per request, concurrent requests.
+    ('one by one', 1, 1),
+    ('batched', utils.OPENLIBRARY_CHUNK_SIZE, 1),
+    ('batched concurrent', utils.OPENLIBRARY_CHUNK_SIZE,
+     utils.OPENLIBRARY_WORKERS),
+)
+
+
+class OpenLibraryHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        query = urlparse.parse_qs(urlparse.urlparse(self.path).query)
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        data = {}
+        for key in query.get('bibkeys', [''])[0].split(','):
+            isbn = key.split(':')[-1]
+            data[key] = {
+                'title': 'Book {0}'.format(isbn),
+                'authors': [{'name': 'Author {0}'.format(isbn)}],
+                'publishers': [{'name': 'Publisher'}],
+            }
+        content = json.dumps(data)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class MockOpenLibrary(object):
+    """Local server knowing every ISBN, to use as a context manager."""
+
+    def __init__(self, latency=0.1):
+        self.server = MockServer(('127.0.0.1', 0), OpenLibraryHandler)
+        self.server.latency = latency
+        self.server.requests = 0
+        self.server.lock = threading.Lock()
+        self.url = 'http://127.0.0.1:{0}/api/books?'.format(
+            self.server.server_port)
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    def __enter__(self):
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def lookup(name, isbns, latency, chunk_size, workers, cache):
+    with MockOpenLibrary(latency=latency) as server:
+        start = time.time()
+        notices = list(utils.fetch_many_from_openlibrary(
+            isbns, chunk_size=chunk_size, workers=workers,
+            base_url=server.url, cache=cache))
+        duration = time.time() - start
+        requests = server.requests
+    return {
+        'strategy': name,
+        'notices': len(notices),
+        'requests': requests,
+        'duration': duration,
+    }
+
+
+def run(count=500, latency=0.1, strategies=STRATEGIES):
+    """Look up `count` ISBNs with each strategy, starting with an empty
+    cache, then once more with the cache warmed by the last strategy. Return
+    one report row per strategy."""
+    isbns = [str(9780000000000 + i) for i in range(count)]
+    report = []
+    root = tempfile.mkdtemp()
+    try:
+        for name, chunk_size, workers in strategies:
+            cache = MetadataCache(tempfile.mkdtemp(dir=root))
+            report.append(lookup(name, isbns, latency, chunk_size, workers,
+                                 cache))
+        report.append(lookup('cached', isbns, latency, chunk_size, workers,
+                             cache))
+    finally:
+        shutil.rmtree(root)
+    return report
+
+
+def make_dump(path, count, seed=42):
+    """Write a gzipped editions dump of `count` synthetic editions, half with
+    an ISBN-10, half with an ISBN-13. Return the ISBNs."""
+    rng = random.Random(seed)
+    isbns = []
+    with gzip.open(path, 'wb') as f:
+        for i in range(count):
+            key = '/books/OL{0}M'.format(i)
+            record = {'key': key, 'title': 'Book {0}'.format(i),
+                      'by_statement': 'Author {0}'.format(rng.randint(0, 999)),
+                      'publishers': ['Publisher']}
+            if i % 2:
+                isbn = '{0:09d}'.format(i)
+                isbn += str(sum((10 - n) * int(d)
+                                for n, d in enumerate(isbn)) * 10 % 11 % 10)
+                record['isbn_10'] = [isbn]
+            else:
+                isbn = str(9790000000000 + i)
+                record['isbn_13'] = [isbn]
+            isbns.append(isbn)
+            f.write('\t'.join(['/type/edition', key, '1',
+                                '2015-01-01T00:00:00', json.dumps(record)]))
+            f.write('\n')
+    return isbns
+
+
+def run_editions(count=100000, lookups=500, seed=42):
+    """Build an editions store from a synthetic dump of `count` editions,
+    then resolve and import `lookups` ISBNs from it (the import is rolled
+    back). Return a dict report."""
+    root = tempfile.mkdtemp()
+    try:
+        dump = os.path.join(root, 'editions.txt.gz')
+        isbns = make_dump(dump, count, seed=seed)
+        store = EditionStore(os.path.join(root, 'editions.sqlite'))
+        start = time.time()
+        lines, stored = store.load(dump)
+        load = time.time() - start
+        sample = random.Random(seed).sample(isbns, min(lookups, count))
+        start = time.time()
+        for isbn in sample:
+            store.get_many([isbn])
+        lookup = time.time() - start
+        cache = MetadataCache(os.path.join(root, 'cache'))
+        with transaction.atomic():
+            start = time.time()
+            # No server listens on this port, every ISBN must be local.
+            notices = utils.fetch_many_from_openlibrary(
+                sample, cache=cache, editions=store,
+                base_url='http://127.0.0.1:9/')
+            books = utils.upsert_books(notices,
+                                       defaults={'section': Book.OTHER})
+            duration = time.time() - start
+            transaction.set_rollback(True)
+        return {
+            'editions': count,
+            'load': load,
+            'load_rate': lines / load,
+            'dump_size': os.path.getsize(dump),
+            'store_size': os.path.getsize(store.path),
+            'lookups': len(sample),
+            'lookup': lookup / len(sample) * 1000000,
+            'imported': len(books),
+            'import_rate': len(books) / duration,
+        }
+    finally:
+        shutil.rmtree(root)
+
+
+def time_it(func, repeat):
+    durations = []
+    for i in range(repeat):
+        start = time.time()
+        func()
+        durations.append((time.time() - start) * 1000)
+    return min(durations)
+
+
+def run_index(count=50000, repeat=5, seed=42):
+    """Create `count` books, a third of them without specimen, and time the
+    available books queries and the library index page, with the former
+    join on specimens and with the specimen_count column. Everything is
+    rolled back. Return one report row per query."""
+    rng = random.Random(seed)
+    factory = RequestFactory()
+    with transaction.atomic():
+        start = Book.objects.count()
+        for offset in range(0, count, 1000):
+            Book.objects.bulk_create([
+                Book(title='Book {0}'.format(rng.random()), section=Book.OTHER)
+                for i in range(min(1000, count - offset))])
+        pks = list(Book.objects.order_by('pk').values_list('pk', flat=True))
+        specimens = [BookSpecimen(book_id=pk, serial='bench-{0}'.format(pk))
+                     for i, pk in enumerate(pks[start:]) if i % 3]
+        for offset in range(0, len(specimens), 1000):
+            BookSpecimen.objects.bulk_create(specimens[offset:offset + 1000])
+        Book.update_specimen_count()
+        joined = Book.objects.filter(specimens__isnull=False).distinct()
+        middle = Book.objects.available().count() // 2
+
+        def page(path='/', **params):
+            request = factory.get(path, params)
+            request.user = AnonymousUser()
+            views.index(request).render()
+
+        queries = [
+            ('count', lambda: joined.count(),
+             lambda: Book.objects.available().count()),
+            ('first page', lambda: list(joined[:10]),
+             lambda: list(Book.objects.available()[:10])),
+            ('middle page', lambda: list(joined[middle:middle + 10]),
+             lambda: list(Book.objects.available()[middle:middle + 10])),
+            ('random book', lambda: joined.order_by('?').first(),
+             lambda: Book.objects.available().order_by('?').first()),
+        ]
+        report = []
+        for name, before, after in queries:
+            report.append({'query': name,
+                           'join': time_it(before, repeat),
+                           'column': time_it(after, repeat)})
+        report.append({'query': 'index page', 'join': None,
+                       'column': time_it(page, repeat)})
+        report.append({'query': 'index middle page', 'join': None,
+                       'column': time_it(lambda: page(
+                           page=middle // views.Index.paginate_by), repeat)})
+        transaction.set_rollback(True)
+    return report
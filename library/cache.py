@@ -0,0 +1,248 @@
+"""Persistent cache of OpenLibrary notices and book covers.
+
+Notices are stored by ISBN in a SQLite database, covers by URL as content
+addressed files next to it, so the whole directory can be copied to another
+box (see the exportlibrarycache and importlibrarycache commands).
+"""
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notice (
+    isbn TEXT PRIMARY KEY,
+    data TEXT,
+    size INTEGER,
+    fetched_at REAL,
+    accessed_at REAL
+);
+CREATE TABLE IF NOT EXISTS cover (
+    url TEXT PRIMARY KEY,
+    digest TEXT,
+    size INTEGER,
+    fetched_at REAL,
+    accessed_at REAL
+);
+CREATE INDEX IF NOT EXISTS cover_digest ON cover (digest);
+"""
+KEYS = {'notice': 'isbn', 'cover': 'url'}
+CHUNK_SIZE = 500
+
+
+# The cache of the settings, by its parameters, and its lock.
+instances = {}
+lock = threading.Lock()
+
+
+def default():
+    """Return the cache configured in settings, shared by all the threads,
+    so its connection is opened once."""
+    key = (settings.LIBRARY_CACHE_ROOT, settings.LIBRARY_CACHE_TTL,
+           settings.LIBRARY_CACHE_MAX_SIZE, settings.LIBRARY_CACHE_MISSING_TTL)
+    with lock:
+        if key not in instances:
+            # The settings changed (in tests): forget the previous cache.
+            for cache in instances.values():
+                cache.close()
+            instances.clear()
+            root, ttl, max_size, missing_ttl = key
+            instances[key] = MetadataCache(root, ttl=ttl, max_size=max_size,
+                                           missing_ttl=missing_ttl)
+        return instances[key]
+
+
+def file_digest(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), ''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def link_or_copy(source, destination):
+    try:
+        os.link(source, destination)
+    except (OSError, AttributeError):
+        shutil.copyfile(source, destination)
+
+
+class MetadataCache(object):
+    """Notices by ISBN and covers by URL, kept `ttl` seconds, within
+    `max_size` bytes (least recently used entries are evicted first).
+
+    Notices are the raw OpenLibrary data; None means OpenLibrary has no
+    notice for this ISBN, which is only kept `missing_ttl` seconds, as the
+    notice may be added later. Safe to use from several threads."""
+
+    def __init__(self, root, ttl=None, max_size=None, missing_ttl=None):
+        self.root = root
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self.max_size = max_size
+        self.covers_root = os.path.join(root, 'covers')
+        if not os.path.isdir(self.covers_root):
+            os.makedirs(self.covers_root)
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(os.path.join(root, 'cache.sqlite'),
+                                  check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _fresh(self):
+        """Return the oldest fetched_at still valid."""
+        return time.time() - self.ttl if self.ttl else 0
+
+    def _fresh_missing(self):
+        """Return the oldest fetched_at of a missing notice still valid."""
+        if self.missing_ttl is None:
+            return self._fresh()
+        return max(self._fresh(), time.time() - self.missing_ttl)
+
+    def cover_path(self, digest):
+        return os.path.join(self.covers_root, digest[:2], digest)
+
+    def get_notices(self, isbns):
+        """Return a dict of the cached notices of `isbns`, by ISBN."""
+        isbns = list(isbns)
+        notices = {}
+        with self.lock:
+            for i in range(0, len(isbns), CHUNK_SIZE):
+                chunk = isbns[i:i + CHUNK_SIZE]
+                sql = ("SELECT isbn, data FROM notice WHERE fetched_at >= ? "
+                       "AND (data != 'null' OR fetched_at >= ?) "
+                       "AND isbn IN ({0})".format(','.join('?' * len(chunk))))
+                rows = self.db.execute(
+                    sql, [self._fresh(), self._fresh_missing()] + chunk)
+                notices.update((isbn, json.loads(data)) for isbn, data in rows)
+            self.db.executemany(
+                'UPDATE notice SET accessed_at = ? WHERE isbn = ?',
+                [(time.time(), isbn) for isbn in notices])
+            self.db.commit()
+        return notices
+
+    def set_notices(self, notices):
+        """Store `notices`, a dict of notices by ISBN."""
+        now = time.time()
+        rows = []
+        for isbn, data in notices.items():
+            data = json.dumps(data)
+            rows.append((isbn, data, len(data), now, now))
+        with self.lock:
+            self.db.executemany(
+                'INSERT OR REPLACE INTO notice VALUES (?, ?, ?, ?, ?)', rows)
+            self.db.commit()
+
+    def get_cover(self, url):
+        """Return the path of the cached cover of `url`, or None."""
+        with self.lock:
+            row = self.db.execute(
+                'SELECT digest FROM cover WHERE url = ? AND fetched_at >= ?',
+                (url, self._fresh())).fetchone()
+            if not row:
+                return None
+            self.db.execute('UPDATE cover SET accessed_at = ? WHERE url = ?',
+                            (time.time(), url))
+            self.db.commit()
+        path = self.cover_path(row[0])
+        return path if os.path.exists(path) else None
+
+    def set_cover(self, url, path, fetched_at=None):
+        """Store the cover of `url`, downloaded at `path`, and return the path
+        of the cached file."""
+        digest = file_digest(path)
+        destination = self.cover_path(digest)
+        if not os.path.exists(destination):
+            if not os.path.isdir(os.path.dirname(destination)):
+                os.makedirs(os.path.dirname(destination))
+            link_or_copy(path, destination)
+        fetched_at = fetched_at or time.time()
+        with self.lock:
+            self.db.execute(
+                'INSERT OR REPLACE INTO cover VALUES (?, ?, ?, ?, ?)',
+                (url, digest, os.path.getsize(destination), fetched_at,
+                 time.time()))
+            self.db.commit()
+        return destination
+
+    def size(self):
+        """Return the size of the cache in bytes (shared covers count
+        once)."""
+        with self.lock:
+            return self.db.execute(
+                'SELECT (SELECT COALESCE(SUM(size), 0) FROM notice) + '
+                '(SELECT COALESCE(SUM(size), 0) FROM '
+                '(SELECT MAX(size) AS size FROM cover GROUP BY digest))'
+            ).fetchone()[0]
+
+    def evict(self):
+        """Remove the expired entries, then the least recently used ones
+        until the cache fits in `max_size`."""
+        with self.lock:
+            digests = set(d for d, in self.db.execute(
+                'SELECT digest FROM cover WHERE fetched_at < ?',
+                (self._fresh(),)))
+            for table in KEYS:
+                self.db.execute(
+                    'DELETE FROM {0} WHERE fetched_at < ?'.format(table),
+                    (self._fresh(),))
+            self.db.execute(
+                "DELETE FROM notice WHERE data = 'null' AND fetched_at < ?",
+                (self._fresh_missing(),))
+            size = self.size()
+            if not self.max_size or size <= self.max_size:
+                rows = []
+            else:
+                rows = self.db.execute(
+                    "SELECT 'notice', isbn, NULL, size, accessed_at "
+                    "FROM notice UNION ALL "
+                    "SELECT 'cover', url, digest, size, accessed_at "
+                    "FROM cover ORDER BY 5").fetchall()
+            for table, key, digest, row_size, accessed_at in rows:
+                if size <= self.max_size:
+                    break
+                self.db.execute('DELETE FROM {0} WHERE {1} = ?'.format(
+                    table, KEYS[table]), (key,))
+                if digest:
+                    digests.add(digest)
+                    if self._used(digest):
+                        continue
+                size -= row_size
+            self.db.commit()
+            for digest in digests:
+                path = self.cover_path(digest)
+                if not self._used(digest) and os.path.exists(path):
+                    os.remove(path)
+
+    def _used(self, digest):
+        return self.db.execute('SELECT 1 FROM cover WHERE digest = ? LIMIT 1',
+                               (digest,)).fetchone() is not None
+
+    def merge(self, other):
+        """Copy the entries of the `other` cache that are fresher than ours.
+        Return the number of notices and of covers copied."""
+        with self.lock:
+            ours = dict(self.db.execute('SELECT isbn, fetched_at FROM notice'))
+            rows = [row for row in other.db.execute(
+                        'SELECT isbn, data, size, fetched_at, accessed_at '
+                        'FROM notice')
+                    if row[3] > ours.get(row[0], 0)]
+            self.db.executemany(
+                'INSERT OR REPLACE INTO notice VALUES (?, ?, ?, ?, ?)', rows)
+            self.db.commit()
+            ours = dict(self.db.execute('SELECT url, fetched_at FROM cover'))
+        covers = 0
+        for url, digest, fetched_at in other.db.execute(
+                'SELECT url, digest, fetched_at FROM cover'):
+            path = other.cover_path(digest)
+            if fetched_at > ours.get(url, 0) and os.path.exists(path):
+                self.set_cover(url, path, fetched_at=fetched_at)
+                covers += 1
+        return len(rows), covers
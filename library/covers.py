@@ -0,0 +1,117 @@
+"""Concurrent download of book covers.
+
+Covers are downloaded by a bounded pool of threads, each URL only once, and
+streamed to temporary files; they are attached to the books once their
+metadata has been saved. Covers of the local cache are not downloaded.
+"""
+import os
+import shutil
+import tempfile
+from multiprocessing.pool import ThreadPool
+
+from django.core.files import File
+
+from ideasbox.http_client import HTTPClientError, client
+
+from . import cache as metadata_cache
+from .models import Book
+
+WORKERS = 8
+
+
+class DownloadedFile(File):
+    """A file already on disk, that the storage can move instead of copying
+    it."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def fetch_cover(url, directory):
+    """Stream the cover at `url` into a file of `directory` and return its
+    path, or None if it can't be downloaded."""
+    name = os.path.basename(url.split('?')[0])
+    if not name:
+        return None
+    fd, path = tempfile.mkstemp(dir=directory, suffix='-' + name)
+    with os.fdopen(fd, 'wb') as f:
+        try:
+            response = client.get(url, stream_to=f)
+        except HTTPClientError:
+            # A missing cover must not fail the import.
+            response = None
+    if not response or not response.ok or not os.path.getsize(path):
+        os.remove(path)
+        return None
+    return path
+
+
+class CoverDownloader(object):
+    """Download covers in background threads, deduplicated by URL.
+
+    Use as a context manager, so the pool and the temporary files are cleaned
+    on exit."""
+
+    def __init__(self, workers=WORKERS, cache=None):
+        self.pool = ThreadPool(workers)
+        self.cache = cache or metadata_cache.default()
+        self.directory = tempfile.mkdtemp(prefix='covers-')
+        self.downloads = {}
+        # Storage names of the covers already attached, by URL.
+        self.saved = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, url):
+        """Schedule the download of `url`, unless already done."""
+        if url and url not in self.downloads:
+            self.downloads[url] = self.pool.apply_async(self.fetch, (url,))
+
+    def fetch(self, url):
+        """Return the path of a temporary copy of the cover of `url`, from
+        the cache or downloaded."""
+        cached = self.cache.get_cover(url)
+        if cached:
+            name = os.path.basename(url.split('?')[0])
+            fd, path = tempfile.mkstemp(dir=self.directory, suffix='-' + name)
+            os.close(fd)
+            shutil.copyfile(cached, path)
+            return path
+        path = fetch_cover(url, self.directory)
+        if path:
+            self.cache.set_cover(url, path)
+        return path
+
+    def get(self, url):
+        """Wait for the download of `url` and return its path, or None."""
+        if url not in self.downloads:
+            return None
+        return self.downloads[url].get()
+
+    def attach(self, books):
+        """Save the downloaded covers of `books`, a list of (book, url) pairs.
+        Books sharing a cover URL share the stored file."""
+        field = Book._meta.get_field('cover')
+        for book, url in books:
+            if url not in self.saved:
+                path = self.get(url)
+                if not path:
+                    continue
+                name = os.path.basename(path).split('-', 1)[1]
+                name = field.generate_filename(book, name)
+                with open(path, 'rb') as f:
+                    self.saved[url] = field.storage.save(
+                        name, DownloadedFile(f))
+            # Cover is not indexed, no need to go through save().
+            Book.objects.filter(pk=book.pk).update(cover=self.saved[url])
+            book.cover = self.saved[url]
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.cache.evict()
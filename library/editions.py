@@ -0,0 +1,170 @@
+"""Offline ISBN resolver, built from an OpenLibrary editions dump.
+
+See https://openlibrary.org/developers/dumps. Editions are stored in a
+SQLite file keyed by their ISBN-13 as an integer, so a lookup is a primary
+key search.
+"""
+import gzip
+import json
+import os
+import re
+import sqlite3
+import time
+
+from django.conf import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS edition (
+    isbn INTEGER PRIMARY KEY,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS progress (
+    source TEXT PRIMARY KEY,
+    position INTEGER,
+    rows INTEGER,
+    done INTEGER
+);
+"""
+COVER_URL = 'https://covers.openlibrary.org/b/id/{0}-M.jpg'
+CHUNK_SIZE = 500
+
+
+def default():
+    """Return the store configured in settings, or None if it has not been
+    built."""
+    if os.path.exists(settings.LIBRARY_EDITIONS_PATH):
+        return EditionStore(settings.LIBRARY_EDITIONS_PATH)
+
+
+def normalize_isbn(value):
+    """Return the ISBN-13 of an ISBN-10 or ISBN-13, as an integer, or None
+    if `value` is not an ISBN."""
+    value = re.sub(r'[^0-9X]', '', (value or '').upper())
+    if len(value) == 10 and value[:9].isdigit():
+        value = '978' + value[:9]
+        check = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(value))
+        value += str((10 - check % 10) % 10)
+    if len(value) != 13 or not value.isdigit():
+        return None
+    return int(value)
+
+
+def parse_edition(line):
+    """Return the ISBNs and the compact data of an edition line, either a
+    dump row (type, key, revision, last modified, JSON) or a JSON line."""
+    record = json.loads(line.rsplit('\t', 1)[-1])
+    isbns = set()
+    for value in record.get('isbn_13', []) + record.get('isbn_10', []):
+        isbn = normalize_isbn(value)
+        if isbn:
+            isbns.add(isbn)
+    publishers = record.get('publishers') or ['']
+    covers = [c for c in record.get('covers', []) if c > 0]
+    data = [record.get('title', ''), record.get('subtitle', ''),
+            record.get('by_statement', '').rstrip(' .'), publishers[0],
+            covers[0] if covers else None]
+    return isbns, data
+
+
+def to_openlibrary(data):
+    """Return compact data shaped as the OpenLibrary books API data."""
+    title, subtitle, authors, publisher, cover = data
+    result = {'title': title, 'subtitle': subtitle}
+    if authors:
+        result['authors'] = [{'name': authors}]
+    if publisher:
+        result['publishers'] = [{'name': publisher}]
+    if cover:
+        result['cover'] = {'medium': COVER_URL.format(cover)}
+    return result
+
+
+def open_dump(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+class EditionStore(object):
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def count(self):
+        return self.db.execute('SELECT COUNT(*) FROM edition').fetchone()[0]
+
+    def get_many(self, isbns):
+        """Return the OpenLibrary data of the known `isbns`, by ISBN."""
+        by_key = {}
+        for isbn in isbns:
+            key = normalize_isbn(isbn)
+            if key:
+                by_key.setdefault(key, []).append(isbn)
+        keys = list(by_key)
+        found = {}
+        for i in range(0, len(keys), CHUNK_SIZE):
+            chunk = keys[i:i + CHUNK_SIZE]
+            rows = self.db.execute(
+                'SELECT isbn, data FROM edition WHERE isbn IN ({0})'.format(
+                    ','.join('?' * len(chunk))), chunk)
+            for key, data in rows:
+                for isbn in by_key[key]:
+                    found[isbn] = to_openlibrary(json.loads(data))
+        return found
+
+    def load(self, source, batch_size=10000, restart=False, progress=None):
+        """Load the editions of the dump at `source`, by batches of
+        `batch_size` lines, each committed with the position reached, so an
+        interrupted load resumes where it stopped. `progress` is called with
+        the number of lines read after each batch. Return the number of
+        lines read, and of editions stored, during this run."""
+        key = os.path.abspath(source)
+        row = self.db.execute(
+            'SELECT position, done FROM progress WHERE source = ?',
+            (key,)).fetchone()
+        if restart or not row:
+            self.db.execute('DELETE FROM progress WHERE source = ?', (key,))
+            position, done = 0, False
+        else:
+            position, done = row
+        if done:
+            return 0, 0
+        lines = stored = 0
+        start = time.time()
+        with open_dump(source) as f:
+            # gzip seeks by decompressing, but in constant memory.
+            f.seek(position)
+            batch = []
+            while True:
+                line = f.readline()
+                if line:
+                    lines += 1
+                    position += len(line)
+                    try:
+                        isbns, data = parse_edition(line)
+                    except (ValueError, AttributeError, TypeError):
+                        # Broken line, skip it.
+                        isbns, data = (), None
+                    data = json.dumps(data, separators=(',', ':'))
+                    batch.extend((isbn, data) for isbn in isbns)
+                if not line or not lines % batch_size:
+                    self.db.executemany(
+                        'INSERT OR REPLACE INTO edition VALUES (?, ?)', batch)
+                    self.db.execute(
+                        'INSERT OR REPLACE INTO progress VALUES (?, ?, '
+                        'COALESCE((SELECT rows FROM progress '
+                        'WHERE source = ?), 0) + ?, ?)',
+                        (key, position, key, len(batch), not line))
+                    self.db.commit()
+                    stored += len(batch)
+                    batch = []
+                    if progress:
+                        progress(lines, time.time() - start)
+                if not line:
+                    break
+        return lines, stored
@@ -1,9 +1,12 @@
 import re
 
 from django import forms
+from django.utils.translation import ugettext_lazy as _
+
+from ideasbox.forms import OptimizeImagesMixin
+from ideasbox.jobs import enqueue, store_file
 
 from .models import BookSpecimen, Book
-from .utils import load_from_moccam_csv, fetch_from_openlibrary
 
 
 class BookSpecimenForm(forms.ModelForm):
@@ -14,7 +17,7 @@ class BookSpecimenForm(forms.ModelForm):
         fields = '__all__'
 
 
-class BookForm(forms.ModelForm):
+class BookForm(OptimizeImagesMixin, forms.ModelForm):
 
     def clean_isbn(self):
         # Keep only integers, and make sure empty values are mapped to None,
@@ -38,31 +41,19 @@ class ImportForm(forms.Form):
     files_format = forms.ChoiceField(choices=FORMATS)
     from_isbn = forms.CharField(widget=forms.Textarea, required=False)
 
-    def save_from_files(self):
-        """Create or update books from given metadata files."""
-        files = self.cleaned_data['from_files']
-        format_ = self.cleaned_data['files_format']
-        if format_ == self.MOCCAM_CSV:
-            handler = load_from_moccam_csv
-        books = []
-        for f in files:
-            for notice in handler(f):
-                notice['section'] = Book.OTHER
-                book, _ = Book.objects.update_or_create(isbn=notice['isbn'],
-                                                        defaults=notice)
-                books.append(book)
-        return books
-
-    def save_from_isbn(self):
-        """Create or update books from given ISBN, using OpenLibrary API."""
+    def clean(self):
+        cleaned_data = super(ImportForm, self).clean()
+        if not (cleaned_data.get('from_files') or
+                cleaned_data.get('from_isbn')):
+            raise forms.ValidationError(_('Give a file or some ISBN.'))
+        return cleaned_data
+
+    def save(self, user=None):
+        """Start a job creating or updating books from given metadata file,
+        or from given ISBN using OpenLibrary API, and return it."""
+        if self.cleaned_data['from_files']:
+            path = store_file(self.cleaned_data['from_files'])
+            return enqueue('library.import', user=user, path=path,
+                           files_format=self.cleaned_data['files_format'])
         isbns = self.cleaned_data['from_isbn'].splitlines()
-        books = []
-        for isbn in isbns:
-            notice = fetch_from_openlibrary(isbn)
-            if not notice:
-                continue
-            notice['section'] = Book.OTHER
-            book, _ = Book.objects.update_or_create(isbn=notice['isbn'],
-                                                    defaults=notice)
-            books.append(book)
-        return books
+        return enqueue('library.import', user=user, isbns=isbns)
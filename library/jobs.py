@@ -0,0 +1,53 @@
+import os
+
+from django.utils.translation import ugettext as _
+
+from ideasbox.jobs import register
+
+from .forms import ImportForm
+from .models import Book
+from .utils import (fetch_many_from_openlibrary, load_from_moccam_csv,
+                    upsert_books)
+
+HANDLERS = {
+    ImportForm.MOCCAM_CSV: load_from_moccam_csv,
+}
+
+
+@register('library.import')
+def import_books(job, path=None, files_format=None, isbns=None):
+    """Create or update books from a notices file at `path` (removed once
+    read, even on failure), or from `isbns` using OpenLibrary."""
+    errors = []
+    reported = [0]
+
+    def progress(processed):
+        # Only the new errors are saved.
+        job.report(done=processed, errors=errors[reported[0]:])
+        reported[0] = len(errors)
+
+    if path:
+        try:
+            with open(path, 'rb') as f:
+                job.report(total=sum(1 for line in f))
+            with open(path, 'rb') as f:
+                notices = HANDLERS[files_format](f, errors=errors)
+                books = upsert_books(notices,
+                                     defaults={'section': Book.OTHER},
+                                     errors=errors, progress=progress)
+        finally:
+            os.remove(path)
+    else:
+        job.report(total=len(isbns))
+        notices = fetch_many_from_openlibrary(isbns, errors=errors)
+        books = upsert_books(notices, defaults={'section': Book.OTHER},
+                             errors=errors, progress=progress)
+    progress(len(books))
+    if books:
+        result = {'message': _('Successfully processed {count} notices.')
+                  .format(count=len(books))}
+        if len(books) == 1:
+            result['url'] = books[0].get_absolute_url()
+    else:
+        result = {'message': _('No notice processed')}
+    return result
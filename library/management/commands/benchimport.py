@@ -0,0 +1,41 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from library import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the OpenLibrary lookups of the book import against a '
+            'local mock server, and against a local editions store. The '
+            'import is rolled back.')
+    option_list = BaseCommand.option_list + (
+        make_option('--isbns', type='int', default=500,
+                    help='Number of ISBNs to look up.'),
+        make_option('--latency', type='float', default=0.1,
+                    help='Latency of the mock server, in seconds.'),
+        make_option('--editions', type='int', default=100000,
+                    help='Size of the synthetic editions dump.'),
+    )
+
+    def handle(self, *args, **options):
+        report = benchmark.run(count=options['isbns'],
+                               latency=options['latency'])
+        line = u'{strategy:<20} {notices:>8} {requests:>9} {duration:>9}'
+        self.stdout.write(line.format(strategy='strategy', notices='notices',
+                                      requests='requests',
+                                      duration='time (s)'))
+        for row in report:
+            self.stdout.write(line.format(
+                strategy=row['strategy'], notices=row['notices'],
+                requests=row['requests'],
+                duration='{0:.2f}'.format(row['duration'])))
+        report = benchmark.run_editions(count=options['editions'],
+                                        lookups=options['isbns'])
+        self.stdout.write(
+            'Editions store: {editions} editions loaded in {load:.1f}s '
+            '({load_rate:.0f} rows/s), dump {dump_size} bytes, store '
+            '{store_size} bytes'.format(**report))
+        self.stdout.write(
+            '{lookups} lookups: {lookup:.0f}us each; import of {imported} '
+            'books: {import_rate:.0f} rows/s'.format(**report))
@@ -0,0 +1,29 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from library import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the available books queries and the library index '
+            'page. Everything is done in a transaction that is rolled back.')
+    option_list = BaseCommand.option_list + (
+        make_option('--books', type='int', default=50000,
+                    help='Number of books created.'),
+        make_option('--repeat', type='int', default=5,
+                    help='How many times each query is run (best is kept).'),
+    )
+
+    def handle(self, *args, **options):
+        report = benchmark.run_index(count=options['books'],
+                                     repeat=options['repeat'])
+        line = u'{query:<18} {join:>10} {column:>10}'
+        self.stdout.write(line.format(query='query', join='join (ms)',
+                                      column='column (ms)'))
+        for row in report:
+            self.stdout.write(line.format(
+                query=row['query'],
+                join='-' if row['join'] is None else '{0:.2f}'.format(
+                    row['join']),
+                column='{0:.2f}'.format(row['column'])))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from library import cache
+
+
+class Command(BaseCommand):
+    args = '<directory>'
+    help = ('Copy the OpenLibrary notices and covers cache to a directory '
+            '(eg. on a USB stick), to import it on another box.')
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError('Usage: exportlibrarycache <directory>')
+        notices, covers = cache.MetadataCache(args[0]).merge(cache.default())
+        self.stdout.write('Exported {0} notices and {1} covers.'.format(
+            notices, covers))
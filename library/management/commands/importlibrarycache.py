@@ -0,0 +1,22 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library import cache
+
+
+class Command(BaseCommand):
+    args = '<directory>'
+    help = ('Import an OpenLibrary notices and covers cache exported with '
+            'exportlibrarycache. Only entries fresher than ours are kept.')
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError('Usage: importlibrarycache <directory>')
+        if not os.path.exists(os.path.join(args[0], 'cache.sqlite')):
+            raise CommandError('No cache found in {0}'.format(args[0]))
+        local = cache.default()
+        notices, covers = local.merge(cache.MetadataCache(args[0]))
+        local.evict()
+        self.stdout.write('Imported {0} notices and {1} covers.'.format(
+            notices, covers))
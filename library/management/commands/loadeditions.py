@@ -0,0 +1,34 @@
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from library.editions import EditionStore
+
+
+class Command(BaseCommand):
+    args = '<dump>'
+    help = ('Load an OpenLibrary editions dump (or a subset of it, gzipped '
+            'or not) into the local ISBN store. An interrupted load resumes '
+            'where it stopped.')
+    option_list = BaseCommand.option_list + (
+        make_option('--batch-size', type='int', default=10000,
+                    help='Lines committed at once.'),
+        make_option('--restart', action='store_true', default=False,
+                    help='Load the dump from the start, even if it was '
+                         'already (partly) loaded.'),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError('Usage: loadeditions <dump>')
+        store = EditionStore(settings.LIBRARY_EDITIONS_PATH)
+        lines, stored = store.load(args[0], batch_size=options['batch_size'],
+                                   restart=options['restart'],
+                                   progress=self.progress)
+        self.stdout.write('Read {0} lines, stored {1} ISBNs; {2} ISBNs '
+                          'known.'.format(lines, stored, store.count()))
+
+    def progress(self, lines, duration):
+        self.stdout.write('{0} lines ({1:.0f} lines/s)'.format(
+            lines, lines / duration if duration else 0))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from library.models import Book
+
+
+class Command(BaseCommand):
+    help = ('Recount the specimens of every book, eg. after specimens have '
+            'been changed without going through the models.')
+
+    def handle(self, *args, **options):
+        Book.update_specimen_count()
+        self.stdout.write('{0} books available out of {1}.'.format(
+            Book.objects.available().count(), Book.objects.count()))
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def count_specimens(apps, schema_editor):
+    Book = apps.get_model('library', 'Book')
+    BookSpecimen = apps.get_model('library', 'BookSpecimen')
+    schema_editor.execute(
+        'UPDATE {book} SET specimen_count = (SELECT COUNT(*) FROM {specimen} '
+        'WHERE {specimen}.book_id = {book}.id)'.format(
+            book=Book._meta.db_table, specimen=BookSpecimen._meta.db_table))
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='specimen_count',
+            field=models.PositiveIntegerField(default=0, editable=False, db_index=True),
+            preserve_default=True,
+        ),
+        migrations.RunPython(count_specimens, noop),
+    ]
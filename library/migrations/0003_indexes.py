@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0002_book_specimen_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+            preserve_default=True,
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='title',
+            field=models.CharField(max_length=300, verbose_name='title', db_index=True),
+            preserve_default=True,
+        ),
+        migrations.AlterField(
+            model_name='bookspecimen',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+            preserve_default=True,
+        ),
+    ]
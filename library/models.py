@@ -1,15 +1,18 @@
 from django.conf import settings
 from django.core.urlresolvers import reverse
-from django.db import models
+from django.db import connection, models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 
 from ideasbox.models import TimeStampedModel
+from ideasbox.pagination import touch
 from search.models import SearchMixin, SearchableQuerySet
 
 
 class BookQuerySet(SearchableQuerySet, models.QuerySet):
     def available(self):
-        return self.filter(specimens__isnull=False).distinct()
+        return self.filter(specimen_count__gt=0)
 
 
 # Create your models here.
@@ -34,7 +37,7 @@ class Book(SearchMixin, TimeStampedModel):
     isbn = models.CharField(max_length=40, unique=True, null=True, blank=True)
     authors = models.CharField(_('authors'), max_length=300, blank=True)
     serie = models.CharField(_('serie'), max_length=300, blank=True)
-    title = models.CharField(_('title'), max_length=300)
+    title = models.CharField(_('title'), max_length=300, db_index=True)
     subtitle = models.CharField(_('subtitle'), max_length=300, blank=True)
     summary = models.TextField(_('summary'), blank=True)
     publisher = models.CharField(_('publisher'), max_length=100, blank=True)
@@ -45,9 +48,14 @@ class Book(SearchMixin, TimeStampedModel):
                             choices=settings.LANGUAGES)
     cover = models.ImageField(_('cover'), upload_to='library/cover',
                               blank=True)
+    # Denormalized, kept up to date by BookSpecimen signals.
+    specimen_count = models.PositiveIntegerField(default=0, editable=False,
+                                                 db_index=True)
 
     objects = BookQuerySet.as_manager()
 
+    index_related = True
+
     class Meta:
         ordering = ['title']
 
@@ -62,6 +70,22 @@ class Book(SearchMixin, TimeStampedModel):
         return (self.title, self.isbn, self.authors, self.subtitle,
                 self.summary, self.serie)
 
+    @classmethod
+    def update_specimen_count(cls, pks=None):
+        """Recount the specimens of the books of `pks`, or of all books."""
+        sql = ('UPDATE {book} SET specimen_count = (SELECT COUNT(*) FROM '
+               '{specimen} WHERE {specimen}.book_id = {book}.id)').format(
+            book=cls._meta.db_table, specimen=BookSpecimen._meta.db_table)
+        params = []
+        if pks is not None:
+            pks = [pk for pk in pks if pk is not None]
+            if not pks:
+                return
+            sql += ' WHERE id IN ({0})'.format(', '.join(['%s'] * len(pks)))
+            params = pks
+        connection.cursor().execute(sql, params)
+        touch(cls)
+
 
 class BookSpecimen(TimeStampedModel):
 
@@ -74,3 +98,19 @@ class BookSpecimen(TimeStampedModel):
 
     def get_absolute_url(self):
         return reverse('library:book_detail', kwargs={'pk': self.book.pk})
+
+
+@receiver(pre_save, sender=BookSpecimen)
+def remember_specimen_book(sender, instance, **kwargs):
+    # The specimen may be moved to another book.
+    instance._previous_book_id = (
+        BookSpecimen.objects.filter(pk=instance.pk)
+                            .values_list('book_id', flat=True).first()
+        if instance.pk else None)
+
+
+@receiver(post_save, sender=BookSpecimen)
+@receiver(post_delete, sender=BookSpecimen)
+def update_specimen_count(sender, instance, **kwargs):
+    Book.update_specimen_count(set([
+        instance.book_id, getattr(instance, '_previous_book_id', None)]))
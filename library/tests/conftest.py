@@ -1,7 +1,15 @@
+import BaseHTTPServer
+import os
+import threading
+from collections import Counter
+
 import pytest
 
 from .factories import BookFactory, BookSpecimenFactory
 
+DATA = os.path.join(os.path.dirname(__file__), '..', '..', 'ideasbox',
+                    'tests', 'data')
+
 
 @pytest.fixture()
 def book():
@@ -11,3 +19,38 @@ def book():
 @pytest.fixture()
 def specimen():
     return BookSpecimenFactory()
+
+
+class CoverHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serve the test images, and count the requests by path."""
+
+    def do_GET(self):
+        self.server.hits[self.path] += 1
+        path = os.path.join(DATA, os.path.basename(self.path))
+        if not os.path.exists(path):
+            self.send_error(404)
+            return
+        with open(path, 'rb') as f:
+            content = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.yield_fixture()
+def cover_server():
+    """Local stand-in for the covers servers."""
+    server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), CoverHandler)
+    server.hits = Counter()
+    server.url = 'http://127.0.0.1:{0}/'.format(server.server_port)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,30 @@
+from library import benchmark
+from library.models import Book
+
+
+def test_run_reports_requests_by_strategy():
+    report = benchmark.run(count=20, latency=0)
+    assert [r['strategy'] for r in report] == [
+        'one by one', 'batched', 'batched concurrent', 'cached']
+    assert all(r['notices'] == 20 for r in report)
+    assert report[0]['requests'] == 20
+    assert report[1]['requests'] == 1
+    assert report[3]['requests'] == 0
+
+
+def test_run_editions_reports_throughput(db):
+    report = benchmark.run_editions(count=50, lookups=10)
+    assert report['editions'] == 50
+    assert report['lookups'] == 10
+    assert report['imported'] == 10
+    assert report['load_rate'] > 0
+    assert not Book.objects.count()
+
+
+def test_run_index_reports_queries_and_rolls_back(db):
+    report = benchmark.run_index(count=30, repeat=1)
+    assert [r['query'] for r in report] == [
+        'count', 'first page', 'middle page', 'random book', 'index page',
+        'index middle page']
+    assert all(r['column'] >= 0 for r in report)
+    assert not Book.objects.count()
@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import time
+
+import pytest
+from django.core.management import call_command
+
+from library import cache
+from library.covers import CoverDownloader
+from library.utils import fetch_many_from_openlibrary
+
+IMAGE = 'ideasbox/tests/data/the-prophet.jpg'
+
+
+@pytest.fixture()
+def metadata(tmpdir):
+    return cache.MetadataCache(str(tmpdir.join('metadata')))
+
+
+def test_notices_are_stored_by_isbn(metadata):
+    metadata.set_notices({'123': {'title': 'Found'}, '456': None})
+    assert metadata.get_notices(['123', '456', '789']) == {
+        '123': {'title': 'Found'}, '456': None}
+
+
+def test_expired_notices_are_ignored(metadata):
+    metadata.ttl = 10
+    metadata.set_notices({'123': {'title': 'Found'}})
+    metadata.db.execute('UPDATE notice SET fetched_at = ?',
+                        (time.time() - 20,))
+    assert metadata.get_notices(['123']) == {}
+    metadata.evict()
+    assert not metadata.db.execute('SELECT * FROM notice').fetchall()
+
+
+def test_missing_notices_expire_sooner(metadata):
+    metadata.ttl, metadata.missing_ttl = 100, 10
+    metadata.set_notices({'123': {'title': 'Found'}, '456': None})
+    metadata.db.execute('UPDATE notice SET fetched_at = ?',
+                        (time.time() - 20,))
+    assert metadata.get_notices(['123', '456']) == {
+        '123': {'title': 'Found'}}
+    metadata.evict()
+    assert metadata.db.execute('SELECT isbn FROM notice').fetchall() == [
+        ('123',)]
+
+
+def test_covers_are_content_addressed(metadata):
+    first = metadata.set_cover('http://example.org/a.jpg', IMAGE)
+    second = metadata.set_cover('http://example.org/b.jpg', IMAGE)
+    assert first == second
+    assert metadata.get_cover('http://example.org/b.jpg') == first
+    assert open(first).read() == open(IMAGE).read()
+    assert metadata.size() == os.path.getsize(IMAGE)
+    assert metadata.get_cover('http://example.org/c.jpg') is None
+
+
+def test_evict_least_recently_used_until_max_size(metadata):
+    metadata.set_cover('http://example.org/a.jpg', IMAGE)
+    metadata.set_notices({'123': {'title': 'Found'}})
+    metadata.db.execute('UPDATE cover SET accessed_at = 0')
+    metadata.max_size = 100
+    metadata.evict()
+    assert metadata.get_cover('http://example.org/a.jpg') is None
+    assert metadata.get_notices(['123'])
+    assert not os.listdir(os.path.join(metadata.covers_root,
+                                       os.listdir(metadata.covers_root)[0]))
+
+
+def test_merge_copies_fresher_entries(metadata, tmpdir):
+    other = cache.MetadataCache(str(tmpdir.join('other')))
+    other.set_notices({'123': {'title': 'New'}})
+    other.set_cover('http://example.org/a.jpg', IMAGE)
+    metadata.set_notices({'456': {'title': 'Ours'}})
+    assert metadata.merge(other) == (1, 1)
+    assert metadata.get_notices(['123', '456']) == {
+        '123': {'title': 'New'}, '456': {'title': 'Ours'}}
+    assert metadata.get_cover('http://example.org/a.jpg')
+    # Nothing fresher anymore.
+    assert metadata.merge(other) == (0, 0)
+
+
+def test_fetch_many_from_openlibrary_uses_cache(monkeypatch, metadata):
+    urls = []
+
+    def read_url(url):
+        urls.append(url)
+        return '{"ISBN:123": {"title": "Found"}}'
+
+    monkeypatch.setattr('library.utils.read_url', read_url)
+    for i in range(2):
+        notices = list(fetch_many_from_openlibrary(['123', '456'],
+                                                   cache=metadata))
+        assert [n['title'] for n in notices] == ['Found']
+    # Missing notices are remembered too.
+    assert len(urls) == 1
+
+
+def test_fetch_many_from_openlibrary_does_not_cache_errors(monkeypatch,
+                                                           metadata):
+    monkeypatch.setattr('library.utils.read_url', lambda x: None)
+    list(fetch_many_from_openlibrary(['123'], cache=metadata))
+    assert metadata.get_notices(['123']) == {}
+
+
+def test_downloader_uses_cache(cover_server, metadata):
+    url = cover_server.url + 'plane.jpg'
+    for i in range(2):
+        with CoverDownloader(cache=metadata) as covers:
+            covers.add(url)
+            assert covers.get(url)
+    assert cover_server.hits['/plane.jpg'] == 1
+    assert metadata.get_cover(url)
+
+
+def test_default_cache_should_be_shared(settings, tmpdir):
+    first = cache.default()
+    assert cache.default() is first
+    settings.LIBRARY_CACHE_ROOT = str(tmpdir.join('other-box'))
+    assert cache.default() is not first
+    with pytest.raises(sqlite3.ProgrammingError):
+        first.size()
+
+
+def test_export_and_import_commands(settings, tmpdir):
+    cache.default().set_notices({'123': {'title': 'Found'}})
+    usb = str(tmpdir.join('usb'))
+    call_command('exportlibrarycache', usb)
+    settings.LIBRARY_CACHE_ROOT = str(tmpdir.join('other-box'))
+    assert not cache.default().get_notices(['123'])
+    call_command('importlibrarycache', usb)
+    assert cache.default().get_notices(['123'])
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from library.covers import CoverDownloader, fetch_cover
+from library.models import Book
+from library.utils import upsert_books
+
+from .factories import BookFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_fetch_cover_streams_to_directory(cover_server, tmpdir):
+    path = fetch_cover(cover_server.url + 'the-prophet.jpg', str(tmpdir))
+    assert os.path.dirname(path) == str(tmpdir)
+    assert path.endswith('-the-prophet.jpg')
+    with open(path, 'rb') as f:
+        assert f.read() == open('ideasbox/tests/data/the-prophet.jpg').read()
+
+
+def test_fetch_cover_returns_none_on_error(cover_server, tmpdir):
+    assert fetch_cover(cover_server.url + 'missing.jpg', str(tmpdir)) is None
+    assert fetch_cover(cover_server.url, str(tmpdir)) is None
+
+
+def test_downloader_dedupes_urls(cover_server):
+    url = cover_server.url + 'plane.jpg'
+    with CoverDownloader(workers=2) as covers:
+        for i in range(5):
+            covers.add(url)
+        assert covers.get(url)
+    assert cover_server.hits['/plane.jpg'] == 1
+
+
+def test_downloader_cleans_temporary_files(cover_server):
+    with CoverDownloader() as covers:
+        covers.add(cover_server.url + 'plane.jpg')
+        path = covers.get(cover_server.url + 'plane.jpg')
+        assert os.path.exists(path)
+    assert not os.path.exists(covers.directory)
+
+
+def test_attach_saves_cover_once_per_url(cover_server):
+    url = cover_server.url + 'plane.jpg'
+    first, second = BookFactory(), BookFactory()
+    third = BookFactory(cover=None)
+    with CoverDownloader() as covers:
+        covers.add(url)
+        covers.add(cover_server.url + 'missing.jpg')
+        covers.attach([(first, url), (second, url),
+                       (third, cover_server.url + 'missing.jpg')])
+    first = Book.objects.get(pk=first.pk)
+    assert first.cover.name.startswith('library/cover/plane')
+    assert Book.objects.get(pk=second.pk).cover.name == first.cover.name
+    assert not Book.objects.get(pk=third.pk).cover
+
+
+def test_upsert_books_attaches_covers(cover_server):
+    notices = [
+        {'isbn': '123', 'title': 'One', 'cover_url': cover_server.url +
+         'plane.jpg'},
+        {'isbn': None, 'title': 'Two', 'cover_url': cover_server.url +
+         'the-prophet.jpg'},
+        {'isbn': '456', 'title': 'Three', 'cover_url': None},
+    ]
+    books = upsert_books(notices, defaults={'section': Book.OTHER})
+    assert len(books) == 3
+    assert Book.objects.get(isbn='123').cover.name.startswith(
+        'library/cover/plane')
+    assert Book.objects.get(title='Two').cover.name.startswith(
+        'library/cover/the-prophet')
+    assert not Book.objects.get(isbn='456').cover
@@ -0,0 +1,113 @@
+import gzip
+import json
+
+import pytest
+from django.core.management import call_command
+
+from library import editions
+from library.utils import fetch_many_from_openlibrary
+
+
+def edition_line(isbn_10=None, isbn_13=None, **kwargs):
+    record = dict(kwargs, key='/books/OL1M')
+    if isbn_10:
+        record['isbn_10'] = [isbn_10]
+    if isbn_13:
+        record['isbn_13'] = [isbn_13]
+    return '\t'.join(['/type/edition', '/books/OL1M', '1',
+                      '2015-01-01T00:00:00', json.dumps(record)]) + '\n'
+
+
+@pytest.fixture()
+def dump(tmpdir):
+    path = str(tmpdir.join('editions.txt.gz'))
+    with gzip.open(path, 'wb') as f:
+        f.write(edition_line(isbn_10='2070379043', title='Les Enchanteurs',
+                             by_statement='Romain Gary.',
+                             publishers=['Gallimard'], covers=[967767]))
+        f.write('broken line\n')
+        f.write(edition_line(isbn_13='978-2-07-061275-8',
+                             title='Le petit prince'))
+        f.write(edition_line(title='No ISBN'))
+    return path
+
+
+@pytest.fixture()
+def store(tmpdir):
+    return editions.EditionStore(str(tmpdir.join('store.sqlite')))
+
+
+@pytest.mark.parametrize('value,expected', [
+    ['2070379043', 9782070379040],
+    ['2-07-037904-3', 9782070379040],
+    ['9782070379040', 9782070379040],
+    ['043942089X', 9780439420891],
+    ['123', None],
+    ['', None],
+    [None, None],
+])
+def test_normalize_isbn(value, expected):
+    assert editions.normalize_isbn(value) == expected
+
+
+def test_parse_edition_reads_dump_rows_and_json_lines():
+    line = edition_line(isbn_10='2070379043', isbn_13='9782070379040',
+                        title='Les Enchanteurs', covers=[-1, 967767])
+    isbns, data = editions.parse_edition(line)
+    assert isbns == set([9782070379040])
+    assert data == ['Les Enchanteurs', '', '', '', 967767]
+    isbns, data = editions.parse_edition(line.split('\t')[-1])
+    assert isbns == set([9782070379040])
+
+
+def test_load_and_get_many(store, dump):
+    assert store.load(dump) == (4, 2)
+    found = store.get_many(['2070379043', '9782070612758', '9780000000000'])
+    assert found['2070379043'] == {
+        'title': 'Les Enchanteurs',
+        'subtitle': '',
+        'authors': [{'name': 'Romain Gary'}],
+        'publishers': [{'name': 'Gallimard'}],
+        'cover': {'medium': 'https://covers.openlibrary.org/b/id/'
+                            '967767-M.jpg'},
+    }
+    assert found['9782070612758']['title'] == 'Le petit prince'
+    assert '9780000000000' not in found
+
+
+def test_load_resumes_where_it_stopped(store, dump):
+
+    def interrupt(lines, duration):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        store.load(dump, batch_size=2, progress=interrupt)
+    assert store.count() == 1
+    # The first two lines are not read again.
+    assert store.load(dump, batch_size=2) == (2, 1)
+    assert store.count() == 2
+    # Nothing left to load.
+    assert store.load(dump) == (0, 0)
+    assert store.load(dump, restart=True) == (4, 2)
+
+
+def test_fetch_many_from_openlibrary_resolves_locally_first(monkeypatch,
+                                                            store, dump):
+    store.load(dump)
+    urls = []
+    monkeypatch.setattr('library.utils.read_url',
+                        lambda url: urls.append(url))
+    notices = list(fetch_many_from_openlibrary(['2070379043', '123'],
+                                               editions=store))
+    assert notices[0]['title'] == 'Les Enchanteurs'
+    assert notices[0]['authors'] == 'Romain Gary'
+    assert notices[0]['isbn'] == '2070379043'
+    # Only the unknown ISBN was requested.
+    assert len(urls) == 1
+    assert '2070379043' not in urls[0]
+
+
+def test_loadeditions_command(settings, dump):
+    assert editions.default() is None
+    call_command('loadeditions', dump)
+    assert editions.default().count() == 2
@@ -24,3 +24,9 @@ def test_objects_should_return_all_books(book, specimen):
     books = Book.objects.all()
     assert specimen.book in books
     assert book in books
+
+
+def test_available_should_not_join_specimens(book, specimen):
+    sql = str(Book.objects.available().query).upper()
+    assert 'JOIN' not in sql
+    assert 'DISTINCT' not in sql
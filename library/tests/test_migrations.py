@@ -0,0 +1,22 @@
+import pytest
+
+from django.core.management import call_command
+from django.db import connection
+
+from library.models import Book
+
+from .factories import BookFactory, BookSpecimenFactory
+
+
+@pytest.mark.django_db(transaction=True)
+def test_specimen_count_migration_should_count_specimens():
+    book = BookFactory()
+    BookSpecimenFactory.create_batch(2, book=book)
+    other = BookFactory()
+    call_command('migrate', 'library', '0001', verbosity=0)
+    assert 'specimen_count' not in [
+        c.name for c in connection.introspection.get_table_description(
+            connection.cursor(), Book._meta.db_table)]
+    call_command('migrate', 'library', verbosity=0)
+    assert Book.objects.get(pk=book.pk).specimen_count == 2
+    assert Book.objects.get(pk=other.pk).specimen_count == 0
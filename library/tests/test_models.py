@@ -1,5 +1,6 @@
 import pytest
 
+from django.core.management import call_command
 from django.db import IntegrityError
 
 from ..models import Book, BookSpecimen
@@ -36,3 +37,32 @@ def test_it_should_not_be_possible_to_have_twice_the_same_isbn():
     BookFactory(isbn='123456')
     with pytest.raises(IntegrityError):
         BookFactory(isbn='123456')
+
+
+def test_specimen_count_should_follow_specimens(book):
+    assert Book.objects.get(pk=book.pk).specimen_count == 0
+    first = BookSpecimen.objects.create(book=book, serial='1')
+    BookSpecimen.objects.create(book=book, serial='2')
+    assert Book.objects.get(pk=book.pk).specimen_count == 2
+    first.delete()
+    assert Book.objects.get(pk=book.pk).specimen_count == 1
+
+
+def test_moving_specimen_should_update_both_books(specimen):
+    other = BookFactory()
+    old = specimen.book
+    specimen.book = other
+    specimen.save()
+    assert Book.objects.get(pk=old.pk).specimen_count == 0
+    assert Book.objects.get(pk=other.pk).specimen_count == 1
+
+
+def test_queryset_delete_should_update_specimen_count(specimen):
+    BookSpecimen.objects.filter(pk=specimen.pk).delete()
+    assert Book.objects.get(pk=specimen.book.pk).specimen_count == 0
+
+
+def test_update_specimen_count_should_fix_counts(specimen):
+    Book.objects.update(specimen_count=5)
+    call_command('updatespecimencounts')
+    assert Book.objects.get(pk=specimen.book.pk).specimen_count == 1
@@ -1,36 +1,163 @@
 # -*- coding: utf-8 -*-
 import pytest
 
-from library.utils import (fetch_from_openlibrary, load_from_moccam_csv,
-                           to_unicode)
+from library.benchmark import MockOpenLibrary
+from library.models import Book
+from library.utils import (detect_encoding, fetch_from_openlibrary,
+                           fetch_many_from_openlibrary, load_from_moccam_csv,
+                           read_url, upsert_books)
+
+from .factories import BookFactory
 
 
 def test_load_from_moccam_csv(monkeypatch):
-    monkeypatch.setattr('library.utils.load_cover_from_url', lambda x: 'xxx')
     with open('library/tests/data/moccam.csv') as f:
         notices = list(load_from_moccam_csv(f.read()))
         assert len(notices) == 2
         assert notices[0]['title'] == 'Les Enchanteurs'
         assert notices[0]['authors'] == 'Romain Gary'
-        assert notices[0]['cover'] == 'xxx'
+        assert notices[0]['cover_url'] == (
+            'http://ec1.images-amazon.com/images/P/'
+            '2070379043.08._AA240_SCLZZZZZZZ_.jpg')
         assert notices[0]['publisher'] == 'Gallimard'
         assert notices[0]['summary'].startswith('Le narrateur')
 
 
 def test_fetch_from_openlibrary(monkeypatch):
     doc = """{"ISBN:2070379043": {"publishers": [{"name": "Gallimard"}], "identifiers": {"isbn_13": ["9782070379040"], "openlibrary": ["OL8838456M"], "isbn_10": ["2070379043"], "goodreads": ["118988"], "librarything": ["1655982"]}, "weight": "7 ounces", "title": "Les Enchanteurs", "url": "https://openlibrary.org/books/OL8838456M/Les_enchanteurs", "number_of_pages": 373, "cover": {"small": "https://covers.openlibrary.org/b/id/967767-S.jpg", "large": "https://covers.openlibrary.org/b/id/967767-L.jpg", "medium": "https://covers.openlibrary.org/b/id/967767-M.jpg"}, "publish_date": "January 22, 1988", "key": "/books/OL8838456M", "authors": [{"url": "https://openlibrary.org/authors/OL123692A/Romain_Gary", "name": "Romain Gary"}]}}"""  # noqa
-    monkeypatch.setattr('library.utils.load_cover_from_url', lambda x: 'xxx')
     monkeypatch.setattr('library.utils.read_url', lambda x: doc)
     notice = fetch_from_openlibrary('2070379043')
     assert notice['title'] == 'Les Enchanteurs'
     assert notice['authors'] == 'Romain Gary'
-    assert notice['cover'] == 'xxx'
+    assert notice['cover_url'] == ('https://covers.openlibrary.org/b/id/'
+                                   '967767-M.jpg')
     assert notice['publisher'] == 'Gallimard'
 
 
-@pytest.mark.parametrize('string', [
-    u'éééé'.encode('latin-1'),
-    u'éééé'
+def test_load_from_moccam_csv_reads_file_objects(monkeypatch):
+    with open('library/tests/data/moccam.csv') as f:
+        notices = list(load_from_moccam_csv(f))
+    assert len(notices) == 2
+    assert notices[1]['title'] == 'Le petit prince'
+
+
+def test_load_from_moccam_csv_detects_latin_1(monkeypatch):
+    with open('library/tests/data/moccam.csv') as f:
+        content = f.read().decode('utf-8').encode('latin-1')
+    notices = list(load_from_moccam_csv(content))
+    assert notices[1]['authors'] == u'Antoine de Saint-Exupéry'
+
+
+def test_load_from_moccam_csv_reports_bad_rows(monkeypatch):
+    with open('library/tests/data/moccam.csv') as f:
+        lines = f.readlines()
+    content = ''.join([lines[0], 'not\ta\tmoccam\trow\n', '\t' * 9 + '\n',
+                       lines[1]])
+    errors = []
+    notices = list(load_from_moccam_csv(content, errors=errors))
+    assert len(notices) == 2
+    assert errors == ['Line 2: badly formatted row.',
+                      'Line 3: missing title.']
+
+
+@pytest.mark.parametrize('sample,expected', [
+    [u'éééé'.encode('utf-8'), 'utf-8'],
+    [u'éééé'.encode('utf-8')[:-1], 'utf-8'],
+    [u'éééé'.encode('latin-1'), 'latin-1'],
+    ['', 'utf-8'],
 ])
-def test_to_unicode(string):
-    assert isinstance(to_unicode(string), unicode)
+def test_detect_encoding(sample, expected):
+    assert detect_encoding(sample) == expected
+
+
+@pytest.mark.django_db
+def test_upsert_books_creates_and_updates_by_isbn():
+    existing = BookFactory(isbn='123', title='Old title', section=2)
+    notices = [
+        {'isbn': '123', 'title': 'New title'},
+        {'isbn': '456', 'title': 'Another book'},
+        {'isbn': '456', 'title': 'Another book, again'},
+    ]
+    books = upsert_books(notices, defaults={'section': Book.OTHER})
+    assert len(books) == 2
+    assert Book.objects.count() == 2
+    existing = Book.objects.get(pk=existing.pk)
+    assert existing.title == 'New title'
+    assert existing.section == 2  # Defaults only apply to new books.
+    assert Book.objects.get(isbn='456').title == 'Another book, again'
+    assert Book.objects.get(isbn='456').section == Book.OTHER
+
+
+@pytest.mark.django_db
+def test_upsert_books_works_by_batches():
+    notices = [{'isbn': str(i), 'title': 'Book {0}'.format(i)}
+               for i in range(25)]
+    books = upsert_books(notices, defaults={'section': Book.OTHER},
+                         batch_size=10)
+    assert len(books) == 25
+    assert Book.objects.count() == 25
+
+
+@pytest.mark.django_db
+def test_upsert_books_indexes_books():
+    upsert_books([{'isbn': '123', 'title': 'Ikinyugunyugu'}],
+                 defaults={'section': Book.OTHER})
+    assert Book.objects.search('Ikinyugunyugu').count() == 1
+
+
+@pytest.mark.django_db
+def test_upsert_books_creates_books_without_isbn():
+    notices = [{'isbn': None, 'title': 'First'},
+               {'isbn': None, 'title': 'Second'}]
+    books = upsert_books(notices, defaults={'section': Book.OTHER})
+    assert len(books) == 2
+    assert Book.objects.filter(isbn__isnull=True).count() == 2
+
+
+@pytest.mark.django_db
+def test_upsert_books_reports_invalid_notices():
+    errors = []
+    notices = [{'isbn': '123', 'title': 'x' * 301},
+               {'isbn': '456', 'title': 'Valid'}]
+    books = upsert_books(notices, defaults={'section': Book.OTHER},
+                         errors=errors)
+    assert [b.isbn for b in books] == ['456']
+    assert len(errors) == 1
+    assert errors[0].startswith('123: title:')
+
+
+def test_fetch_many_from_openlibrary_batches_isbns():
+    isbns = [str(9780000000000 + i) for i in range(7)]
+    errors = []
+    with MockOpenLibrary(latency=0) as server:
+        notices = list(fetch_many_from_openlibrary(
+            isbns + [' ', isbns[0]], errors=errors, chunk_size=3, workers=2,
+            base_url=server.url))
+        assert server.requests == 3
+    assert [n['isbn'] for n in notices] == isbns
+    assert notices[0]['title'] == 'Book 9780000000000'
+    assert not errors
+
+
+def test_fetch_many_from_openlibrary_reports_missing_isbns(monkeypatch):
+    doc = '{"ISBN:123": {"title": "Found"}}'
+    monkeypatch.setattr('library.utils.read_url', lambda x: doc)
+    errors = []
+    notices = list(fetch_many_from_openlibrary(['123', '456'],
+                                               errors=errors))
+    assert [n['title'] for n in notices] == ['Found']
+    assert errors == ['ISBN 456: no notice found.']
+
+
+def test_fetch_many_from_openlibrary_survives_network_errors(monkeypatch):
+    monkeypatch.setattr('library.utils.read_url', lambda x: None)
+    errors = []
+    assert not list(fetch_many_from_openlibrary(['123'], errors=errors))
+    assert len(errors) == 1
+
+
+def test_read_url(cover_server):
+    with open('ideasbox/tests/data/plane.jpg', 'rb') as f:
+        assert read_url(cover_server.url + 'plane.jpg') == f.read()
+    assert read_url(cover_server.url + 'missing.jpg') is None
+    assert read_url('not an url') is None
@@ -1,8 +1,13 @@
+import os
+import re
+
 import pytest
 
 from django.core.urlresolvers import reverse
 from webtest import Upload
 
+from ideasbox.models import Job
+
 from ..models import Book, BookSpecimen
 from ..views import Index
 from .factories import BookSpecimenFactory, BookFactory
@@ -35,6 +40,23 @@ def test_index_page_is_paginated(app, monkeypatch):
     response = app.get('{url}?page=3'.format(url=url), status=404)
 
 
+def test_index_next_links_should_walk_all_books(app, monkeypatch):
+    monkeypatch.setattr(Index, 'paginate_by', 2)
+    specimens = BookSpecimenFactory.create_batch(size=5)
+    response = app.get(reverse('library:index'))
+    seen = []
+    while True:
+        seen.extend(a.text() for a in response.pyquery('.book-list h3')
+                    .items())
+        if not response.pyquery('.next'):
+            break
+        response = response.click(href='after=')
+    assert 'Page 3 of 3.' in response.pyquery('.current').text()
+    assert sorted(seen) == sorted(s.book.title for s in specimens)
+    response = response.click(href='before=')
+    assert 'Page 2 of 3.' in response.pyquery('.current').text()
+
+
 def test_everyone_should_access_book_detail_page(app, book):
     assert app.get(reverse('library:book_detail',
                            kwargs={'pk': book.pk}), status=200)
@@ -190,20 +212,20 @@ def test_should_keep_only_numbers_in_isbn(staffapp):
 
 def test_import_from_isbn(staffapp, monkeypatch):
     doc = """{"ISBN:2070379043": {"publishers": [{"name": "Gallimard"}], "identifiers": {"isbn_13": ["9782070379040"], "openlibrary": ["OL8838456M"], "isbn_10": ["2070379043"], "goodreads": ["118988"], "librarything": ["1655982"]}, "weight": "7 ounces", "title": "Les Enchanteurs", "url": "https://openlibrary.org/books/OL8838456M/Les_enchanteurs", "number_of_pages": 373, "cover": {"small": "https://covers.openlibrary.org/b/id/967767-S.jpg", "large": "https://covers.openlibrary.org/b/id/967767-L.jpg", "medium": "https://covers.openlibrary.org/b/id/967767-M.jpg"}, "publish_date": "January 22, 1988", "key": "/books/OL8838456M", "authors": [{"url": "https://openlibrary.org/authors/OL123692A/Romain_Gary", "name": "Romain Gary"}]}}"""  # noqa
-    monkeypatch.setattr('library.utils.load_cover_from_url', lambda x: 'xxx')
+    monkeypatch.setattr('library.covers.fetch_cover', lambda x, y: None)
     monkeypatch.setattr('library.utils.read_url', lambda x: doc)
     form = staffapp.get(reverse('library:book_import')).forms['import']
     form['from_isbn'] = '2070379043'
-    response = form.submit()
-    response.follow()
+    response = form.submit().follow()
     assert Book.objects.count() == 1
     book = Book.objects.last()
-    # Only one notice processed, we should have been redirected to its page.
-    assert response.location.endswith(book.get_absolute_url())
+    # Only one notice processed, the job links to its page.
+    response = response.click('See the result')
+    assert response.request.path == book.get_absolute_url()
 
 
 def test_import_from_files(staffapp, monkeypatch):
-    monkeypatch.setattr('library.utils.read_url', lambda x: None)
+    monkeypatch.setattr('library.covers.fetch_cover', lambda x, y: None)
     form = staffapp.get(reverse('library:book_import')).forms['import']
     form['from_files'] = Upload('library/tests/data/moccam.csv')
     response = form.submit()
@@ -212,7 +234,7 @@ def test_import_from_files(staffapp, monkeypatch):
 
 
 def test_import_from_files_does_not_duplicate(staffapp, monkeypatch):
-    monkeypatch.setattr('library.utils.read_url', lambda x: None)
+    monkeypatch.setattr('library.covers.fetch_cover', lambda x, y: None)
     path = 'library/tests/data/moccam.csv'
     with open(path) as f:
         isbn = f.read().split('\t')[0]
@@ -225,17 +247,64 @@ def test_import_from_files_does_not_duplicate(staffapp, monkeypatch):
     assert Book.objects.count() == 2
 
 
-def test_import_from_files_load_cover_if_exists(staffapp, monkeypatch):
+def test_import_from_files_load_cover_if_exists(staffapp, cover_server):
     assert Book.objects.count() == 0
     image = 'ideasbox/tests/data/the-prophet.jpg'
-    monkeypatch.setattr(
-        'library.utils.read_url',
-        lambda x: open(image).read()
-    )
+    with open('library/tests/data/moccam.csv') as f:
+        content = re.sub(r'http://[^\t]+_AA240_[^\t]+\.jpg',
+                         cover_server.url + 'the-prophet.jpg', f.read())
     form = staffapp.get(reverse('library:book_import')).forms['import']
-    form['from_files'] = Upload('library/tests/data/moccam.csv')
+    form['from_files'] = Upload('moccam.csv', content)
     response = form.submit()
     response.follow()
     assert Book.objects.count() == 2
     assert Book.objects.last().cover
     assert open(Book.objects.last().cover.path).read() == open(image).read()
+    # Same URL for both books, downloaded once.
+    assert cover_server.hits['/the-prophet.jpg'] == 1
+
+
+def test_import_from_files_reports_invalid_rows(staffapp, monkeypatch):
+    monkeypatch.setattr('library.covers.fetch_cover', lambda x, y: None)
+    with open('library/tests/data/moccam.csv') as f:
+        content = f.read() + 'not\ta\tmoccam\trow\n'
+    form = staffapp.get(reverse('library:book_import')).forms['import']
+    form['from_files'] = Upload('moccam.csv', content)
+    response = form.submit().follow()
+    assert Book.objects.count() == 2
+    assert 'Line 3: badly formatted row.' in response.content
+
+
+def test_import_runs_in_a_job(staffapp, monkeypatch, settings):
+    monkeypatch.setattr('library.covers.fetch_cover', lambda x, y: None)
+    form = staffapp.get(reverse('library:book_import')).forms['import']
+    form['from_files'] = Upload('library/tests/data/moccam.csv')
+    response = form.submit()
+    job = Job.objects.get()
+    assert response.location.endswith(job.get_absolute_url())
+    assert job.name == 'library.import'
+    assert job.status == Job.DONE
+    assert job.user == staffapp.user
+    assert job.done == 2
+    assert job.get_result()['message'] == 'Successfully processed 2 notices.'
+    # The uploaded file is removed once imported.
+    assert not os.listdir(settings.JOBS_ROOT)
+
+
+def test_failed_import_removes_the_uploaded_file(staffapp, monkeypatch,
+                                                 settings):
+    def fail(*args, **kwargs):
+        raise ValueError('Broken notices')
+    monkeypatch.setattr('library.jobs.upsert_books', fail)
+    form = staffapp.get(reverse('library:book_import')).forms['import']
+    form['from_files'] = Upload('library/tests/data/moccam.csv')
+    form.submit()
+    assert Job.objects.get().status == Job.FAILED
+    assert not os.listdir(settings.JOBS_ROOT)
+
+
+def test_import_needs_file_or_isbn(staffapp):
+    form = staffapp.get(reverse('library:book_import')).forms['import']
+    response = form.submit()
+    assert 'Give a file or some ISBN.' in response.content
+    assert not Job.objects.count()
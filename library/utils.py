@@ -1,109 +1,263 @@
+import codecs
 import csv
+import functools
+import itertools
 import json
-import os
 import urllib
-import urllib2
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 
-from django.core.files.base import ContentFile
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
 from django.utils.translation import ugettext as _
 
-OPENLIBRARY_API_URL = 'https://openlibrary.org/api/books?'
-
+from ideasbox.http_client import HTTPClientError, client
+from ideasbox.pagination import touch
+from search.models import RelatedItem, Search
+from . import cache as metadata_cache
+from . import editions as editions_store
+from .covers import CoverDownloader
+from .models import Book
 
-def to_unicode(text):
-    """Do its best to return an unicode string."""
-    if isinstance(text, unicode):
-        return text
-    else:
-        try:
-            text = text.decode('utf-8')
-        except UnicodeDecodeError:
-            text = text.decode('latin-1')
-        return text
+OPENLIBRARY_API_URL = 'https://openlibrary.org/api/books?'
+# ISBNs asked by request, and concurrent requests.
+OPENLIBRARY_CHUNK_SIZE = 50
+OPENLIBRARY_WORKERS = 4
 
 
 def fetch_from_openlibrary(isbn):
     """Fetch notice from Open Library and return a ready to use dict.
     Doc: https://openlibrary.org/dev/docs/api/books."""
+    for notice in fetch_many_from_openlibrary([isbn]):
+        return notice
+
+
+def fetch_many_from_openlibrary(isbns, errors=None,
+                                chunk_size=OPENLIBRARY_CHUNK_SIZE,
+                                workers=OPENLIBRARY_WORKERS,
+                                base_url=OPENLIBRARY_API_URL, cache=None,
+                                editions=None):
+    """Fetch notices from Open Library, asking for `chunk_size` ISBNs per
+    request and running at most `workers` requests at a time. ISBNs found in
+    the local editions store, or in the local cache, are not requested.
+
+    Yield the notices in the order of `isbns`; ISBNs without notice are
+    reported in the `errors` list, if given."""
+    if errors is None:
+        errors = []
+    if cache is None:
+        cache = metadata_cache.default()
+    if editions is None:
+        editions = editions_store.default()
+    isbns = list(OrderedDict.fromkeys(i.strip() for i in isbns if i.strip()))
+    cached = editions.get_many(isbns) if editions else {}
+    cached.update(cache.get_notices(i for i in isbns if i not in cached))
+    missing = [isbn for isbn in isbns if isbn not in cached]
+    chunks = [missing[i:i + chunk_size]
+              for i in range(0, len(missing), chunk_size)]
+    pool = ThreadPool(max(1, min(workers, len(chunks))))
+    try:
+        fetch = functools.partial(_fetch_openlibrary_chunk, base_url=base_url)
+        results = itertools.izip(chunks, pool.imap(fetch, chunks))
+        fetched = {}
+        for isbn in isbns:
+            while isbn not in cached and isbn not in fetched:
+                chunk, data = next(results)
+                found = dict((i, (data or {}).get('ISBN:{0}'.format(i)))
+                             for i in chunk)
+                if data is not None:
+                    # Don't remember network errors as missing notices.
+                    cache.set_notices(found)
+                fetched.update(found)
+            data = cached[isbn] if isbn in cached else fetched.pop(isbn)
+            if data:
+                yield _openlibrary_notice(isbn, data)
+            else:
+                errors.append(_('ISBN {isbn}: no notice found.').format(
+                    isbn=isbn))
+    finally:
+        pool.terminate()
+        cache.evict()
+
+
+def _fetch_openlibrary_chunk(isbns, base_url=OPENLIBRARY_API_URL):
+    """Return the OpenLibrary data of `isbns` by bibkey, or None if it can't
+    be fetched."""
     args = {
         'jscmd': 'data',
         'format': 'json',
+        'bibkeys': ','.join('ISBN:{isbn}'.format(isbn=i) for i in isbns),
     }
-    key = 'ISBN:{isbn}'.format(isbn=isbn)
-    args['bibkeys'] = key
     query = urllib.urlencode(args)
-    url = '{base}{query}'.format(base=OPENLIBRARY_API_URL, query=query)
+    url = '{base}{query}'.format(base=base_url, query=query)
     content = read_url(url)
     try:
-        data = json.loads(content).get(key)
-    except ValueError:
-        return
-    if not data:
-        return
-    url = data.get('cover', {}).get('medium')
-    if url:
-        cover = load_cover_from_url(url)
-    else:
-        cover = None
+        return json.loads(content)
+    except (TypeError, ValueError):
+        return None
+
+
+def _openlibrary_notice(isbn, data):
     publishers = data.get('publishers', [])
     if publishers:
         publisher = publishers[0]['name']
     else:
-        publisher = None
+        publisher = ''
     notice = {
         'isbn': isbn,
         'title': data.get('title'),
         'authors': ', '.join([a['name'] for a in data.get('authors', [])]),
-        'cover': cover,
+        'cover_url': data.get('cover', {}).get('medium'),
         'publisher': publisher
     }
+    if data.get('subtitle'):
+        notice['subtitle'] = data['subtitle']
     return notice
 
 
 def read_url(url):
+    """Return the content at `url`, or None if it can't be fetched."""
     try:
-        response = urllib2.urlopen(url)
-        return response.read()
-    except:
-        # Catch all, we don't want to fail in any way.
+        response = client.get(url)
+    except HTTPClientError:
         return None
+    return response.content if response.ok else None
 
 
-def load_cover_from_url(url):
-    content = read_url(url)
-    name = os.path.basename(url)
-    if content and name:
-        return ContentFile(content, name=name)
+def detect_encoding(sample):
+    """Return the encoding of a bytes sample: utf-8 if it decodes as such
+    (a char cut at the end of the sample is fine), else latin-1."""
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample)
+    except UnicodeDecodeError:
+        return 'latin-1'
+    return 'utf-8'
 
 
-def load_from_moccam_csv(content):
+def load_from_moccam_csv(content, errors=None):
     """Handle Moccam CSV import.
     See http://www.moccam-en-ligne.fr
-    """
+
+    `content` is a file like object (or a string), read line by line. The
+    encoding is detected once from the first lines. Badly formatted rows are
+    skipped and reported in the `errors` list, if given."""
     FIELDS = [
         'isbn', 'title', 'authors', 'publisher', 'collection', 'year', 'price',
         'summary', 'small_cover', 'cover'
     ]
-    content = content.split('\n')
-    rows = csv.DictReader(content, fieldnames=FIELDS, delimiter='\t')
-    if rows.restkey or rows.restval:
-        raise ValueError(_('Badly formatted file'))
+    if errors is None:
+        errors = []
+    if isinstance(content, basestring):
+        content = content.splitlines(True)
+    lines = iter(content)
+    head = list(itertools.islice(lines, 100))
+    encoding = detect_encoding(''.join(head))
+    rows = csv.reader(itertools.chain(head, lines), delimiter='\t')
     for row in rows:
-        if row['cover']:
-            cover = load_cover_from_url(row['cover'])
-        else:
-            cover = None
-        authors = row.get('authors', '')
+        line = rows.line_num
+        if not row:
+            continue
+        if len(row) != len(FIELDS):
+            errors.append(_('Line {line}: badly formatted row.').format(
+                line=line))
+            continue
+        # Moccam sucks in many ways, including encoding.
+        row = dict(zip(FIELDS, [v.decode(encoding, 'replace') for v in row]))
+        if not row['title']:
+            errors.append(_('Line {line}: missing title.').format(line=line))
+            continue
+        authors = row['authors']
         if ',' in authors:
             authors = authors.split(', ')
             authors.reverse()  # They are in the form "Gary, Romain".
             authors = ' '.join(authors)
         yield {
-            'isbn': row['isbn'],
-            # Moccam sucks in many ways, including encoding.
-            'title': to_unicode(row['title']),
-            'authors': to_unicode(authors),
-            'publisher': to_unicode(row['publisher']),
-            'summary': to_unicode(row['summary']),
-            'cover': cover
+            'isbn': row['isbn'].strip() or None,
+            'title': row['title'],
+            'authors': authors,
+            'publisher': row['publisher'],
+            'summary': row['summary'],
+            'cover_url': row['cover'] or None
         }
+
+
+def upsert_books(notices, defaults=None, errors=None, batch_size=500,
+                 progress=None):
+    """Create or update books from notices, matching them by ISBN, and return
+    them.
+
+    Notices are processed by batches, each in a transaction: the existing
+    ISBNs of the batch are fetched in one query, new books are inserted with
+    bulk_create, and existing ones are updated without being loaded. Only new
+    books get `defaults`. Invalid notices are skipped and reported in the
+    `errors` list, if given.
+
+    Covers (the `cover_url` key of notices) are downloaded in background
+    while notices are processed, and attached once the metadata of a batch
+    is committed. `progress` is called with the number of notices processed
+    after each batch."""
+    if errors is None:
+        errors = []
+    books = []
+    batch = []
+    processed = 0
+    with CoverDownloader() as covers:
+        for notice in notices:
+            covers.add(notice.get('cover_url'))
+            batch.append(notice)
+            processed += 1
+            if len(batch) >= batch_size:
+                books.extend(_upsert_batch(batch, defaults or {}, errors))
+                batch = []
+                if progress:
+                    progress(processed)
+        books.extend(_upsert_batch(batch, defaults or {}, errors))
+        if progress:
+            progress(processed)
+        covers.attach([(book, url) for book, url in books if url])
+    books = [book for book, url in books]
+    RelatedItem.refresh_many(books)
+    return books
+
+
+def _upsert_batch(notices, defaults, errors):
+    """Upsert a batch of notices, return a list of (book, cover url)."""
+    # Last notice wins when an ISBN is given twice.
+    by_isbn = OrderedDict()
+    without_isbn = []
+    for notice in notices:
+        notice = dict(notice)
+        url = notice.pop('cover_url', None)
+        book = Book(**dict(defaults, **notice))
+        try:
+            book.clean_fields(exclude=['cover', 'lang'])
+        except ValidationError as e:
+            errors.append(u'{0}: {1}'.format(
+                notice.get('isbn') or notice.get('title'),
+                u' '.join(u'{0}: {1}'.format(k, u' '.join(v))
+                          for k, v in e.message_dict.items())))
+            continue
+        if book.isbn:
+            by_isbn[book.isbn] = notice, url
+        else:
+            without_isbn.append((book, url))
+    existing = dict(Book.objects.filter(isbn__in=by_isbn.keys())
+                                .values_list('isbn', 'pk'))
+    with transaction.atomic():
+        Book.objects.bulk_create([
+            Book(**dict(defaults, **notice))
+            for isbn, (notice, url) in by_isbn.items()
+            if isbn not in existing])
+        now = timezone.now()
+        for isbn, pk in existing.items():
+            values = dict(by_isbn[isbn][0], modified_at=now)
+            Book.objects.filter(pk=pk).update(**values)
+        for book, url in without_isbn:
+            # Can't be fetched back after a bulk_create.
+            book.save()
+        books = list(Book.objects.filter(isbn__in=by_isbn.keys()))
+        Search.index_many(books)
+    # Neither bulk_create nor update send signals.
+    touch(Book)
+    return [(b, by_isbn[b.isbn][1]) for b in books] + without_isbn
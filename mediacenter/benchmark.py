@@ -0,0 +1,136 @@
+"""Benchmark of the serving of a big document, by concurrent clients, with
+the former static view and with ideasbox.media.
+
+The views run in a local threaded WSGI server, as they would behind Apache
+mod_wsgi. "seek" clients want a random slice of the file, as a video player
+does when seeking: the static view ignores Range, so they have to download
+the whole file.
+"""
+import httplib
+import os
+import random
+import SocketServer
+import threading
+import time
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.handlers.wsgi import WSGIRequest
+from django.views.static import serve
+
+from ideasbox.media import serve_file
+
+SLICE = 1024 * 1024
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingWSGIServer(SocketServer.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+def wsgi_view(view):
+    """Return a WSGI application calling `view` with the request path."""
+    def application(environ, start_response):
+        request = WSGIRequest(environ)
+        response = view(request, request.path.lstrip('/'))
+        start_response('{0} {1}'.format(response.status_code,
+                                        response.reason_phrase),
+                       [(k, str(v)) for k, v in response.items()])
+        return response
+    return application
+
+
+VIEWS = {
+    'static': lambda request, path: serve(
+        request, path, document_root=settings.MEDIA_ROOT),
+    'media': lambda request, path: serve_file(
+        request, settings.MEDIA_ROOT, path),
+    'sendfile': lambda request, path: serve_file(
+        request, settings.MEDIA_ROOT, path, sendfile='x-sendfile'),
+}
+
+
+def fetch(port, name, headers):
+    """GET `name` and return the number of bytes received."""
+    connection = httplib.HTTPConnection('127.0.0.1', port)
+    connection.request('GET', '/' + name, headers=headers)
+    response = connection.getresponse()
+    received = 0
+    while True:
+        chunk = response.read(64 * 1024)
+        if not chunk:
+            break
+        received += len(chunk)
+    connection.close()
+    return received
+
+
+def run_clients(port, name, size, clients, requests, seek):
+    """Run `clients` threads sending `requests` requests each; return the
+    number of bytes received."""
+    received = [0]
+    lock = threading.Lock()
+
+    def client(seed):
+        rng = random.Random(seed)
+        for i in range(requests):
+            headers = {}
+            if seek:
+                first = rng.randrange(0, size - SLICE)
+                headers['Range'] = 'bytes={0}-{1}'.format(
+                    first, first + SLICE - 1)
+            count = fetch(port, name, headers)
+            with lock:
+                received[0] += count
+
+    threads = [threading.Thread(target=client, args=(i,))
+               for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return received[0]
+
+
+def run(size=50, concurrency=8, requests=4):
+    """Serve a `size` MB document to `concurrency` clients, each sending
+    `requests` requests, for each view and scenario. Return one report row
+    per run."""
+    name = default_storage.save('benchmark/movie.mp4',
+                                ContentFile(os.urandom(SLICE) * size))
+    size = default_storage.size(name)
+    report = []
+    try:
+        for view, scenario in (('static', 'download'), ('media', 'download'),
+                               ('static', 'seek'), ('media', 'seek'),
+                               ('sendfile', 'download')):
+            server = ThreadingWSGIServer(('127.0.0.1', 0), QuietHandler)
+            server.set_app(wsgi_view(VIEWS[view]))
+            thread = threading.Thread(target=server.serve_forever)
+            thread.daemon = True
+            thread.start()
+            start = time.time()
+            received = run_clients(server.server_port, name, size,
+                                   concurrency, requests,
+                                   seek=scenario == 'seek')
+            duration = time.time() - start
+            server.shutdown()
+            server.server_close()
+            count = concurrency * requests
+            report.append({
+                'view': view, 'scenario': scenario, 'requests': count,
+                'duration': duration,
+                'latency': duration / requests * 1000,
+                'megabytes': received / 1024.0 / 1024,
+            })
+    finally:
+        default_storage.delete(name)
+    return report
+
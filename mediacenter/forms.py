@@ -1,23 +1,105 @@
+import os
+
 from django import forms
+from django.conf import settings
+from django.utils.translation import ugettext_lazy as _
+
+from ideasbox.forms import OptimizeImagesMixin
+from ideasbox.jobs import enqueue
 
-from .models import Document
+from .models import Document, Upload
+from .sniff import sniff_kind, sniff_stored
+from .uploads import finish_upload
 from .utils import guess_kind_from_content_type
 
 
-class DocumentForm(forms.ModelForm):
+class DocumentForm(OptimizeImagesMixin, forms.ModelForm):
+    # Token of a chunked upload of the original, instead of the file.
+    upload = forms.CharField(required=False, widget=forms.HiddenInput)
 
     class Meta:
         model = Document
         fields = '__all__'
 
+    def __init__(self, *args, **kwargs):
+        super(DocumentForm, self).__init__(*args, **kwargs)
+        self.fields['original'].required = False
+        self.chunked_upload = None
+
+    def clean(self):
+        cleaned_data = super(DocumentForm, self).clean()
+        token = cleaned_data.get('upload')
+        if token:
+            upload = Upload.objects.filter(token=token).first()
+            if not upload or not upload.complete:
+                self.add_error('upload', _('The upload is not complete.'))
+            else:
+                self.chunked_upload = upload
+                cleaned_data['original'] = upload.name
+        elif not cleaned_data.get('original'):
+            self.add_error('original',
+                           forms.Field.default_error_messages['required'])
+        return cleaned_data
+
     def save(self, commit=True):
         document = super(DocumentForm, self).save(commit=False)
         original = self.cleaned_data['original']
-        # When editing a form, original is a FileField, not an UploadedFile,
-        # so we don't have content_type.
-        content_type = getattr(original, 'content_type', None)
-        kind = guess_kind_from_content_type(content_type)
+        kind = None
+        if self.chunked_upload:
+            storage = document.original.storage
+            document.original.name = storage.ingest(self.chunked_upload.name)
+            kind = guess_kind_from_content_type(
+                sniff_stored(storage, document.original.name))
+        elif 'original' in self.uploaded_fields():
+            # The content tells better than the browser, which tells better
+            # than the file name (see Document.set_kind).
+            kind = (sniff_kind(original) or
+                    guess_kind_from_content_type(original.content_type))
         if kind:
             document.kind = kind
         document.save()
+        if self.chunked_upload:
+            finish_upload(self.chunked_upload)
+        self.optimize_images(document)
+        if 'original' in self.uploaded_fields() and document.is_media:
+            enqueue('mediacenter.probe', document=document.pk)
         return document
+
+    def uploaded_fields(self):
+        fields = super(DocumentForm, self).uploaded_fields()
+        if self.chunked_upload:
+            fields.append('original')
+        return fields
+
+    def optimize_image(self, instance, name):
+        if name == 'original':
+            # Blobs are named by their content: it can't be changed in place.
+            enqueue('mediacenter.optimize_original', document=instance.pk)
+        else:
+            super(DocumentForm, self).optimize_image(instance, name)
+
+
+class IngestForm(forms.Form):
+    directory = forms.CharField(
+        help_text=_('Where the drive is mounted, eg. /media/usb.'))
+    lang = forms.ChoiceField(
+        choices=[('', '---------')] + list(settings.LANGUAGES),
+        required=False)
+    credits = forms.CharField(max_length=300, required=False)
+
+    def clean_directory(self):
+        directory = os.path.realpath(self.cleaned_data['directory'])
+        roots = [os.path.realpath(r) for r in settings.INGEST_ROOTS]
+        if not any(directory.startswith(os.path.join(root, ''))
+                   for root in roots):
+            raise forms.ValidationError(
+                _('Choose a directory in {roots}.').format(
+                    roots=', '.join(settings.INGEST_ROOTS)))
+        if not os.path.isdir(directory):
+            raise forms.ValidationError(_('No such directory.'))
+        return directory
+
+    def save(self, user=None):
+        """Start a job ingesting the files of the directory, and return
+        it."""
+        return enqueue('mediacenter.ingest', user=user, **self.cleaned_data)
@@ -0,0 +1,198 @@
+"""Bulk ingest of a directory, eg. a USB drive, into the mediacenter.
+
+A drive holds thousands of files: they are hashed, and sniffed on the way,
+by a pool of processes. A file whose content is already in the mediacenter
+is skipped; the others are copied to the content addressed storage, and
+their documents created by batches, with bulk_create and Search.index_many.
+The path, modification time and size of each file are kept, so scanning the
+same drive again only reads the files added or changed since.
+"""
+import hashlib
+import os
+import re
+import stat
+from collections import OrderedDict
+from itertools import imap
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.db import transaction
+
+from ideasbox.pagination import touch
+from search.models import Search
+
+from .models import Blob, Document, IngestedFile, document_storage
+from .probe import probe
+from .sniff import SNIFF_SIZE, sniff
+from .storage import BLOCK_SIZE
+from .utils import guess_kind_from_content_type, guess_kind_from_filename
+
+# Hidden files, and lock files of office suites.
+IGNORED = ('.', '~$')
+
+
+def scan(root):
+    """Yield the (path, mtime, size) of the files under `root`. Symbolic
+    links are skipped: they could point out of the ingest roots."""
+    for directory, dirs, names in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(IGNORED))
+        for name in sorted(names):
+            if name.startswith(IGNORED):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                yield path, st.st_mtime, st.st_size
+
+
+def hash_file(path):
+    """Return the path, SHA-256 digest, sniffed content type and audio or
+    video metadata of the file at `path`, or its path, None and the error
+    met."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(SNIFF_SIZE)
+            digest.update(head)
+            for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+                digest.update(block)
+        content_type = sniff(head)
+        metadata = {}
+        if guess_kind_from_content_type(content_type) in (Document.AUDIO,
+                                                          Document.VIDEO):
+            metadata = probe(path)
+    except (IOError, OSError) as e:
+        return path, None, unicode(e), None
+    return path, digest.hexdigest(), content_type, metadata
+
+
+def make_title(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r'[_\s]+', ' ', name).strip()[:100] or name[:100]
+
+
+def ingest(root, workers=None, batch_size=200, defaults=None, errors=None,
+           progress=None):
+    """Create documents from the files under `root`, by batches of
+    `batch_size`, hashed by `workers` processes. `defaults` are the values
+    of the other fields of the documents. Errors are appended to `errors`,
+    and `progress(done, total)` is called after each batch. Return the
+    counts of files scanned, unchanged since the last ingest, already
+    there, created, updated and failed."""
+    root = os.path.abspath(root)
+    defaults = defaults or {}
+    errors = [] if errors is None else errors
+    known = dict(
+        (path, (mtime, size, document_id)) for path, mtime, size, document_id
+        in IngestedFile.objects.filter(path__startswith=os.path.join(root, ''))
+                               .values_list('path', 'mtime', 'size',
+                                            'document_id').iterator())
+    counts = dict.fromkeys(('scanned', 'unchanged', 'duplicates', 'created',
+                            'updated', 'errors'), 0)
+    # Files of the same content get the title of the first one scanned.
+    changed = OrderedDict()
+    for path, mtime, size in scan(root):
+        counts['scanned'] += 1
+        if known.get(path, ())[:2] == (mtime, size):
+            counts['unchanged'] += 1
+        else:
+            changed[path] = mtime, size
+    total = len(changed)
+    if progress:
+        progress(0, total)
+    workers = workers or settings.INGEST_WORKERS
+    pool = Pool(workers) if workers != 1 else None
+    try:
+        hashed = (pool.imap(hash_file, changed, chunksize=4)
+                  if pool else imap(hash_file, changed))
+        batch = []
+        done = 0
+        for result in hashed:
+            batch.append(result)
+            if len(batch) >= batch_size:
+                ingest_batch(root, batch, changed, known, defaults, counts,
+                             errors)
+                done += len(batch)
+                batch = []
+                if progress:
+                    progress(done, total)
+        if batch:
+            ingest_batch(root, batch, changed, known, defaults, counts,
+                         errors)
+            if progress:
+                progress(total, total)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    if counts['created'] or counts['updated']:
+        # Neither bulk_create nor update send signals.
+        touch(Document)
+    return counts
+
+
+def ingest_batch(root, batch, changed, known, defaults, counts, errors):
+    """Store the files of `batch`, a list of (path, digest, content type,
+    metadata), and create or update their documents."""
+    names = dict((path, document_storage.blob_name(path, digest))
+                 for path, digest, content_type, metadata in batch if digest)
+    present = dict(Document.objects.filter(original__in=names.values())
+                                   .values_list('original', 'pk'))
+    new = {}
+    records = []
+    with transaction.atomic():
+        for path, digest, content_type, metadata in batch:
+            if not digest:
+                counts['errors'] += 1
+                errors.append(u'{0}: {1}'.format(path, content_type))
+                continue
+            name = names[path]
+            record = IngestedFile(path=path, mtime=changed[path][0],
+                                  size=changed[path][1], digest=digest)
+            records.append(record)
+            if name in present or name in new:
+                counts['duplicates'] += 1
+                record.document_id = present.get(name)
+                continue
+            try:
+                document_storage.add_file(path, digest)
+            except (IOError, OSError) as e:
+                records.pop()
+                counts['errors'] += 1
+                errors.append(u'{0}: {1}'.format(path, e))
+                continue
+            kind = (guess_kind_from_content_type(content_type) or
+                    guess_kind_from_filename(path) or Document.OTHER)
+            document_id = known.get(path, (None, None, None))[2]
+            document = Document.objects.filter(pk=document_id).first()
+            if document:
+                # The file changed since it was ingested.
+                document.original.name = name
+                document.kind = kind
+                for key, value in metadata.items():
+                    setattr(document, key, value)
+                document.save()
+                counts['updated'] += 1
+                present[name] = record.document_id = document.pk
+                continue
+            directory = os.path.relpath(os.path.dirname(path), root)
+            new[name] = Document(
+                title=make_title(path), original=name, kind=kind,
+                summary='' if directory == '.' else directory.replace(
+                    os.sep, ' / '),
+                **dict(defaults, **metadata))
+        Document.objects.bulk_create(new.values())
+        documents = list(Document.objects.filter(original__in=new.keys()))
+        Search.index_many(documents)
+        Blob.update_refs(new.keys())
+        created = dict((d.original.name, d.pk) for d in documents)
+        for record in records:
+            if record.document_id is None:
+                record.document_id = created.get(names[record.path])
+        IngestedFile.objects.filter(
+            path__in=[r.path for r in records]).delete()
+        IngestedFile.objects.bulk_create(records)
+    counts['created'] += len(documents)
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.utils.translation import ugettext as _
+
+from ideasbox import images
+from ideasbox.jobs import register
+
+from .ingest import ingest
+from .models import Document
+
+
+@register('mediacenter.optimize_original')
+def optimize_original(job, document):
+    """Optimize the original image of the `document` pk. Blobs are named by
+    their content, so the optimized image is stored as a new blob, and the
+    former one is dropped once no document uses it."""
+    document = Document.objects.get(pk=document)
+    storage = document.original.storage
+    name = document.original.name
+    if settings.IMAGE_KEEP_ORIGINALS:
+        images.keep_original(name)
+    fd, tmp = tempfile.mkstemp(dir=storage.path(storage.prefix),
+                               suffix=os.path.splitext(name)[1])
+    os.close(fd)
+    try:
+        shutil.copyfile(storage.path(name), tmp)
+        before, after = images.optimize_image(tmp)
+        optimized = storage.ingest(os.path.relpath(tmp, storage.location))
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    if optimized != name:
+        document.original.name = optimized
+        document.save()
+    return {'message': u'{0}: {1} bytes saved ({2} to {3}).'.format(
+        optimized, before - after, before, after),
+        'before': before, 'after': after, 'image': optimized}
+
+
+@register('mediacenter.ingest')
+def ingest_directory(job, directory, lang='', credits=''):
+    """Create documents from the files of `directory`."""
+    errors = []
+    reported = [0]
+
+    def progress(done, total):
+        # Only the new errors are saved.
+        job.report(done=done, total=total, errors=errors[reported[0]:])
+        reported[0] = len(errors)
+
+    counts = ingest(directory, defaults={'lang': lang, 'credits': credits},
+                    errors=errors, progress=progress)
+    progress(job.total, job.total)
+    return {'message': _('{created} documents created, {updated} updated, '
+                         '{duplicates} already there, {unchanged} '
+                         'unchanged.').format(**counts),
+            'counts': counts}
+
+
+@register('mediacenter.probe')
+def probe_document(job, document):
+    """Read the duration, picture size and bitrate of the `document` pk."""
+    document = Document.objects.get(pk=document)
+    metadata = document.update_metadata()
+    return {'message': u'{0}: {1}'.format(document, ', '.join(
+        u'{0}={1}'.format(k, v) for k, v in sorted(metadata.items())))}
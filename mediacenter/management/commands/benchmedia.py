@@ -0,0 +1,37 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from mediacenter import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the serving of a big document to concurrent clients, '
+            'downloading it or seeking in it, with the former static view, '
+            'the media view and sendfile.')
+    option_list = BaseCommand.option_list + (
+        make_option('--size', type='int', default=50,
+                    help='Size of the document, in MB.'),
+        make_option('--clients', type='int', default=8,
+                    help='Number of concurrent clients.'),
+        make_option('--requests', type='int', default=4,
+                    help='Number of requests by client.'),
+    )
+
+    def handle(self, *args, **options):
+        report = benchmark.run(size=options['size'],
+                               concurrency=options['clients'],
+                               requests=options['requests'])
+        line = (u'{view:<10} {scenario:<10} {requests:>8} {megabytes:>10} '
+                u'{duration:>9} {latency:>12}')
+        self.stdout.write(line.format(
+            view='view', scenario='scenario', requests='requests',
+            megabytes='sent (MB)', duration='time (s)',
+            latency='request (ms)'))
+        for row in report:
+            self.stdout.write(line.format(
+                view=row['view'], scenario=row['scenario'],
+                requests=row['requests'],
+                megabytes='{0:.1f}'.format(row['megabytes']),
+                duration='{0:.2f}'.format(row['duration']),
+                latency='{0:.0f}'.format(row['latency'])))
@@ -0,0 +1,37 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mediacenter.ingest import ingest
+
+
+class Command(BaseCommand):
+    args = '<directory>'
+    help = ('Create documents from the files of a directory (eg. a USB '
+            'drive), skipping those already there or unchanged since the '
+            'last import.')
+    option_list = BaseCommand.option_list + (
+        make_option('--lang', default='',
+                    help='Language of the documents.'),
+        make_option('--credits', default='',
+                    help='Credits of the documents.'),
+        make_option('--workers', type='int', default=None,
+                    help='Number of processes hashing the files.'),
+        make_option('--batch', type='int', default=200,
+                    help='Number of documents created at once.'),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError('Give the directory to import.')
+        errors = []
+        counts = ingest(args[0], workers=options['workers'],
+                        batch_size=options['batch'], errors=errors,
+                        defaults={'lang': options['lang'],
+                                  'credits': options['credits']})
+        for error in errors:
+            self.stderr.write(error)
+        self.stdout.write(
+            '{scanned} files scanned: {created} documents created, {updated} '
+            'updated, {duplicates} already there, {unchanged} unchanged, '
+            '{errors} errors.'.format(**counts))
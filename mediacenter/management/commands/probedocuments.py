@@ -0,0 +1,53 @@
+from itertools import izip
+from multiprocessing import Pool
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from ideasbox.pagination import touch
+from mediacenter.models import Document, document_storage
+from mediacenter.probe import probe
+
+
+def probe_path(path):
+    try:
+        return probe(path)
+    except (IOError, OSError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Read the duration, picture size and bitrate of the audio and '
+            'video documents, in a pool of processes.')
+    option_list = BaseCommand.option_list + (
+        make_option('--all', action='store_true', default=False,
+                    help='Read them again for every document, not only for '
+                         'those without a duration.'),
+        make_option('--workers', type='int', default=None,
+                    help='Number of processes (one by CPU by default).'),
+    )
+
+    def handle(self, *args, **options):
+        documents = Document.objects.filter(
+            kind__in=(Document.AUDIO, Document.VIDEO)).order_by('pk')
+        if not options['all']:
+            documents = documents.filter(duration__isnull=True)
+        rows = list(documents.values_list('pk', 'original'))
+        pool = Pool(options['workers'])
+        try:
+            results = pool.imap(probe_path, [document_storage.path(original)
+                                             for pk, original in rows],
+                                chunksize=8)
+            count = 0
+            for (pk, original), metadata in izip(rows, results):
+                if metadata is None:
+                    self.stderr.write(u'Cannot read {0}'.format(original))
+                    continue
+                Document.objects.filter(pk=pk).update(**metadata)
+                count += bool(metadata['duration'])
+        finally:
+            pool.close()
+            pool.join()
+        touch(Document)
+        self.stdout.write('{0} documents read, {1} with a duration.'.format(
+            len(rows), count))
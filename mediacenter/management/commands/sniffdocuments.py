@@ -0,0 +1,55 @@
+from collections import defaultdict
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from ideasbox.pagination import touch
+from mediacenter.models import Document, document_storage
+from mediacenter.sniff import sniff_many
+from mediacenter.utils import guess_kind_from_content_type
+
+
+class Command(BaseCommand):
+    help = ('Guess again the kind of the documents from the content of their '
+            'originals, by batches sniffed in parallel.')
+    option_list = BaseCommand.option_list + (
+        make_option('--all', action='store_true', default=False,
+                    help='Check every document, not only the "other" ones.'),
+        make_option('--workers', type='int', default=4,
+                    help='Number of files read at the same time.'),
+        make_option('--batch', type='int', default=500,
+                    help='Number of documents by batch.'),
+        make_option('--dry-run', action='store_true', default=False,
+                    help='Only tell what would be changed.'),
+    )
+
+    def handle(self, *args, **options):
+        documents = Document.objects.order_by('pk')
+        if not options['all']:
+            documents = documents.filter(kind=Document.OTHER)
+        rows = documents.values_list('pk', 'original', 'kind')
+        changed = defaultdict(list)
+        count = 0
+        last = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last)[:options['batch']])
+            if not batch:
+                break
+            last = batch[-1][0]
+            count += len(batch)
+            types = sniff_many(document_storage,
+                               [original for pk, original, kind in batch],
+                               workers=options['workers'])
+            for pk, original, kind in batch:
+                sniffed = guess_kind_from_content_type(types[original])
+                if sniffed and sniffed != kind:
+                    changed[sniffed].append(pk)
+        for kind, pks in changed.items():
+            self.stdout.write(u'{0}: {1} documents'.format(kind, len(pks)))
+            if not options['dry_run']:
+                Document.objects.filter(pk__in=pks).update(kind=kind)
+        if changed and not options['dry_run']:
+            touch(Document)
+        self.stdout.write('{0} documents checked, {1} {2}.'.format(
+            count, sum(len(pks) for pks in changed.values()),
+            'to change' if options['dry_run'] else 'changed'))
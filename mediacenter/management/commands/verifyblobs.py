@@ -0,0 +1,39 @@
+from datetime import timedelta
+from itertools import chain
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from mediacenter.models import Blob
+
+
+class Command(BaseCommand):
+    help = ('Hash the document originals again to detect bit rot: first the '
+            'blobs never verified, then the least recently verified ones. '
+            'With --max-size, each run only hashes a slice of them.')
+    option_list = BaseCommand.option_list + (
+        make_option('--max-size', type='int', default=0,
+                    help='Stop after hashing this many megabytes '
+                         '(0 for no limit).'),
+        make_option('--days', type='int', default=30,
+                    help='Only hash blobs not verified for this many days.'),
+    )
+
+    def handle(self, *args, **options):
+        max_size = options['max_size'] * 1024 * 1024
+        limit = timezone.now() - timedelta(days=options['days'])
+        blobs = chain(
+            Blob.objects.filter(verified_at__isnull=True).order_by('pk'),
+            Blob.objects.filter(verified_at__lt=limit).order_by('verified_at'))
+        count = corrupt = size = 0
+        for blob in blobs:
+            if max_size and size >= max_size:
+                break
+            if not blob.verify():
+                corrupt += 1
+                self.stderr.write(u'Corrupt: {0}'.format(blob.name))
+            count += 1
+            size += blob.size
+        self.stdout.write('{0} blobs verified ({1:.1f} MB), {2} corrupt.'
+                          .format(count, size / 1024.0 / 1024, corrupt))
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediacenter', '0002_upload_blob_ingestedfile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='duration',
+            field=models.FloatField(db_index=True, verbose_name='duration', null=True, editable=False, blank=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='width',
+            field=models.PositiveIntegerField(verbose_name='width', null=True, editable=False, blank=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='height',
+            field=models.PositiveIntegerField(verbose_name='height', null=True, editable=False, blank=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='bitrate',
+            field=models.PositiveIntegerField(verbose_name='bitrate', null=True, editable=False, blank=True),
+            preserve_default=True,
+        ),
+        migrations.AlterIndexTogether(
+            name='document',
+            index_together=set([('kind', 'duration')]),
+        ),
+    ]
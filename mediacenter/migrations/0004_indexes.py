@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediacenter', '0003_document_metadata'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+            preserve_default=True,
+        ),
+        migrations.AlterIndexTogether(
+            name='document',
+            index_together=set([('kind', 'duration'), ('kind', 'modified_at'), ('lang', 'modified_at')]),
+        ),
+    ]
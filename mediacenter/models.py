@@ -1,12 +1,23 @@
+import os
+import uuid
+
 from django.conf import settings
 from django.core.urlresolvers import reverse
 from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 from ideasbox.models import TimeStampedModel
+from ideasbox.pagination import touch
 from search.models import SearchableQuerySet, SearchMixin
+from .probe import probe
+from .storage import ContentAddressedStorage, blob_digest, file_digest
 from .utils import guess_kind_from_filename
 
+document_storage = ContentAddressedStorage(prefix='mediacenter/document')
+
 
 class DocumentQuerySet(SearchableQuerySet, models.QuerySet):
     def image(self):
@@ -48,15 +59,32 @@ class Document(SearchMixin, TimeStampedModel):
     lang = models.CharField(_('Language'), max_length=10, blank=True,
                             choices=settings.LANGUAGES)
     original = models.FileField(_('original'),
-                                upload_to='mediacenter/document')
+                                upload_to='mediacenter/document',
+                                storage=document_storage)
     preview = models.ImageField(_('preview'), upload_to='mediacenter/preview',
                                 blank=True)
     credits = models.CharField(_('credit'), max_length=300)
     kind = models.CharField(_('type'), max_length=5, choices=TYPE_CHOICES,
                             default=OTHER)
+    # Audio and video metadata, see mediacenter.probe.
+    duration = models.FloatField(_('duration'), null=True, blank=True,
+                                 editable=False, db_index=True)
+    width = models.PositiveIntegerField(_('width'), null=True, blank=True,
+                                        editable=False)
+    height = models.PositiveIntegerField(_('height'), null=True, blank=True,
+                                         editable=False)
+    bitrate = models.PositiveIntegerField(_('bitrate'), null=True,
+                                          blank=True, editable=False)
 
     objects = DocumentQuerySet.as_manager()
 
+    index_related = True
+
+    class Meta(TimeStampedModel.Meta):
+        # For the index, filtered by kind or language.
+        index_together = [('kind', 'modified_at'), ('lang', 'modified_at'),
+                          ('kind', 'duration')]
+
     def __unicode__(self):
         return self.title
 
@@ -78,3 +106,127 @@ class Document(SearchMixin, TimeStampedModel):
     @property
     def index_strings(self):
         return (self.title, self.summary, self.credits)
+
+    @property
+    def is_media(self):
+        return self.kind in (self.AUDIO, self.VIDEO)
+
+    def update_metadata(self):
+        """Read the duration, picture size and bitrate of the original, and
+        save them, without changing the modification time."""
+        metadata = probe(self.original.path)
+        Document.objects.filter(pk=self.pk).update(**metadata)
+        for name, value in metadata.items():
+            setattr(self, name, value)
+        touch(Document)
+        return metadata
+
+
+def make_token():
+    return uuid.uuid4().hex
+
+
+class Upload(models.Model):
+    """A document original uploaded by chunks (see mediacenter.uploads)."""
+
+    token = models.CharField(max_length=32, unique=True, default=make_token)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True,
+                             on_delete=models.SET_NULL)
+    # Storage name of the file, written in place chunk after chunk.
+    name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    # CRC32 of the bytes received so far.
+    crc32 = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    modified_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __unicode__(self):
+        return self.name
+
+    @property
+    def complete(self):
+        return self.offset >= self.size
+
+    def as_dict(self):
+        return {'token': self.token, 'name': self.name, 'size': self.size,
+                'offset': self.offset, 'crc32': '{0:08x}'.format(self.crc32),
+                'complete': self.complete}
+
+
+class Blob(models.Model):
+    """A document original of the content addressed storage, with the number
+    of documents using it."""
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    refs = models.PositiveIntegerField(default=0)
+    verified_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    corrupt = models.BooleanField(default=False)
+
+    def __unicode__(self):
+        return self.name
+
+    @property
+    def digest(self):
+        return blob_digest(self.name)
+
+    @classmethod
+    def update_refs(cls, names):
+        """Recount the documents using the blobs `names`. A blob no document
+        uses anymore is deleted, but not its file: a document may be saving
+        the same content meanwhile, or the deletion be rolled back. The
+        cleanmedia command removes it later (see ideasbox.mediagc)."""
+        for name in set(n for n in names if n and blob_digest(n)):
+            refs = Document.objects.filter(original=name).count()
+            if refs:
+                blob, created = cls.objects.get_or_create(
+                    name=name, defaults={'refs': refs})
+                if not created and blob.refs != refs:
+                    cls.objects.filter(pk=blob.pk).update(refs=refs)
+                if created and document_storage.exists(name):
+                    blob.size = document_storage.size(name)
+                    blob.save(update_fields=['size'])
+            else:
+                cls.objects.filter(name=name).delete()
+
+    def verify(self):
+        """Hash the file again, mark the blob as corrupt if the digest does
+        not match its name, and return whether it matches."""
+        path = document_storage.path(self.name)
+        self.corrupt = (not os.path.exists(path) or
+                        file_digest(path) != self.digest)
+        self.verified_at = timezone.now()
+        self.save(update_fields=['corrupt', 'verified_at'])
+        return not self.corrupt
+
+
+@receiver(pre_save, sender=Document)
+def remember_document_original(sender, instance, **kwargs):
+    # The original may be replaced.
+    instance._previous_original = (
+        Document.objects.filter(pk=instance.pk)
+                        .values_list('original', flat=True).first()
+        if instance.pk else None)
+
+
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+def update_blob_refs(sender, instance, **kwargs):
+    Blob.update_refs([instance.original.name,
+                      getattr(instance, '_previous_original', None)])
+
+
+class IngestedFile(models.Model):
+    """A file of a directory ingested into the mediacenter (see
+    mediacenter.ingest), to only read it again once changed."""
+
+    path = models.CharField(max_length=1000, unique=True)
+    mtime = models.FloatField()
+    size = models.BigIntegerField()
+    digest = models.CharField(max_length=64)
+    document = models.ForeignKey(Document, null=True, blank=True,
+                                 on_delete=models.SET_NULL)
+
+    def __unicode__(self):
+        return self.path
@@ -0,0 +1,325 @@
+"""Duration, picture size and bitrate of audio and video files.
+
+Only the headers are parsed, in pure Python: the ID3 tag and first frame of
+an MP3 (with its Xing or VBRI header for variable bitrates), the moov box of
+an MP4, the first and last pages of an Ogg stream, and the Info and Tracks
+elements of a WebM (Matroska) file. The file is mapped in memory, so only
+the pages of those bytes are read from the disk, even when the MP4 index is
+at the end of a big video.
+"""
+import mmap
+import os
+import struct
+
+MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384,
+             416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320,
+             384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256,
+             320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224,
+             256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_BITRATES[(2, 3)] = MP3_BITRATES[(2, 2)]
+MP3_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+# Bytes searched for the first frame of an MP3, after its ID3 tag.
+MP3_SYNC_WINDOW = 64 * 1024
+# Bytes searched for the last page of an Ogg stream.
+OGG_TAIL = 64 * 1024
+
+EBML_HEADER = 0x1a45dfa3
+SEGMENT = 0x18538067
+INFO = 0x1549a966
+TIMECODE_SCALE = 0x2ad7b1
+DURATION = 0x4489
+TRACKS = 0x1654ae6b
+TRACK_ENTRY = 0xae
+VIDEO = 0xe0
+PIXEL_WIDTH = 0xb0
+PIXEL_HEIGHT = 0xba
+CLUSTER = 0x1f43b675
+
+
+def probe(path):
+    """Return a dict of the duration (seconds), width, height (pixels) and
+    bitrate (bits by second) of the audio or video file at `path`, with
+    None for what is not known."""
+    metadata = dict.fromkeys(('duration', 'width', 'height', 'bitrate'))
+    size = os.path.getsize(path)
+    if not size:
+        return metadata
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            head = mm[:12]
+            if head[:4] == b'OggS':
+                parser = probe_ogg
+            elif head[4:8] == b'ftyp':
+                parser = probe_mp4
+            elif head[:4] == b'\x1a\x45\xdf\xa3':
+                parser = probe_ebml
+            else:
+                parser = probe_mp3
+            try:
+                metadata.update(parser(mm) or {})
+            except (struct.error, IndexError, ValueError, KeyError):
+                # Broken or unknown header.
+                pass
+        finally:
+            mm.close()
+    if metadata['duration'] and not metadata['bitrate']:
+        metadata['bitrate'] = int(size * 8 / metadata['duration'])
+    return metadata
+
+
+def probe_mp3(mm):
+    start = 0
+    if mm[:3] == b'ID3':
+        flags = ord(mm[5])
+        start = 10 + sum((ord(c) & 0x7f) << (7 * (3 - i))
+                         for i, c in enumerate(mm[6:10]))
+        if flags & 0x10:
+            start += 10  # Footer.
+    header = None
+    end = min(len(mm) - 4, start + MP3_SYNC_WINDOW)
+    position = mm.find(b'\xff', start, end)
+    while 0 <= position < end:
+        header = mp3_frame(mm[position:position + 4])
+        if header:
+            break
+        position = mm.find(b'\xff', position + 1, end)
+    if not header:
+        return None
+    version, layer, bitrate, sample_rate, mono = header
+    samples = 384 if layer == 1 else (
+        1152 if layer == 2 or version == 1 else 576)
+    if version == 1:
+        xing = position + (21 if mono else 36)
+    else:
+        xing = position + (13 if mono else 21)
+    frames = None
+    if mm[xing:xing + 4] in (b'Xing', b'Info'):
+        flags, = struct.unpack('>L', mm[xing + 4:xing + 8])
+        if flags & 1:
+            frames, = struct.unpack('>L', mm[xing + 8:xing + 12])
+    elif mm[position + 36:position + 40] == b'VBRI':
+        frames, = struct.unpack('>L', mm[position + 50:position + 54])
+    if frames:
+        return {'duration': frames * samples / float(sample_rate)}
+    # Constant bitrate: the size of the frames tells the duration.
+    end = len(mm)
+    if mm[end - 128:end - 125] == b'TAG':
+        end -= 128  # ID3v1 tag.
+    return {'duration': (end - position) * 8.0 / bitrate,
+            'bitrate': bitrate}
+
+
+def mp3_frame(header):
+    """Return the version, layer, bitrate, sample rate and mono flag of the
+    MPEG audio frame `header`, or None if it is not one."""
+    b1, b2, b3 = [ord(c) for c in header[1:4]]
+    if b1 & 0xe0 != 0xe0:
+        return None
+    version = {3: 1, 2: 2, 0: 2.5}.get((b1 >> 3) & 3)
+    layer = 4 - ((b1 >> 1) & 3)
+    bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 3
+    if (version is None or layer == 4 or bitrate_index in (0, 15) or
+            rate_index == 3):
+        return None
+    bitrates = MP3_BITRATES[(1 if version == 1 else 2, layer)]
+    return (version, layer, bitrates[bitrate_index] * 1000,
+            MP3_SAMPLE_RATES[version][rate_index], (b3 >> 6) == 3)
+
+
+def mp4_boxes(mm, start, end):
+    """Yield the (type, data start, end) of the boxes between `start` and
+    `end`."""
+    while start + 8 <= end:
+        size, kind = struct.unpack('>L4s', mm[start:start + 8])
+        data = start + 8
+        if size == 1:
+            size, = struct.unpack('>Q', mm[data:data + 8])
+            data += 8
+        elif size == 0:
+            size = end - start
+        if size < data - start:
+            return
+        yield kind, data, start + size
+        start += size
+
+
+def probe_mp4(mm):
+    metadata = {}
+    for kind, data, end in mp4_boxes(mm, 0, len(mm)):
+        if kind != b'moov':
+            continue
+        for kind, data, end in mp4_boxes(mm, data, end):
+            if kind == b'mvhd':
+                if ord(mm[data]) == 1:
+                    scale, duration = struct.unpack(
+                        '>LQ', mm[data + 20:data + 32])
+                else:
+                    scale, duration = struct.unpack(
+                        '>LL', mm[data + 12:data + 20])
+                if scale:
+                    metadata['duration'] = duration / float(scale)
+            elif kind == b'trak':
+                for kind, data, end in mp4_boxes(mm, data, end):
+                    if kind != b'tkhd':
+                        continue
+                    offset = data + (88 if ord(mm[data]) == 1 else 76)
+                    width, height = struct.unpack(
+                        '>LL', mm[offset:offset + 8])
+                    # 16.16 fixed point numbers.
+                    if width >> 16 > metadata.get('width', 0):
+                        metadata['width'] = width >> 16
+                        metadata['height'] = height >> 16
+        break
+    return metadata
+
+
+def ogg_page(mm, position):
+    """Return the header type, granule position, serial number and start of
+    the first packet of the Ogg page at `position`, and the position of the
+    next page."""
+    header_type, granule, serial = struct.unpack(
+        '<BqL', mm[position + 5:position + 18])
+    count = ord(mm[position + 26])
+    lacing = [ord(c) for c in mm[position + 27:position + 27 + count]]
+    data = position + 27 + count
+    return (header_type, granule, serial, mm[data:data + 64],
+            data + sum(lacing))
+
+
+def probe_ogg(mm):
+    streams = {}
+    position = 0
+    # The first pages start each stream, with its identification header.
+    while mm[position:position + 4] == b'OggS':
+        header_type, granule, serial, packet, position = ogg_page(
+            mm, position)
+        if not header_type & 0x02:
+            break
+        if packet.startswith(b'\x01vorbis'):
+            rate, bitrate = struct.unpack('<L4xl', packet[12:24])
+            streams[serial] = {'rate': rate,
+                               'bitrate': bitrate if bitrate > 0 else None}
+        elif packet.startswith(b'OpusHead'):
+            # Opus granule positions are always at 48kHz.
+            streams[serial] = {'rate': 48000}
+        elif packet.startswith(b'\x80theora'):
+            width, height = [struct.unpack('>L', b'\x00' + packet[i:i + 3])[0]
+                             for i in (14, 17)]
+            numerator, denominator = struct.unpack('>LL', packet[22:30])
+            shift = (struct.unpack('>H', packet[40:42])[0] >> 5) & 0x1f
+            streams[serial] = {'width': width, 'height': height,
+                               'fps': numerator / float(denominator),
+                               'shift': shift}
+    if not streams:
+        return None
+    metadata = {}
+    for stream in streams.values():
+        if 'width' in stream:
+            metadata['width'] = stream['width']
+            metadata['height'] = stream['height']
+    # The last page of a stream tells its length.
+    durations = {}
+    end = len(mm)
+    start = max(0, end - OGG_TAIL)
+    position = mm.rfind(b'OggS', start, end)
+    while position >= 0 and len(durations) < len(streams):
+        header_type, granule, serial, packet, next_page = ogg_page(
+            mm, position)
+        stream = streams.get(serial)
+        if stream and serial not in durations and granule >= 0:
+            if 'rate' in stream:
+                durations[serial] = granule / float(stream['rate'])
+            else:
+                frames = ((granule >> stream['shift']) +
+                          (granule & ((1 << stream['shift']) - 1)))
+                durations[serial] = frames / stream['fps']
+        position = mm.rfind(b'OggS', start, position)
+    if durations:
+        metadata['duration'] = max(durations.values())
+    bitrates = [s['bitrate'] for s in streams.values() if s.get('bitrate')]
+    if len(bitrates) == len(streams):
+        metadata['bitrate'] = sum(bitrates)
+    return metadata
+
+
+def ebml_vint(mm, position, keep_marker=False):
+    """Return the EBML variable size integer at `position`, and the position
+    after it. Sizes of unknown length are None."""
+    first = ord(mm[position])
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8:
+        raise ValueError('Invalid EBML integer')
+    value = first if keep_marker else first & (0xff >> length)
+    for c in mm[position + 1:position + length]:
+        value = (value << 8) | ord(c)
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        value = None
+    return value, position + length
+
+
+def ebml_elements(mm, start, end):
+    """Yield the (id, data start, end) of the elements between `start` and
+    `end`."""
+    while start < end:
+        element, position = ebml_vint(mm, start, keep_marker=True)
+        size, data = ebml_vint(mm, position)
+        stop = end if size is None else data + size
+        yield element, data, stop
+        if size is None:
+            return
+        start = stop
+
+
+def ebml_uint(mm, start, end):
+    value = 0
+    for c in mm[start:end]:
+        value = (value << 8) | ord(c)
+    return value
+
+
+def probe_ebml(mm):
+    metadata = {}
+    scale, duration = 1000000, None
+    for element, data, end in ebml_elements(mm, 0, len(mm)):
+        if element != SEGMENT:
+            continue
+        for element, data, end in ebml_elements(mm, data, end):
+            if element == INFO:
+                for element, data, end in ebml_elements(mm, data, end):
+                    if element == TIMECODE_SCALE:
+                        scale = ebml_uint(mm, data, end)
+                    elif element == DURATION:
+                        duration, = struct.unpack(
+                            '>f' if end - data == 4 else '>d', mm[data:end])
+            elif element == TRACKS:
+                for entry, data, end in ebml_elements(mm, data, end):
+                    if entry != TRACK_ENTRY:
+                        continue
+                    for element, data, end in ebml_elements(mm, data, end):
+                        if element != VIDEO:
+                            continue
+                        for element, data, end in ebml_elements(mm, data,
+                                                                end):
+                            if element == PIXEL_WIDTH:
+                                metadata['width'] = ebml_uint(mm, data, end)
+                            elif element == PIXEL_HEIGHT:
+                                metadata['height'] = ebml_uint(mm, data, end)
+            elif element == CLUSTER and duration is not None and metadata:
+                break
+        break
+    if duration is not None:
+        metadata['duration'] = duration * scale / 1e9
+    return metadata
@@ -0,0 +1,133 @@
+"""Content type of the documents, from their first bytes.
+
+File names and the content types sent by browsers are often wrong (a video
+named "lesson.dat", a PDF sent as application/octet-stream), so the kind of
+a document is first guessed from the magic bytes its format starts with.
+Only the first SNIFF_SIZE bytes are read. As the originals are named by
+their content (see mediacenter.storage), the verdict for a stored file is
+cached by its digest.
+"""
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .probe import mp3_frame
+from .storage import blob_digest
+from .utils import guess_kind_from_content_type
+
+SNIFF_SIZE = 4096
+CACHE_KEY = 'mediacenter:sniff:{0}'
+
+# (offset, magic bytes, content type), tried in order.
+SIGNATURES = (
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (0, b'II*\x00', 'image/tiff'),
+    (0, b'MM\x00*', 'image/tiff'),
+    (0, b'%PDF-', 'application/pdf'),
+    (0, b'ID3', 'audio/mpeg'),
+    (0, b'fLaC', 'audio/flac'),
+    (0, b'FLV\x01', 'video/x-flv'),
+    (0, b'\x00\x00\x01\xba', 'video/mpeg'),
+    (0, b'\x00\x00\x01\xb3', 'video/mpeg'),
+)
+RIFF_TYPES = {
+    b'WEBP': 'image/webp',
+    b'WAVE': 'audio/wav',
+    b'AVI ': 'video/x-msvideo',
+}
+MP4_AUDIO_BRANDS = (b'M4A ', b'M4B ', b'M4P ')
+
+
+def sniff(head):
+    """Return the content type told by the first bytes `head` of a file, or
+    None if they are not known."""
+    for offset, magic, content_type in SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            return content_type
+    if head[:4] == b'RIFF':
+        return RIFF_TYPES.get(head[8:12])
+    if head[4:8] == b'ftyp':
+        brand = head[8:12]
+        if brand in MP4_AUDIO_BRANDS:
+            return 'audio/mp4'
+        return 'video/quicktime' if brand == b'qt  ' else 'video/mp4'
+    if head[:4] == b'OggS':
+        return 'video/ogg' if b'theora' in head else 'audio/ogg'
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        return 'video/webm' if b'webm' in head[:64] else 'video/x-matroska'
+    if is_mpeg_audio(head):
+        return 'audio/mpeg'
+    return None
+
+
+def is_mpeg_audio(head):
+    """Tell whether `head` starts with two MPEG layer II or III audio
+    frames, as an MP3 without ID3 tag does. Checking the header fields and
+    the second frame keeps out the files starting with the same bits by
+    chance, such as UTF-16 text and its byte order mark."""
+    header = mp3_frame(head[:4]) if head[:1] == b'\xff' else None
+    if not header:
+        return False
+    version, layer, bitrate, sample_rate, mono = header
+    if layer == 1:
+        return False
+    padding = (ord(head[2]) >> 1) & 1
+    factor = 72 if layer == 3 and version != 1 else 144
+    length = factor * bitrate // sample_rate + padding
+    second = head[length:length + 4]
+    return (len(second) == 4 and second[:1] == b'\xff' and
+            mp3_frame(second) is not None)
+
+
+def sniff_file(file_):
+    """Return the content type of the opened `file_`, leaving it at the
+    position it was."""
+    position = file_.tell()
+    file_.seek(0)
+    head = file_.read(SNIFF_SIZE)
+    file_.seek(position)
+    return sniff(head)
+
+
+def sniff_kind(file_):
+    return guess_kind_from_content_type(sniff_file(file_))
+
+
+def sniff_stored(storage, name):
+    """Return the content type of the `name` file of `storage`, cached by
+    its digest for blobs."""
+    digest = blob_digest(name)
+    cache = caches[settings.SNIFF_CACHE]
+    key = CACHE_KEY.format(digest)
+    if digest:
+        content_type = cache.get(key)
+        if content_type is not None:
+            return content_type or None
+    with storage.open(name) as f:
+        content_type = sniff(f.read(SNIFF_SIZE))
+    if digest:
+        # The content of a blob never changes.
+        cache.set(key, content_type or '', None)
+    return content_type
+
+
+def sniff_many(storage, names, workers=4):
+    """Return a dict of the content types of the `names` files of `storage`,
+    sniffed by `workers` threads (the time goes into disk seeks)."""
+    names = list(set(names))
+
+    def safe_sniff(name):
+        try:
+            return sniff_stored(storage, name)
+        except (IOError, OSError):
+            return None
+
+    pool = ThreadPool(workers)
+    try:
+        return dict(zip(names, pool.map(safe_sniff, names)))
+    finally:
+        pool.close()
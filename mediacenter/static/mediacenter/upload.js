@@ -0,0 +1,149 @@
+/*
+ * Chunked, resumable upload of the original of a document: the file is sent
+ * by chunks to the upload API (see mediacenter.uploads), then the form is
+ * submitted with the upload token instead of the file.
+ * CRC32 rather than SHA: crypto.subtle is not there on plain http.
+ */
+(function () {
+    'use strict';
+
+    var CHUNK_SIZE = 1024 * 1024,
+        RETRIES = 10,
+        TABLE = [];
+
+    for (var n = 0; n < 256; n++) {
+        var c = n;
+        for (var k = 0; k < 8; k++) {
+            c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1;
+        }
+        TABLE[n] = c >>> 0;
+    }
+
+    function crc32(bytes) {
+        var crc = 0xffffffff;
+        for (var i = 0; i < bytes.length; i++) {
+            crc = TABLE[(crc ^ bytes[i]) & 0xff] ^ (crc >>> 8);
+        }
+        return ((crc ^ 0xffffffff) >>> 0).toString(16);
+    }
+
+    function csrfToken() {
+        var match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+        return match ? match[1] : '';
+    }
+
+    function request(method, url, body, headers, callback) {
+        var xhr = new XMLHttpRequest();
+        xhr.open(method, url);
+        xhr.setRequestHeader('X-CSRFToken', csrfToken());
+        for (var name in headers) {
+            xhr.setRequestHeader(name, headers[name]);
+        }
+        xhr.onload = function () {
+            var data = null;
+            try {
+                data = JSON.parse(xhr.responseText);
+            } catch (e) {}
+            callback(xhr.status, data);
+        };
+        xhr.onerror = function () {
+            callback(0, null);
+        };
+        xhr.send(body);
+    }
+
+    function upload(url, file, progress, done, fail) {
+        var state, retries = RETRIES;
+
+        function retry() {
+            if (!retries--) {
+                return fail();
+            }
+            // Ask where the upload is, then go on from there.
+            setTimeout(function () {
+                request('GET', state.url, null, {}, function (status, data) {
+                    if (status === 200) {
+                        state.offset = data.offset;
+                    }
+                    next();
+                });
+            }, 1000);
+        }
+
+        function send(chunk, first, last) {
+            var headers = {
+                'Content-Range': 'bytes ' + first + '-' + last + '/' +
+                                 file.size,
+                'X-Chunk-CRC32': crc32(new Uint8Array(chunk))
+            };
+            request('PUT', state.url, chunk, headers, function (status, data) {
+                if (status === 200 || status === 409) {
+                    state.offset = data.offset;
+                    retries = RETRIES;
+                    return next();
+                }
+                retry();
+            });
+        }
+
+        function next() {
+            progress(state.offset, file.size);
+            if (state.offset >= file.size) {
+                return done(state.token);
+            }
+            var last = Math.min(state.offset + CHUNK_SIZE, file.size) - 1,
+                reader = new FileReader(),
+                first = state.offset;
+            reader.onload = function () {
+                send(reader.result, first, last);
+            };
+            reader.readAsArrayBuffer(file.slice(first, last + 1));
+        }
+
+        var body = new FormData();
+        body.append('filename', file.name);
+        body.append('size', file.size);
+        request('POST', url, body, {}, function (status, data) {
+            if (status !== 201) {
+                return fail();
+            }
+            state = data;
+            state.url = url + data.token + '/';
+            next();
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        var form = document.getElementById('model_form'),
+            input = form && form.querySelector('input[name=original]'),
+            token = form && form.querySelector('input[name=upload]');
+        if (!input || !token || !window.FileReader) {
+            return;
+        }
+        var script = document.querySelector('script[data-upload-url]'),
+            url = script.getAttribute('data-upload-url'),
+            busy = false;
+        form.addEventListener('submit', function (event) {
+            var file = input.files[0];
+            if (busy || token.value || !file) {
+                return;
+            }
+            event.preventDefault();
+            busy = true;
+            var status = document.createElement('progress');
+            input.parentNode.appendChild(status);
+            upload(url, file, function (offset, size) {
+                status.max = size;
+                status.value = offset;
+            }, function (value) {
+                token.value = value;
+                // Do not send the file again with the form.
+                input.disabled = true;
+                form.submit();
+            }, function () {
+                busy = false;
+                status.parentNode.removeChild(status);
+            });
+        });
+    });
+})();
@@ -0,0 +1,124 @@
+"""Content addressed storage of the document originals.
+
+Teachers upload the same files again and again. Each file is stored once,
+named by the SHA-256 of its content, in directories sharded by its first
+bytes (eg. "mediacenter/document/3f/a2/3fa2...e1.pdf") so none grows too
+big. The digest is computed while the upload is written, and an upload
+already stored is dropped. Blob rows (see mediacenter.models) count the
+documents using each file, and the verifyblobs command re-hashes them to
+detect bit rot. Files no document uses anymore are removed by cleanmedia.
+"""
+import errno
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOCK_SIZE = 64 * 1024
+BLOB_RE = re.compile(r'^[0-9a-f]{64}$')
+
+# Read once: os.umask changes it for the whole process, and files created
+# meanwhile by other threads would be writable by anyone.
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of the file at `path`."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def blob_digest(name):
+    """Return the digest in the blob `name`, or None if `name` is not a
+    blob (eg. a file stored before deduplication)."""
+    digest = os.path.splitext(os.path.basename(name))[0]
+    return digest if BLOB_RE.match(digest) else None
+
+
+def makedirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage saving each content once, under `prefix`."""
+
+    def __init__(self, prefix='', **kwargs):
+        super(ContentAddressedStorage, self).__init__(**kwargs)
+        self.prefix = prefix
+
+    def blob_name(self, name, digest):
+        """Return the name of the blob of `digest`, with the extension of
+        `name`, so the kind of file can still be told from its name."""
+        ext = os.path.splitext(name)[1].lower()
+        return os.path.join(self.prefix, digest[:2], digest[2:4],
+                            digest + ext)
+
+    def get_available_name(self, name):
+        # The name is made from the content in _save.
+        return name
+
+    def _save(self, name, content):
+        directory = self.path(self.prefix)
+        makedirs(directory)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.part')
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    f.write(chunk)
+            return self.store(tmp, self.blob_name(name, digest.hexdigest()))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def ingest(self, name):
+        """Move the `name` file of the storage (eg. a chunked upload) to its
+        blob, and return the blob name."""
+        path = self.path(name)
+        return self.store(path, self.blob_name(name, file_digest(path)))
+
+    def add_file(self, path, digest=None):
+        """Copy the file at `path`, out of the storage, to its blob, and
+        return the blob name. With its `digest`, a file already stored is
+        not read."""
+        if digest:
+            name = self.blob_name(path, digest)
+            if self.exists(name):
+                return name
+        with open(path, 'rb') as f:
+            return self.save(os.path.join(self.prefix,
+                                          os.path.basename(path)), File(f))
+
+    def store(self, path, name):
+        """Move the file at `path` to the blob `name`, unless it is already
+        stored, and return `name`."""
+        destination = self.path(name)
+        if os.path.exists(destination):
+            os.remove(path)
+            # A blob no document used may be collected: it is young again.
+            os.utime(destination, None)
+            return name
+        makedirs(os.path.dirname(destination))
+        os.rename(path, destination)
+        mode = self.file_permissions_mode
+        if mode is None:
+            # mkstemp makes it readable by its owner only.
+            mode = 0o666 & ~UMASK
+        os.chmod(destination, mode)
+        return name
@@ -1,16 +1,44 @@
 from django import template
 from django.contrib.staticfiles.templatetags.staticfiles import static
 
+from ideasbox.templatetags.ideasbox_tags import srcset, thumbnail
+
 register = template.Library()
 
 
+def preview_file(inst):
+    """Return the image file showing the document, if any."""
+    if inst.preview:
+        return inst.preview
+    elif inst.kind == inst.IMAGE:
+        return inst.original
+
+
 @register.filter()
-def preview_url(inst):
+def preview_url(inst, preset='small'):
     """Do its best to return a preview URL that makes sense according to
     document instance given as parameter."""
-    if inst.preview:
-        return inst.preview.url
-    elif inst.kind == inst.IMAGE:
-        return inst.original.url
+    file_ = preview_file(inst)
+    if file_:
+        return thumbnail(file_, preset)
     else:
         return static('mediacenter/document.svg')
+
+
+@register.filter()
+def preview_srcset(inst):
+    """Return the srcset of the preview of the document, or an empty
+    string."""
+    return srcset(preview_file(inst))
+
+
+@register.filter()
+def duration(seconds):
+    """Format a number of seconds as h:mm:ss, or m:ss under an hour."""
+    if seconds is None or seconds == '':
+        return ''
+    minutes, seconds = divmod(int(round(float(seconds))), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return '{0}:{1:02d}:{2:02d}'.format(hours, minutes, seconds)
+    return '{0}:{1:02d}'.format(minutes, seconds)
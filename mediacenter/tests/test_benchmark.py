@@ -0,0 +1,11 @@
+from mediacenter import benchmark
+
+
+def test_run_reports_bytes_sent_by_view():
+    report = benchmark.run(size=2, concurrency=2, requests=1)
+    rows = dict(((r['view'], r['scenario']), r) for r in report)
+    assert rows['static', 'download']['megabytes'] == 4
+    assert rows['media', 'download']['megabytes'] == 4
+    assert rows['static', 'seek']['megabytes'] == 4
+    assert rows['media', 'seek']['megabytes'] == 2
+    assert rows['sendfile', 'download']['megabytes'] == 0
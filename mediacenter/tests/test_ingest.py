@@ -0,0 +1,119 @@
+import os
+from StringIO import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+
+from search.models import Search
+
+from ..ingest import ingest
+from ..models import Blob, Document, IngestedFile
+from .factories import DocumentFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.yield_fixture()
+def drive(tmpdir):
+    drive = tmpdir.mkdir('usb')
+    drive.join('Lesson_one.pdf').write('%PDF-1.4 lesson one')
+    drive.join('.hidden.pdf').write('%PDF-1.4 hidden')
+    maths = drive.mkdir('Maths').mkdir('Grade 3')
+    maths.join('fractions.dat').write('\x00\x00\x00\x18ftypmp42 fractions')
+    maths.join('copy.pdf').write('%PDF-1.4 lesson one')
+    yield drive
+    for document in Document.objects.all():
+        document.delete()
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_ingest_should_create_documents(drive, workers):
+    counts = ingest(str(drive), workers=workers, batch_size=2,
+                    defaults={'lang': 'fr', 'credits': 'Teachers'})
+    assert counts['scanned'] == 3
+    assert counts['created'] == 2
+    assert counts['duplicates'] == 1
+    lesson = Document.objects.get(title='Lesson one')
+    assert lesson.kind == Document.PDF
+    assert lesson.lang == 'fr'
+    assert lesson.credits == 'Teachers'
+    assert lesson.original.read() == '%PDF-1.4 lesson one'
+    video = Document.objects.get(title='fractions')
+    assert video.kind == Document.VIDEO
+    assert video.summary == 'Maths / Grade 3'
+    assert Search.objects.filter(model='Document').count() == 2
+    assert Blob.objects.get(name=lesson.original.name).refs == 1
+    assert IngestedFile.objects.count() == 3
+    assert IngestedFile.objects.filter(document=lesson).count() == 2
+
+
+def test_ingest_should_skip_documents_already_there(drive):
+    document = DocumentFactory(original__data='%PDF-1.4 lesson one',
+                               original__filename='lesson.pdf')
+    counts = ingest(str(drive), workers=1)
+    assert counts['created'] == 1
+    assert counts['duplicates'] == 2
+    assert IngestedFile.objects.filter(document=document).count() == 2
+
+
+def test_rescan_should_only_read_changed_files(drive):
+    ingest(str(drive), workers=1)
+    counts = ingest(str(drive), workers=1)
+    assert counts['unchanged'] == 3
+    assert counts['created'] == 0
+    lesson = drive.join('Lesson_one.pdf')
+    lesson.write('%PDF-1.4 lesson one, second edition')
+    os.utime(str(lesson), (1, 1))
+    drive.join('new.mp3').write('ID3 new')
+    counts = ingest(str(drive), workers=1)
+    assert counts['unchanged'] == 2
+    assert counts['updated'] == 1
+    assert counts['created'] == 1
+    document = Document.objects.get(title='Lesson one')
+    assert document.original.read() == '%PDF-1.4 lesson one, second edition'
+    assert Document.objects.get(title='new').kind == Document.AUDIO
+    assert Document.objects.count() == 3
+
+
+def test_ingest_should_skip_symlinks(drive, tmpdir):
+    secret = tmpdir.join('default.sqlite')
+    secret.write('SQLite format 3\x00')
+    drive.join('notes.pdf').mksymlinkto(secret)
+    drive.join('Linked').mksymlinkto(tmpdir)
+    counts = ingest(str(drive), workers=1)
+    assert counts['scanned'] == 3
+    assert not Document.objects.filter(title='notes').exists()
+
+
+def test_ingestdirectory_command(drive):
+    stdout = StringIO()
+    call_command('ingestdirectory', str(drive), workers=1, stdout=stdout)
+    assert '3 files scanned: 2 documents created' in stdout.getvalue()
+
+
+def test_staff_can_ingest_a_drive(staffapp, drive, settings):
+    settings.INGEST_ROOTS = [str(drive.dirpath())]
+    settings.INGEST_WORKERS = 1
+    form = staffapp.get(reverse('mediacenter:document_ingest')).forms[
+        'ingest']
+    form['directory'] = str(drive)
+    form['credits'] = 'Teachers'
+    response = form.submit().follow()
+    assert '2 documents created' in response.content
+    assert Document.objects.filter(credits='Teachers').count() == 2
+
+
+def test_cannot_ingest_out_of_ingest_roots(staffapp, drive, settings):
+    settings.INGEST_ROOTS = [str(drive.join('Maths'))]
+    form = staffapp.get(reverse('mediacenter:document_ingest')).forms[
+        'ingest']
+    form['directory'] = str(drive)
+    response = form.submit()
+    assert 'Choose a directory in' in response.content
+    assert not Document.objects.count()
+
+
+def test_non_staff_cannot_ingest(loggedapp):
+    loggedapp.get(reverse('mediacenter:document_ingest'), status=302)
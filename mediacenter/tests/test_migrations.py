@@ -0,0 +1,19 @@
+import pytest
+
+from django.core.management import call_command
+from django.db import connection
+
+from ..models import Document
+
+
+def columns():
+    return [c.name for c in connection.introspection.get_table_description(
+        connection.cursor(), Document._meta.db_table)]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_metadata_migration_should_add_columns():
+    call_command('migrate', 'mediacenter', '0002', verbosity=0)
+    assert 'duration' not in columns()
+    call_command('migrate', 'mediacenter', verbosity=0)
+    assert set(['duration', 'width', 'height', 'bitrate']) <= set(columns())
@@ -0,0 +1,172 @@
+import struct
+from StringIO import StringIO
+
+import pytest
+from webtest import Upload
+
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+
+from ..ingest import ingest
+from ..models import Document
+from ..probe import probe
+from ..templatetags.mediacenter_tags import duration
+from .factories import DocumentFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def mp3(frames=None, size=16000):
+    """MPEG 1 layer III at 128kbps and 44.1kHz, after an ID3v2 tag."""
+    tag = b'ID3\x03\x00\x00\x00\x00\x00\x0a' + b'\x00' * 10
+    frame = b'\xff\xfb\x90\x00' + b'\x00' * 32
+    if frames:
+        frame += b'Xing' + struct.pack('>LL', 1, frames)
+    return tag + frame + b'\x00' * (size - len(frame))
+
+
+def box(kind, data):
+    return struct.pack('>L4s', 8 + len(data), kind) + data
+
+
+def mp4(scale=600, length=600 * 90, width=640, height=360):
+    mvhd = struct.pack('>4xLLLL', 0, 0, scale, length) + b'\x00' * 80
+    tkhd = (b'\x00' * 76 + struct.pack('>LL', width << 16, height << 16))
+    moov = box(b'mvhd', mvhd) + box(b'trak', box(b'tkhd', tkhd))
+    return (box(b'ftyp', b'isom\x00\x00\x02\x00') + box(b'mdat', b'\x00' * 64)
+            + box(b'moov', moov))
+
+
+def ogg_page(header_type, granule, serial, packet):
+    return (b'OggS\x00' + struct.pack('<BqLLLB', header_type, granule, serial,
+                                      0, 0, 1) + chr(len(packet)) + packet)
+
+
+def ogg():
+    vorbis = (b'\x01vorbis' + struct.pack('<LBLlll', 0, 2, 44100, 0, 96000,
+                                          0) + b'\x00\x01')
+    theora = (b'\x80theora\x03\x02\x01' + struct.pack('>HH', 40, 23) +
+              struct.pack('>L', 640)[1:] + struct.pack('>L', 360)[1:] +
+              b'\x00\x00' + struct.pack('>LL', 25, 1) + b'\x00' * 10 +
+              struct.pack('>H', 6 << 5))
+    return (ogg_page(2, 0, 1, theora) + ogg_page(2, 0, 2, vorbis) +
+            ogg_page(0, 0, 1, b'\x00' * 100) +
+            # 250 frames at 25 fps, the last keyframe being the 200th.
+            ogg_page(4, (200 << 6) | 50, 1, b'\x00' * 10) +
+            ogg_page(4, 441000, 2, b'\x00' * 10))
+
+
+def ebml(element, data):
+    return element + chr(0x80 | len(data)) + data
+
+
+def webm():
+    info = (ebml(b'\x2a\xd7\xb1', struct.pack('>L', 1000000)) +
+            ebml(b'\x44\x89', struct.pack('>d', 61500.0)))
+    video = (ebml(b'\xb0', struct.pack('>H', 1280)) +
+             ebml(b'\xba', struct.pack('>H', 720)))
+    tracks = ebml(b'\xae', ebml(b'\xe0', video))
+    segment = (ebml(b'\x15\x49\xa9\x66', info) +
+               ebml(b'\x16\x54\xae\x6b', tracks) +
+               ebml(b'\x1f\x43\xb6\x75', b'\x00' * 16))
+    return (ebml(b'\x1a\x45\xdf\xa3', b'\x42\x82\x84webm') +
+            # Segment of unknown size, as written by live encoders.
+            b'\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff' + segment)
+
+
+@pytest.yield_fixture()
+def cleanup():
+    yield
+    for document in Document.objects.all():
+        document.delete()
+
+
+@pytest.mark.parametrize('data,expected', [
+    (mp3(), {'duration': 1.0, 'bitrate': 128000}),
+    (mp3(frames=100), {'duration': 100 * 1152 / 44100.0}),
+    (mp4(), {'duration': 90, 'width': 640, 'height': 360}),
+    (ogg(), {'duration': 10, 'width': 640, 'height': 360}),
+    (webm(), {'duration': 61.5, 'width': 1280, 'height': 720}),
+])
+def test_probe(tmpdir, data, expected):
+    path = tmpdir.join('media')
+    path.write(data, 'wb')
+    metadata = probe(str(path))
+    for key, value in expected.items():
+        assert round(metadata[key], 3) == round(value, 3)
+    assert metadata['bitrate']
+
+
+def test_probe_should_survive_broken_files(tmpdir):
+    path = tmpdir.join('broken.mp4')
+    path.write(mp4()[:30], 'wb')
+    assert probe(str(path)) == dict.fromkeys(('duration', 'width', 'height',
+                                              'bitrate'))
+    path.write('', 'wb')
+    assert probe(str(path))['duration'] is None
+
+
+def test_upload_should_probe_media(staffapp, cleanup):
+    form = staffapp.get(reverse('mediacenter:document_create')).forms[
+        'model_form']
+    form['title'] = 'my video'
+    form['summary'] = 'my video summary'
+    form['credits'] = 'my video credits'
+    form['original'] = Upload('video.mp4', mp4(), 'video/mp4')
+    response = form.submit().follow()
+    document = Document.objects.get()
+    assert document.duration == 90
+    assert (document.width, document.height) == (640, 360)
+    assert '1:30' in response.content
+    assert '640' in response.content
+
+
+def test_probedocuments_command(cleanup):
+    audio = DocumentFactory(kind=Document.AUDIO, original__data=mp3(),
+                            original__filename='song.mp3')
+    DocumentFactory(kind=Document.PDF)
+    stdout = StringIO()
+    call_command('probedocuments', workers=1, stdout=stdout)
+    assert '1 documents read, 1 with a duration.' in stdout.getvalue()
+    assert Document.objects.get(pk=audio.pk).duration == 1.0
+    stdout = StringIO()
+    call_command('probedocuments', workers=1, stdout=stdout)
+    assert '0 documents read' in stdout.getvalue()
+
+
+def test_ingest_should_probe_media(tmpdir, cleanup):
+    tmpdir.join('lesson.webm').write(webm(), 'wb')
+    ingest(str(tmpdir), workers=1)
+    document = Document.objects.get()
+    assert document.duration == 61.5
+    assert document.width == 1280
+
+
+def test_index_can_filter_and_sort_by_length(app, cleanup):
+    DocumentFactory(title='Short', kind=Document.VIDEO, duration=60)
+    DocumentFactory(title='Medium', kind=Document.VIDEO, duration=600)
+    DocumentFactory(title='Long', kind=Document.AUDIO, duration=3600)
+    DocumentFactory(title='Unknown', kind=Document.PDF)
+    response = app.get(reverse('mediacenter:index'), {'length': 'medium'})
+    assert 'Medium' in response.content
+    assert 'Short' not in response.content
+    assert 'Long' not in response.content
+    response = app.get(reverse('mediacenter:index'), {'sort': '-duration'})
+    titles = [d.title for d in response.context['document_list']]
+    assert titles == ['Long', 'Medium', 'Short']
+    assert '1:00:00' in response.content
+    response = app.get(reverse('mediacenter:index'),
+                       {'sort': 'duration', 'kind': Document.VIDEO})
+    titles = [d.title for d in response.context['document_list']]
+    assert titles == ['Short', 'Medium']
+
+
+@pytest.mark.parametrize('seconds,expected', [
+    (None, ''),
+    (0, '0:00'),
+    (59.6, '1:00'),
+    (754, '12:34'),
+    (3600 * 2 + 5, '2:00:05'),
+])
+def test_duration_filter(seconds, expected):
+    assert duration(seconds) == expected
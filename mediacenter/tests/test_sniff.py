@@ -0,0 +1,87 @@
+from StringIO import StringIO
+
+import pytest
+from webtest import Upload
+
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+
+from ..models import Document, document_storage
+from ..sniff import sniff, sniff_stored
+from .factories import DocumentFactory
+
+MP4 = b'\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom'
+# Two MPEG 1 layer III frames of 417 bytes (128kbps at 44.1kHz).
+MP3_FRAMES = (b'\xff\xfb\x90\x64' + b'\x00' * 413) * 2
+OGG_VORBIS = b'OggS\x00\x02' + b'\x00' * 22 + b'\x01vorbis'
+
+
+@pytest.mark.parametrize('head,expected', [
+    (b'\xff\xd8\xff\xe0\x00\x10JFIF', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n\x00\x00', 'image/png'),
+    (b'GIF89a\x01\x00', 'image/gif'),
+    (b'RIFF\x00\x00\x00\x00WEBPVP8 ', 'image/webp'),
+    (b'%PDF-1.4\n', 'application/pdf'),
+    (b'ID3\x03\x00', 'audio/mpeg'),
+    (MP3_FRAMES, 'audio/mpeg'),
+    (MP3_FRAMES[:417], None),
+    (u'Hello'.encode('utf-16'), None),
+    (u'Hello'.encode('utf-16-be'), None),
+    (b'RIFF\x00\x00\x00\x00WAVEfmt ', 'audio/wav'),
+    (OGG_VORBIS, 'audio/ogg'),
+    (b'OggS\x00\x02' + b'\x00' * 22 + b'\x80theora', 'video/ogg'),
+    (MP4, 'video/mp4'),
+    (b'\x00\x00\x00\x20ftypM4A \x00\x00\x00\x00', 'audio/mp4'),
+    (b'\x1a\x45\xdf\xa3\x9f\x42\x86\x81\x01\x42\x82\x84webm', 'video/webm'),
+    (b'RIFF\x00\x00\x00\x00AVI LIST', 'video/x-msvideo'),
+    (b'Some text', None),
+    (b'', None),
+])
+def test_sniff(head, expected):
+    assert sniff(head) == expected
+
+
+@pytest.mark.django_db
+def test_content_should_have_priority_over_content_type(staffapp):
+    form = staffapp.get(reverse('mediacenter:document_create')).forms[
+        'model_form']
+    form['title'] = 'my document title'
+    form['summary'] = 'my document summary'
+    form['credits'] = 'my document credits'
+    form['original'] = Upload('lesson.dat', MP4, 'application/octet-stream')
+    form.submit().follow()
+    document = Document.objects.get()
+    assert document.kind == Document.VIDEO
+    document.delete()
+
+
+@pytest.mark.django_db
+def test_sniffed_blob_should_be_cached(monkeypatch):
+    document = DocumentFactory(original__data=OGG_VORBIS)
+    name = document.original.name
+    assert sniff_stored(document_storage, name) == 'audio/ogg'
+
+    def fail(*args, **kwargs):
+        raise AssertionError('Should not be read again')
+
+    monkeypatch.setattr(document_storage, 'open', fail)
+    assert sniff_stored(document_storage, name) == 'audio/ogg'
+    monkeypatch.undo()
+    document.delete()
+
+
+@pytest.mark.django_db
+def test_sniffdocuments_should_change_misnamed_documents():
+    video = DocumentFactory(original__data=MP4, kind=Document.OTHER)
+    audio = DocumentFactory(original__data=OGG_VORBIS, kind=Document.OTHER)
+    unknown = DocumentFactory(original__data='?', kind=Document.OTHER)
+    stdout = StringIO()
+    call_command('sniffdocuments', dry_run=True, stdout=stdout)
+    assert '3 documents checked, 2 to change' in stdout.getvalue()
+    assert Document.objects.filter(kind=Document.OTHER).count() == 3
+    call_command('sniffdocuments', workers=2, batch=2, stdout=stdout)
+    assert Document.objects.get(pk=video.pk).kind == Document.VIDEO
+    assert Document.objects.get(pk=audio.pk).kind == Document.AUDIO
+    assert Document.objects.get(pk=unknown.pk).kind == Document.OTHER
+    for document in Document.objects.all():
+        document.delete()
@@ -0,0 +1,126 @@
+import hashlib
+import os
+from StringIO import StringIO
+
+import pytest
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+
+from ideasbox.mediagc import referenced_names
+
+from ..models import Blob, Document, document_storage
+from ..storage import UMASK
+from .factories import DocumentFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def blob_name(content, ext='.dat'):
+    digest = hashlib.sha256(content).hexdigest()
+    return 'mediacenter/document/{0}/{1}/{2}{3}'.format(
+        digest[:2], digest[2:4], digest, ext)
+
+
+@pytest.yield_fixture(autouse=True)
+def delete_blobs():
+    yield
+    for document in Document.objects.all():
+        document.delete()
+        # Left to cleanmedia otherwise.
+        if document_storage.exists(document.original.name):
+            document_storage.delete(document.original.name)
+
+
+def test_file_is_stored_under_its_digest():
+    name = document_storage.save('mediacenter/document/Lesson.PDF',
+                                 ContentFile('lesson'))
+    assert name == blob_name('lesson', '.pdf')
+    assert document_storage.open(name).read() == 'lesson'
+    document_storage.delete(name)
+
+
+def test_blob_mode_should_follow_the_umask(monkeypatch):
+    def umask(mask):
+        raise AssertionError('The umask of the process was changed.')
+    monkeypatch.setattr(os, 'umask', umask)
+    name = document_storage.save('mediacenter/document/lesson.pdf',
+                                 ContentFile('lesson'))
+    mode = os.stat(document_storage.path(name)).st_mode & 0o777
+    assert mode == 0o666 & ~UMASK
+    document_storage.delete(name)
+
+
+def test_same_content_should_be_stored_once():
+    first = DocumentFactory(original__data='same content')
+    second = DocumentFactory(original__data='same content')
+    assert first.original.name == second.original.name
+    assert first.original.name == blob_name('same content')
+    assert Blob.objects.get().refs == 2
+
+
+def test_blob_should_be_released_with_its_last_document():
+    first = DocumentFactory(original__data='same content')
+    second = DocumentFactory(original__data='same content')
+    name = first.original.name
+    first.delete()
+    assert Blob.objects.get().refs == 1
+    second.delete()
+    assert not Blob.objects.count()
+    # Left to cleanmedia.
+    assert document_storage.exists(name)
+    assert name not in referenced_names()
+    document_storage.delete(name)
+
+
+def test_blob_stored_again_should_be_young_again():
+    document = DocumentFactory(original__data='same content')
+    path = document_storage.path(document.original.name)
+    document.delete()
+    os.utime(path, (1, 1))
+    again = DocumentFactory(original__data='same content')
+    assert again.original.name == document.original.name
+    assert os.path.getmtime(path) > 1
+
+
+def test_replaced_original_should_be_released():
+    document = DocumentFactory(original__data='first version')
+    name = document.original.name
+    document.original = ContentFile('second version', name='lesson.dat')
+    document.save()
+    assert Blob.objects.get().name == blob_name('second version')
+    assert name not in referenced_names()
+    document_storage.delete(name)
+
+
+def test_ingest_should_move_file_to_its_blob():
+    name = document_storage.path('mediacenter/document/upload.mp4')
+    with open(name, 'wb') as f:
+        f.write('movie')
+    blob = document_storage.ingest('mediacenter/document/upload.mp4')
+    assert blob == blob_name('movie', '.mp4')
+    assert document_storage.open(blob).read() == 'movie'
+    assert not document_storage.exists('mediacenter/document/upload.mp4')
+    document_storage.delete(blob)
+
+
+def test_verify_should_detect_bit_rot():
+    document = DocumentFactory(original__data='content')
+    blob = Blob.objects.get()
+    assert blob.verify()
+    assert blob.verified_at
+    with open(document_storage.path(document.original.name), 'wb') as f:
+        f.write('c0ntent')
+    assert not blob.verify()
+    assert Blob.objects.get().corrupt
+
+
+def test_verifyblobs_should_stop_after_max_size():
+    DocumentFactory(original__data='a' * 1024 * 1024)
+    DocumentFactory(original__data='b' * 1024 * 1024)
+    stdout = StringIO()
+    call_command('verifyblobs', max_size=1, stdout=stdout)
+    assert stdout.getvalue().startswith('1 blobs verified')
+    assert Blob.objects.filter(verified_at__isnull=True).count() == 1
+    call_command('verifyblobs', stdout=stdout)
+    assert not Blob.objects.filter(verified_at__isnull=True).count()
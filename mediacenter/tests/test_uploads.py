@@ -0,0 +1,142 @@
+import hashlib
+import json
+import zlib
+from datetime import timedelta
+
+import pytest
+
+from django.core.files.storage import default_storage
+from django.core.urlresolvers import reverse
+from django.utils import timezone
+
+from ..models import Document, Upload
+from ..uploads import clear_expired, start_upload
+
+pytestmark = pytest.mark.django_db
+
+CONTENT = ''.join(chr(i % 256) for i in range(1000))
+
+
+@pytest.yield_fixture()
+def staffclient(client, staffuser):
+    client.login(username=staffuser.serial, password='password')
+    yield client
+    for upload in Upload.objects.all():
+        default_storage.delete(upload.name)
+    for document in Document.objects.all():
+        default_storage.delete(document.original.name)
+
+
+def create(client, size=len(CONTENT)):
+    response = client.post(reverse('mediacenter:upload_create'),
+                           {'filename': 'movie.mp4', 'size': size})
+    assert response.status_code == 201
+    return json.loads(response.content)
+
+
+def put(client, token, first, last, crc32=None):
+    chunk = CONTENT[first:last + 1]
+    if crc32 is None:
+        crc32 = '{0:08x}'.format(zlib.crc32(chunk) & 0xffffffff)
+    return client.put(
+        reverse('mediacenter:upload_detail', kwargs={'token': token}),
+        chunk, content_type='application/octet-stream',
+        HTTP_CONTENT_RANGE='bytes {0}-{1}/{2}'.format(first, last,
+                                                       len(CONTENT)),
+        HTTP_X_CHUNK_CRC32=crc32)
+
+
+def test_anonymous_cannot_start_upload(client):
+    response = client.post(reverse('mediacenter:upload_create'),
+                           {'filename': 'movie.mp4', 'size': 10})
+    assert response.status_code == 302
+    assert not Upload.objects.count()
+
+
+def test_upload_by_chunks(staffclient):
+    upload = create(staffclient)
+    assert upload['offset'] == 0
+    assert not upload['complete']
+    response = put(staffclient, upload['token'], 0, 399)
+    assert json.loads(response.content)['offset'] == 400
+    response = put(staffclient, upload['token'], 400, 999)
+    data = json.loads(response.content)
+    assert data['complete']
+    assert data['crc32'] == '{0:08x}'.format(zlib.crc32(CONTENT) & 0xffffffff)
+    with default_storage.open(data['name']) as f:
+        assert f.read() == CONTENT
+
+
+def test_upload_can_be_resumed_from_its_offset(staffclient):
+    token = create(staffclient)['token']
+    put(staffclient, token, 0, 499)
+    response = staffclient.get(reverse('mediacenter:upload_detail',
+                                       kwargs={'token': token}))
+    assert json.loads(response.content)['offset'] == 500
+
+
+def test_chunk_out_of_order_should_be_409(staffclient):
+    token = create(staffclient)['token']
+    response = put(staffclient, token, 500, 999)
+    assert response.status_code == 409
+    assert json.loads(response.content)['offset'] == 0
+
+
+def test_chunk_sent_again_should_be_ignored(staffclient):
+    token = create(staffclient)['token']
+    put(staffclient, token, 0, 499)
+    response = put(staffclient, token, 0, 499)
+    assert response.status_code == 200
+    assert json.loads(response.content)['offset'] == 500
+
+
+def test_chunk_with_bad_checksum_should_be_400(staffclient):
+    token = create(staffclient)['token']
+    response = put(staffclient, token, 0, 499, crc32='deadbeef')
+    assert response.status_code == 400
+    assert Upload.objects.get(token=token).offset == 0
+
+
+def test_chunk_beyond_the_end_should_be_400(staffclient):
+    token = create(staffclient, size=100)['token']
+    response = put(staffclient, token, 0, 499)
+    assert response.status_code == 400
+
+
+def test_document_can_be_created_from_upload(staffclient):
+    upload = create(staffclient)
+    put(staffclient, upload['token'], 0, 999)
+    response = staffclient.post(reverse('mediacenter:document_create'), {
+        'title': 'my movie', 'summary': 'summary', 'credits': 'credits',
+        'upload': upload['token'], 'lang': 'en', 'kind': 'other'})
+    assert response.status_code == 302
+    document = Document.objects.get()
+    digest = hashlib.sha256(CONTENT).hexdigest()
+    assert document.original.name == (
+        'mediacenter/document/{0}/{1}/{2}.mp4'.format(digest[:2], digest[2:4],
+                                                      digest))
+    assert document.original.read() == CONTENT
+    assert not default_storage.exists(upload['name'])
+    assert document.kind == Document.VIDEO
+    assert not Upload.objects.count()
+
+
+def test_document_cannot_be_created_from_incomplete_upload(staffclient):
+    upload = create(staffclient)
+    put(staffclient, upload['token'], 0, 499)
+    response = staffclient.post(reverse('mediacenter:document_create'), {
+        'title': 'my movie', 'summary': 'summary', 'credits': 'credits',
+        'upload': upload['token'], 'lang': 'en', 'kind': 'other'})
+    assert response.status_code == 200
+    assert not Document.objects.count()
+
+
+def test_clear_expired_should_remove_old_uploads(staffuser):
+    old = start_upload('old.mp4', 10)
+    new = start_upload('new.mp4', 10)
+    Upload.objects.filter(pk=old.pk).update(
+        modified_at=timezone.now() - timedelta(days=2))
+    clear_expired()
+    assert list(Upload.objects.all()) == [new]
+    assert not default_storage.exists(old.name)
+    default_storage.delete(new.name)
@@ -1,3 +1,7 @@
+import os
+import zipfile
+from StringIO import StringIO
+
 import pytest
 
 from django.core.urlresolvers import reverse
@@ -131,3 +135,93 @@ def test_uploading_without_content_type_should_be_ok(staffapp):
     form['original'] = Upload('audio.mp3', 'xxxxxx')
     form.submit().follow()
     assert Document.objects.count() == 1
+
+
+def test_everyone_can_download_a_selection(app):
+    first = DocumentFactory(title='Lesson', original__data='first',
+                            original__filename='lesson.txt')
+    second = DocumentFactory(title='Lesson', original__data='second',
+                             original__filename='lesson.txt')
+    DocumentFactory(title='Other')
+    form = app.get(reverse('mediacenter:index')).forms['selection']
+    for field in form.fields['pk']:
+        if field._value in (str(first.pk), str(second.pk)):
+            field.checked = True
+    response = form.submit()
+    assert response.content_type == 'application/zip'
+    archive = zipfile.ZipFile(StringIO(response.body))
+    assert sorted(archive.namelist()) == ['lesson-2.txt', 'lesson.txt']
+    assert sorted([archive.read('lesson.txt'),
+                   archive.read('lesson-2.txt')]) == ['first', 'second']
+    for document in Document.objects.all():
+        document.delete()
+
+
+def test_download_should_skip_missing_originals(app):
+    present = DocumentFactory(title='Present', original__data='here',
+                              original__filename='present.txt')
+    missing = DocumentFactory(title='Missing', original__data='gone',
+                              original__filename='missing.txt')
+    os.remove(missing.original.path)
+    response = app.get(reverse('mediacenter:download'),
+                       {'pk': [present.pk, missing.pk]})
+    archive = zipfile.ZipFile(StringIO(response.body))
+    assert archive.namelist() == ['present.txt']
+    assert archive.testzip() is None
+    for document in Document.objects.all():
+        document.delete()
+
+
+def test_download_of_nothing_should_be_404(app):
+    app.get(reverse('mediacenter:download') + '?pk=1234', status=404)
+
+
+def test_index_can_be_filtered_by_kind_and_lang(app):
+    DocumentFactory(title='French video', kind=Document.VIDEO, lang='fr')
+    DocumentFactory(title='English video', kind=Document.VIDEO, lang='en')
+    DocumentFactory(title='French sound', kind=Document.AUDIO, lang='fr')
+    url = reverse('mediacenter:index')
+    response = app.get(url + '?kind=video')
+    assert 'French video' in response.content
+    assert 'English video' in response.content
+    assert 'French sound' not in response.content
+    response = app.get(url + '?kind=video&lang=fr')
+    assert 'French video' in response.content
+    assert 'English video' not in response.content
+    response = app.get(url + '?kind=unknown')
+    assert 'French sound' in response.content
+
+
+def test_index_facets_should_count_documents(app):
+    DocumentFactory(kind=Document.VIDEO, lang='fr')
+    DocumentFactory(kind=Document.VIDEO, lang='en')
+    DocumentFactory(kind=Document.AUDIO, lang='fr')
+    response = app.get(reverse('mediacenter:index') + '?lang=fr')
+    facets = dict(response.context['facets'])
+    kinds = [(i['label'], i['count']) for i in facets['type']]
+    assert [(unicode(l), c) for l, c in kinds] == [
+        ('all', 2), ('sound', 1), ('video', 1)]
+    langs = facets['Language']
+    assert [(unicode(i['label']), i['count'], i['active'])
+            for i in langs] == [('all', 3, False), ('English', 1, False),
+                                (u'Fran\xe7ais', 2, True)]
+    # The kind filter is kept when choosing another language.
+    response = app.get(reverse('mediacenter:index') + '?kind=video&lang=fr')
+    langs = dict(response.context['facets'])['Language']
+    assert 'kind=video' in langs[1]['query']
+    assert 'lang=en' in langs[1]['query']
+
+
+def test_index_facets_should_follow_the_length(app):
+    DocumentFactory(kind=Document.VIDEO, lang='fr', duration=60)
+    DocumentFactory(kind=Document.VIDEO, lang='fr', duration=3600)
+    DocumentFactory(kind=Document.AUDIO, lang='en', duration=90)
+    DocumentFactory(kind=Document.PDF, lang='fr')
+    response = app.get(reverse('mediacenter:index'),
+                       {'length': 'short', 'lang': 'fr'})
+    facets = dict(response.context['facets'])
+    kinds = [(unicode(i['label']), i['count']) for i in facets['type']]
+    assert kinds == [('all', 1), ('video', 1)]
+    langs = [(unicode(i['label']), i['count']) for i in facets['Language']]
+    assert langs == [('all', 2), ('English', 1), (u'Fran\xe7ais', 1)]
+    assert len(response.context['document_list']) == 1
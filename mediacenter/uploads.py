@@ -0,0 +1,95 @@
+"""Chunked, resumable uploads of document originals.
+
+Big videos don't make it through a flaky Wi-Fi in one request. A client
+starts an upload with the name and size of the file, then sends its chunks
+in order, each with its CRC32; after an error, it asks for the offset
+reached and goes on from there. Chunks are written in place, in the file the
+document will use, so nothing is copied once the upload is complete. The
+CRC32 of the whole file is computed as chunks come, for the client to check.
+"""
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import Document, Upload
+
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    """The chunk does not start where the upload is."""
+
+
+def start_upload(filename, size, user=None):
+    """Create an upload of the `filename` file of `size` bytes, in the
+    directory of document originals."""
+    clear_expired()
+    if size < 0:
+        raise UploadError('Invalid size')
+    field = Document._meta.get_field('original')
+    # Saving an empty file reserves the name.
+    name = default_storage.save(field.generate_filename(None, filename),
+                                ContentFile(''))
+    return Upload.objects.create(name=name, size=size, user=user)
+
+
+def write_chunk(upload, first, stream, length, crc32=None):
+    """Write the `length` bytes of `stream` at `first` in the file of
+    `upload`, and return the upload. A chunk already received is ignored.
+    Raise OffsetMismatch if the chunk does not start at the offset of the
+    upload, and UploadError if it is invalid or its CRC32 is not `crc32`."""
+    if first != upload.offset:
+        if first + length <= upload.offset:
+            # Sent again, when the client missed our answer.
+            return upload
+        raise OffsetMismatch('Expected offset {0}'.format(upload.offset))
+    if length > settings.UPLOAD_CHUNK_MAX_SIZE:
+        raise UploadError('Chunk too big')
+    if first + length > upload.size:
+        raise UploadError('Chunk beyond the end of the file')
+    chunk_crc, total_crc = 0, upload.crc32
+    written = 0
+    with open(default_storage.path(upload.name), 'r+b') as f:
+        f.seek(first)
+        while written < length:
+            data = stream.read(min(BLOCK_SIZE, length - written))
+            if not data:
+                break
+            f.write(data)
+            chunk_crc = zlib.crc32(data, chunk_crc)
+            total_crc = zlib.crc32(data, total_crc) & 0xffffffff
+            written += len(data)
+    if written != length:
+        raise UploadError('Incomplete chunk')
+    if crc32 is not None and chunk_crc & 0xffffffff != crc32:
+        # The offset does not move: the chunk will be written again.
+        raise UploadError('Checksum mismatch')
+    # Another request may have written this chunk meanwhile.
+    updated = Upload.objects.filter(pk=upload.pk, offset=first).update(
+        offset=first + length, crc32=total_crc, modified_at=timezone.now())
+    if not updated:
+        raise OffsetMismatch('Concurrent chunk')
+    upload.offset, upload.crc32 = first + length, total_crc
+    return upload
+
+
+def finish_upload(upload):
+    """Forget the complete `upload`, now that a document uses its file."""
+    Upload.objects.filter(pk=upload.pk).delete()
+
+
+def clear_expired():
+    """Remove the uploads left unfinished for UPLOAD_TTL seconds, and their
+    files."""
+    limit = timezone.now() - timedelta(seconds=settings.UPLOAD_TTL)
+    for upload in Upload.objects.filter(modified_at__lt=limit):
+        default_storage.delete(upload.name)
+        upload.delete()
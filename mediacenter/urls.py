@@ -11,4 +11,9 @@ urlpatterns = [
     url(r'^document/(?P<pk>[\d]+)/delete/$', views.document_delete,
         name='document_delete'),
     url(r'^document/new/$', views.document_create, name='document_create'),
+    url(r'^download/$', views.download, name='download'),
+    url(r'^ingest/$', views.document_ingest, name='document_ingest'),
+    url(r'^upload/$', views.upload_create, name='upload_create'),
+    url(r'^upload/(?P<token>[0-9a-f]{32})/$', views.upload_detail,
+        name='upload_detail'),
 ]
@@ -1,17 +1,135 @@
+import json
+import os
+import re
+
 from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
 from django.core.urlresolvers import reverse_lazy
-from django.views.generic import (CreateView, DeleteView, DetailView, ListView,
-                                  UpdateView)
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.utils.text import slugify
+from django.utils.translation import ugettext_lazy as _
+from django.views.decorators.http import require_http_methods, require_POST
+from django.views.generic import (CreateView, DeleteView, DetailView,
+                                  FormView, ListView, UpdateView)
+
+from ideasbox.pagination import KeysetPaginationMixin, cached_group_counts
+from ideasbox.zipstream import stream_zip
+
+from . import uploads
+from .models import Document, Upload
+from .forms import DocumentForm, IngestForm
 
-from .models import Document
-from .forms import DocumentForm
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
 
 
-class Index(ListView):
+class Index(KeysetPaginationMixin, ListView):
     model = Document
     template_name = 'mediacenter/index.html'
     paginate_by = 10
+    # Filters of the documents, by query string parameter.
+    facets = (
+        ('kind', Document.TYPE_CHOICES),
+        ('lang', settings.LANGUAGES),
+    )
+    # Audio and video lengths, as ?length=.
+    lengths = (
+        ('short', _('less than 5 minutes'), {'duration__lt': 5 * 60}),
+        ('medium', _('5 to 20 minutes'), {'duration__gte': 5 * 60,
+                                          'duration__lt': 20 * 60}),
+        ('long', _('more than 20 minutes'), {'duration__gte': 20 * 60}),
+    )
+    # Orders, as ?sort=.
+    sorts = (
+        ('', _('newest')),
+        ('duration', _('shortest')),
+        ('-duration', _('longest')),
+    )
+
+    def get_filters(self):
+        filters = {}
+        for name, choices in self.facets:
+            value = self.request.GET.get(name)
+            if value in dict(choices):
+                filters[name] = value
+        return filters
+
+    def filter_others(self, queryset):
+        """Filter `queryset` by the parameters that are not facets."""
+        length = self.request.GET.get('length')
+        for value, label, lookups in self.lengths:
+            if value == length:
+                queryset = queryset.filter(**lookups)
+        sort = self.request.GET.get('sort')
+        if sort in dict(self.sorts) and sort:
+            # Cursors can't go through NULL values.
+            queryset = queryset.filter(duration__isnull=False)
+        return queryset
+
+    def get_queryset(self):
+        queryset = super(Index, self).get_queryset()
+        queryset = self.filter_others(queryset.filter(**self.get_filters()))
+        sort = self.request.GET.get('sort')
+        if sort in dict(self.sorts) and sort:
+            queryset = queryset.order_by(sort)
+        return queryset
+
+    def get_links(self, name, choices):
+        """Return the links to each of the `choices` of the `name`
+        parameter, keeping the others."""
+        params = self.request.GET.copy()
+        for key in ('page', 'after', 'before'):
+            params.pop(key, None)
+        current = params.get(name, '')
+        links = []
+        for value, label in choices:
+            if value:
+                params[name] = value
+            else:
+                params.pop(name, None)
+            links.append({'label': label, 'query': params.urlencode(),
+                          'active': value == current})
+        return links
+
+    def get_facets(self):
+        """Return, for each facet, its choices with the number of documents
+        matching them and the other filters, and their query strings."""
+        filters = self.get_filters()
+        names = [name for name, choices in self.facets]
+        counts = cached_group_counts(
+            self.filter_others(super(Index, self).get_queryset()), *names)
+        facets = []
+        for i, (name, choices) in enumerate(self.facets):
+            others = dict((k, v) for k, v in filters.items() if k != name)
+            by_value = {}
+            for values, count in counts:
+                if all(values[names.index(k)] == v
+                       for k, v in others.items()):
+                    by_value[values[i]] = by_value.get(values[i], 0) + count
+            params = self.request.GET.copy()
+            for key in ('page', 'after', 'before', name):
+                params.pop(key, None)
+            items = [{'label': _('all'), 'count': sum(by_value.values()),
+                      'query': params.urlencode(),
+                      'active': name not in filters}]
+            for value, label in choices:
+                if not by_value.get(value):
+                    continue
+                params[name] = value
+                items.append({'label': label, 'count': by_value[value],
+                              'query': params.urlencode(),
+                              'active': filters.get(name) == value})
+            facets.append((Document._meta.get_field(name).verbose_name,
+                           items))
+        return facets
+
+    def get_context_data(self, **kwargs):
+        context = super(Index, self).get_context_data(**kwargs)
+        context['facets'] = self.get_facets()
+        context['lengths'] = self.get_links('length', [('', _('all'))] + [
+            (value, label) for value, label, lookups in self.lengths])
+        context['sorts'] = self.get_links('sort', self.sorts)
+        return context
 index = Index.as_view()
 
 
@@ -39,3 +157,89 @@ class DocumentDelete(DeleteView):
     model = Document
     success_url = reverse_lazy('mediacenter:index')
 document_delete = staff_member_required(DocumentDelete.as_view())
+
+
+class DocumentIngest(FormView):
+    form_class = IngestForm
+    template_name = 'mediacenter/ingest.html'
+    initial = {
+        'lang': settings.LANGUAGE_CODE,
+    }
+
+    def form_valid(self, form):
+        job = form.save(user=self.request.user)
+        return redirect(job)
+document_ingest = staff_member_required(DocumentIngest.as_view())
+
+
+def download(request):
+    """Stream a ZIP archive of the documents selected by their `pk`."""
+    pks = [pk for pk in request.GET.getlist('pk') if pk.isdigit()]
+    documents = Document.objects.filter(pk__in=pks).order_by('title', 'pk')
+    entries = []
+    names = set()
+    for document in documents:
+        if not document.original:
+            continue
+        path = document.original.path
+        if not os.path.isfile(path):
+            # Failing once the response started would truncate the archive.
+            continue
+        base = slugify(document.title) or 'document'
+        ext = os.path.splitext(path)[1]
+        name, i = base + ext, 1
+        while name in names:
+            i += 1
+            name = u'{0}-{1}{2}'.format(base, i, ext)
+        names.add(name)
+        entries.append((name, path))
+    if not entries:
+        raise Http404()
+    response = StreamingHttpResponse(stream_zip(entries),
+                                     content_type='application/zip')
+    response['Content-Disposition'] = 'attachment; filename="documents.zip"'
+    return response
+
+
+def json_response(data, status=200):
+    return HttpResponse(json.dumps(data), status=status,
+                        content_type='application/json')
+
+
+@require_POST
+def upload_create(request):
+    """Start a chunked upload, of the `filename` file of `size` bytes."""
+    try:
+        upload = uploads.start_upload(request.POST['filename'],
+                                      int(request.POST['size']),
+                                      user=request.user)
+    except (KeyError, ValueError, uploads.UploadError) as e:
+        return json_response({'error': str(e)}, status=400)
+    return json_response(upload.as_dict(), status=201)
+upload_create = staff_member_required(upload_create)
+
+
+@require_http_methods(['GET', 'PUT'])
+def upload_detail(request, token):
+    """Return the state of an upload, or write the chunk PUT, as told by its
+    Content-Range and X-Chunk-CRC32 headers."""
+    upload = get_object_or_404(Upload, token=token)
+    if request.method == 'GET':
+        return json_response(upload.as_dict())
+    match = CONTENT_RANGE_RE.match(request.META.get('HTTP_CONTENT_RANGE', ''))
+    if not match or int(match.group(3)) != upload.size:
+        return json_response({'error': 'Invalid Content-Range'}, status=400)
+    first, last = int(match.group(1)), int(match.group(2))
+    crc32 = request.META.get('HTTP_X_CHUNK_CRC32')
+    try:
+        crc32 = int(crc32, 16) if crc32 else None
+        uploads.write_chunk(upload, first, request, last - first + 1,
+                            crc32=crc32)
+    except uploads.OffsetMismatch as e:
+        return json_response(dict(upload.as_dict(), error=str(e)),
+                             status=409)
+    except (ValueError, uploads.UploadError) as e:
+        return json_response(dict(upload.as_dict(), error=str(e)),
+                             status=400)
+    return json_response(upload.as_dict())
+upload_detail = staff_member_required(upload_detail)
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""Reproducible benchmark of the search app against synthetic corpora.
+
+The corpus is generated inside a transaction that is rolled back at the end,
+so the benchmark can be run against any database without leaving rows (nor
+index entries) behind.
+"""
+import bisect
+import math
+import random
+import struct
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from blog.models import Content
+from library.models import Book
+from mediacenter.models import Document
+
+from .models import Search
+from .utils import rank
+
+SCALES = [1000, 10000, 100000, 1000000]
+
+# Most frequent words of each language, completed with pseudo words built
+# from the syllables, so we get a realistic (zipfian) vocabulary.
+WORDS = {
+    'fr': (u"le la les de des un une et est dans pour sur avec par pas "
+           u"plus livre histoire enfant école maison eau village santé "
+           u"femme homme pays monde guerre paix musique terre jardin "
+           u"médecin lecture écriture mathématiques français roi reine "
+           u"nuit jour soleil lune marché travail famille frère sœur"),
+    'en': (u"the of and to in is for on with that by this book story "
+           u"child school house water village health woman man country "
+           u"world war peace music earth garden doctor reading writing "
+           u"mathematics english king queen night day sun moon market "
+           u"work family brother sister"),
+    'ar': (u"في من على إلى عن مع هذا التي الذي كتاب قصة طفل مدرسة بيت "
+           u"ماء قرية صحة امرأة رجل بلد عالم حرب سلام موسيقى أرض حديقة "
+           u"طبيب قراءة كتابة رياضيات ملك ملكة ليل نهار شمس قمر سوق عمل "
+           u"عائلة أخ أخت"),
+    'rn': (u"umwana amazi inzu ishure igitabo umugore umugabo igihugu "
+           u"isi intambara amahoro indirimbo umurima umuganga gusoma "
+           u"kwandika umwami umwamikazi ijoro umusi izuba ukwezi isoko "
+           u"akazi umuryango musaza mushiki ikinyugunyugu"),
+}
+SYLLABLES = {
+    'fr': u"ba be bi bo bu ca ce ci co cha che lo la le ma me mi mo mu "
+          u"na ne ni no pa pe pi po ra re ri ro ta te ti to tion ment eur",
+    'en': u"ba be bi bo ca ce co da de di do fa fe fi la le li lo ma me "
+          u"mi mo na ne ni no ra re ri ro ta te ti to ing er ly ness",
+    'ar': u"با بي بو تا تي تو سا سي سو كا كي كو لا لي لو ما مي مو نا "
+          u"ني نو را ري رو دا دي دو",
+    'rn': u"ba bi bu ga gi gu ka ki ku ma mi mu na ni nu nya nyi ra ri "
+          u"ru sa si su ta ti tu wa za zi zu",
+}
+PREFIXES = {
+    'fr': [u''],
+    'en': [u''],
+    'ar': [u'', u'ال'],
+    # Kirundi nouns and verbs carry a class prefix.
+    'rn': [u'umu', u'aba', u'iki', u'ibi', u'uku', u'ama', u'in', u'ku'],
+}
+LANGS = sorted(WORDS.keys())
+VOCABULARY_SIZE = 5000
+ZERO_HIT = u'zzqxjwv'
+
+
+class Language(object):
+    """Zipfian text generator for one language."""
+
+    def __init__(self, code, rng, size=VOCABULARY_SIZE):
+        self.code = code
+        self.rng = rng
+        words = WORDS[code].split()
+        syllables = SYLLABLES[code].split()
+        seen = set(words)
+        while len(words) < size:
+            word = rng.choice(PREFIXES[code]) + u''.join(
+                rng.choice(syllables) for i in range(rng.randint(2, 4)))
+            if word not in seen:
+                seen.add(word)
+                words.append(word)
+        self.words = words
+        total = 0.0
+        self.cumulative = []
+        for i in range(len(words)):
+            total += 1.0 / (i + 1)
+            self.cumulative.append(total)
+
+    def word(self):
+        index = bisect.bisect(self.cumulative,
+                              self.rng.random() * self.cumulative[-1])
+        return self.words[min(index, len(self.words) - 1)]
+
+    def text(self, length):
+        return u' '.join(self.word() for i in range(length))
+
+    def queries(self):
+        """Return the fixed query mix, as (kind, query) pairs."""
+        common, medium, rare = self.words[10], self.words[50], self.words[500]
+        return [
+            ('single', common),
+            ('single', rare),
+            ('phrase', u'"{0} {1}"'.format(common, medium)),
+            ('prefix', u'{0}*'.format(medium[:3])),
+            ('multi', u'{0} {1} {2}'.format(common, medium, rare)),
+            ('zero', ZERO_HIT),
+        ]
+
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of the given values."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = int(math.ceil(pct / 100.0 * len(values))) - 1
+    return values[max(0, min(index, len(values) - 1))]
+
+
+def index_size():
+    """Return the size in bytes of the FTS index, and of its content."""
+    cursor = connection.cursor()
+    cursor.execute("SELECT COALESCE(SUM(LENGTH(block)), 0) FROM idx_segments")
+    segments = cursor.fetchone()[0]
+    cursor.execute("SELECT COALESCE(SUM(LENGTH(c4text)), 0) FROM idx_content")
+    content = cursor.fetchone()[0]
+    return segments, content
+
+
+def next_id(model):
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return (last or 0) + 1
+
+
+class Corpus(object):
+    """Create a synthetic corpus of books, blog contents and documents, and
+    index it directly (bulk insertion does not send post_save)."""
+
+    BATCH = 500
+    # Share of each model in the corpus.
+    SHARES = ((Book, 0.5), (Content, 0.25), (Document, 0.25))
+
+    def __init__(self, size, langs=LANGS, seed=42):
+        self.size = size
+        self.rng = random.Random(seed)
+        self.langs = [Language(code, self.rng) for code in langs]
+
+    def make(self, model, pk, lang):
+        title = lang.text(self.rng.randint(2, 6))
+        summary = lang.text(self.rng.randint(20, 60))
+        if model is Book:
+            return Book(pk=pk, title=title, summary=summary,
+                        authors=lang.text(2), section=Book.OTHER,
+                        lang=lang.code)
+        elif model is Content:
+            return Content(pk=pk, title=title, summary=summary[:300],
+                           text=lang.text(self.rng.randint(100, 300)),
+                           author=self.author, published_at=timezone.now(),
+                           status=Content.PUBLISHED, lang=lang.code)
+        else:
+            return Document(pk=pk, title=title[:100], summary=summary,
+                            credits=lang.text(3), lang=lang.code,
+                            original='mediacenter/document/bench.pdf',
+                            kind=Document.PDF)
+
+    def create(self):
+        user_model = get_user_model()
+        self.author = (user_model.objects.first() or
+                       user_model.objects.create(serial='benchmark-author'))
+        cursor = connection.cursor()
+        sql = ("INSERT INTO idx (model, model_id, public, text) "
+               "VALUES (%s, %s, %s, %s)")
+        for model, share in self.SHARES:
+            count = int(self.size * share)
+            start = next_id(model)
+            for offset in range(0, count, self.BATCH):
+                batch = [self.make(model, start + offset + i,
+                                   self.rng.choice(self.langs))
+                         for i in range(min(self.BATCH, count - offset))]
+                model.objects.bulk_create(batch)
+                rows = [(model.__name__, inst.pk, inst.index_public,
+                         u" ".join([s for s in inst.index_strings if s]))
+                        for inst in batch]
+                cursor.executemany(sql, rows)
+
+
+def time_it(func, repeat):
+    durations = []
+    for i in range(repeat):
+        start = time.time()
+        func()
+        durations.append((time.time() - start) * 1000)
+    return durations
+
+
+def run_queries(langs, repeat=5, results=20):
+    """Run the query mix and return one report row per query."""
+    report = []
+
+    def first_results(query):
+        # The search view renders the results, so we consume them.
+        gen = Search.search(text__match=query)
+        return [obj for i, obj in zip(range(results), gen)]
+
+    for lang in langs:
+        for kind, query in lang.queries():
+            ranked = Search.objects.filter(text__match=query).count()
+            timings = {
+                'search': time_it(lambda: first_results(query), repeat),
+                'ids': time_it(lambda: list(Search.ids(text__match=query)),
+                               repeat),
+                'queryset': time_it(
+                    lambda: list(Book.objects.search(query)[:results]),
+                    repeat),
+            }
+            for target, durations in sorted(timings.items()):
+                report.append({
+                    'lang': lang.code,
+                    'kind': kind,
+                    'query': query,
+                    'target': target,
+                    'ranked': ranked,
+                    'p50': percentile(durations, 50),
+                    'p95': percentile(durations, 95),
+                })
+    return report
+
+
+def time_rank(repeat=1000):
+    """Time the python rank function alone, on a three terms matchinfo."""
+    values = [3, 5] + [1, 10, 5] * 15  # 3 phrases, 5 columns.
+    match_info = struct.pack('@' + 'I' * len(values), *values)
+    durations = time_it(lambda: rank(match_info), repeat)
+    return percentile(durations, 50), percentile(durations, 95)
+
+
+def run(scale, langs=LANGS, repeat=5, results=20, seed=42):
+    """Generate a corpus of `scale` rows, run the query mix against it and
+    roll everything back. Return a dict report."""
+    with transaction.atomic():
+        corpus = Corpus(scale, langs=langs, seed=seed)
+        start = time.time()
+        corpus.create()
+        build = time.time() - start
+        segments, content = index_size()
+        queries = run_queries(corpus.langs, repeat=repeat, results=results)
+        transaction.set_rollback(True)
+    return {
+        'scale': scale,
+        'build': build,
+        'index_segments': segments,
+        'index_content': content,
+        'queries': queries,
+        'rank': time_rank(),
+    }
@@ -0,0 +1,39 @@
+from django.utils.translation import ugettext as _
+
+from blog.models import Content
+from ideasbox.jobs import register
+from library.models import Book
+from mediacenter.models import Document
+
+from .models import RelatedItem
+from .utils import create_index_table
+
+MODELS = [Content, Book, Document]
+
+
+def reindex(progress=None, every=100):
+    """Rebuild the search index of all the searchable objects, and return
+    how many were indexed. `progress` is called with the number of objects
+    indexed and the total, every `every` objects."""
+    create_index_table()
+    total = sum(model.objects.count() for model in MODELS)
+    done = 0
+    for model in MODELS:
+        for inst in model.objects.all().iterator():
+            # Related items are computed at once when all is indexed.
+            inst.index(related=False)
+            done += 1
+            if progress and not done % every:
+                progress(done, total)
+    RelatedItem.build()
+    if progress:
+        progress(done, total)
+    return done
+
+
+@register('search.reindex')
+def reindex_all(job):
+    """Rebuild the search index."""
+    count = reindex(progress=lambda done, total: job.report(done=done,
+                                                            total=total))
+    return {'message': _('{count} items indexed.').format(count=count)}
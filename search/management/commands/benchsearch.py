@@ -0,0 +1,55 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from search import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the search on synthetic corpora. Everything is done in '
+            'a transaction that is rolled back.')
+    option_list = BaseCommand.option_list + (
+        make_option('--scale', action='append', type='int', dest='scales',
+                    help='Number of rows in the corpus; can be repeated. '
+                         'Default: {0}.'.format(benchmark.SCALES[:2])),
+        make_option('--lang', action='append', dest='langs',
+                    help='Language of the corpus; can be repeated. '
+                         'Default: {0}.'.format(benchmark.LANGS)),
+        make_option('--repeat', type='int', default=5,
+                    help='How many times each query is run.'),
+        make_option('--results', type='int', default=20,
+                    help='How many results are consumed for each query.'),
+        make_option('--seed', type='int', default=42),
+    )
+
+    def handle(self, *args, **options):
+        langs = options['langs'] or benchmark.LANGS
+        unknown = set(langs) - set(benchmark.LANGS)
+        if unknown:
+            raise CommandError('Unknown languages: {0}'.format(
+                ', '.join(unknown)))
+        for scale in options['scales'] or benchmark.SCALES[:2]:
+            report = benchmark.run(scale, langs=langs,
+                                   repeat=options['repeat'],
+                                   results=options['results'],
+                                   seed=options['seed'])
+            self.write_report(report)
+
+    def write_report(self, report):
+        self.stdout.write(
+            'Scale {scale}: corpus built in {build:.1f}s, index {segments} '
+            'bytes ({content} bytes of text)'.format(
+                scale=report['scale'], build=report['build'],
+                segments=report['index_segments'],
+                content=report['index_content']))
+        self.stdout.write('rank(): p50 {0:.4f}ms, p95 {1:.4f}ms'.format(
+            *report['rank']))
+        line = u'{lang:<4} {kind:<7} {target:<9} {ranked:>8} {p50:>9} {p95:>9}'
+        self.stdout.write(line.format(lang='lang', kind='kind',
+                                      target='target', ranked='ranked',
+                                      p50='p50 (ms)', p95='p95 (ms)'))
+        for row in report['queries']:
+            self.stdout.write(line.format(
+                lang=row['lang'], kind=row['kind'], target=row['target'],
+                ranked=row['ranked'], p50='{0:.2f}'.format(row['p50']),
+                p95='{0:.2f}'.format(row['p95'])))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from search.models import RelatedItem
+
+
+class Command(BaseCommand):
+    help = 'Recompute the "more like this" related items from the index'
+
+    def handle(self, *args, **kwargs):
+        RelatedItem.build()
+        self.stdout.write('Done building related items.')
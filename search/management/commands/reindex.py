@@ -1,19 +1,14 @@
 from django.core.management.base import BaseCommand
 
-
-from blog.models import Content
-from library.models import Book
-from search.utils import create_index_table
+from search.jobs import reindex
 
 
 class Command(BaseCommand):
     help = 'Reindex all the searchable objects'
 
     def handle(self, *args, **kwargs):
-        create_index_table()
-        models = [Content, Book]
-        for model in models:
-            self.stdout.write('Indexing {} content.'.format(model.__name__))
-            for inst in model.objects.all():
-                inst.index()
-        self.stdout.write('Done reindexing.')
+        count = reindex(progress=self.progress, every=1000)
+        self.stdout.write('Done reindexing {0} objects.'.format(count))
+
+    def progress(self, done, total):
+        self.stdout.write('Indexed {0} / {1}.'.format(done, total))
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import search.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Search',
+            fields=[
+                ('rowid', models.IntegerField(serialize=False, primary_key=True)),
+                ('model', models.CharField(max_length=64)),
+                ('model_id', models.IntegerField()),
+                ('public', models.BooleanField(default=True)),
+                ('text', search.models.SearchField()),
+            ],
+            options={
+                'db_table': 'idx',
+                'managed': False,
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='RelatedItem',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('model', models.CharField(max_length=64)),
+                ('model_id', models.IntegerField()),
+                ('related_model', models.CharField(max_length=64)),
+                ('related_id', models.IntegerField()),
+                ('score', models.FloatField()),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterIndexTogether(
+            name='relateditem',
+            index_together=set([('related_model', 'related_id'), ('model', 'model_id', 'score')]),
+        ),
+    ]
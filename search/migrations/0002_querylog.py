@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryLog',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('query', models.CharField(max_length=255, db_index=True)),
+                ('hits', models.PositiveIntegerField()),
+                ('duration', models.FloatField(db_index=True)),
+                ('scope', models.CharField(max_length=6, choices=[(b'public', b'public'), (b'all', b'all')])),
+                ('created_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+    ]
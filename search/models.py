@@ -1,9 +1,13 @@
-from django.db import models
+import heapq
+import math
+from collections import defaultdict
+
+from django.db import connection, models, transaction
 from django.db.backends.signals import connection_created
 from django.db.models.signals import class_prepared, post_save, pre_delete
 from django.dispatch import receiver
 
-from .utils import rank
+from .utils import distinctive_terms, rank, term_frequencies, tokenize
 
 
 class Match(models.Lookup):
@@ -52,10 +56,222 @@ class Search(models.Model):
         for row in qs:
             yield _SEARCHABLE[row.model].objects.get(pk=row.model_id)
 
+    @classmethod
+    def index_many(cls, instances):
+        """Index at once instances of the same model, eg. after a
+        bulk_create. Related items are not refreshed, see
+        RelatedItem.refresh_many."""
+        instances = [i for i in instances if i.is_indexable()]
+        if not instances:
+            return
+        model = instances[0].__class__.__name__
+        Search.objects.filter(model=model,
+                              model_id__in=[i.pk for i in instances]).delete()
+        Search.objects.bulk_create([
+            Search(model=model, model_id=i.pk, text=i.index_text,
+                   public=i.index_public) for i in instances])
+
+
+class RelatedItem(models.Model):
+    """Precomputed "more like this" links between indexed objects."""
+    model = models.CharField(max_length=64)
+    model_id = models.IntegerField()
+    related_model = models.CharField(max_length=64)
+    related_id = models.IntegerField()
+    score = models.FloatField()
+
+    # How many related items we keep for each object.
+    LIMIT = 5
+    # How many of the best matches of an object terms are compared to it when
+    # refreshing it.
+    CANDIDATES = 50
+    # Terms shared by more objects than this are too common to relate them.
+    MAX_POSTINGS = 1000
+    # Above this number of objects to refresh, rebuilding all is faster.
+    REBUILD_THRESHOLD = 100
+
+    class Meta:
+        index_together = [('model', 'model_id', 'score'),
+                          ('related_model', 'related_id')]
+
+    @classmethod
+    def models(cls):
+        return [name for name, model in _SEARCHABLE.items()
+                if model.index_related]
+
+    @classmethod
+    def items(cls, instance, limit=LIMIT):
+        """Return the objects related to instance, most similar first."""
+        rows = list(cls.objects.filter(
+            model=instance.__class__.__name__,
+            model_id=instance.pk).order_by('-score').values_list(
+            'related_model', 'related_id')[:limit])
+        ids = defaultdict(list)
+        for model, pk in rows:
+            ids[model].append(pk)
+        objects = {}
+        for model, pks in ids.items():
+            for pk, obj in _SEARCHABLE[model].objects.in_bulk(pks).items():
+                objects[(model, pk)] = obj
+        return [objects[key] for key in rows if key in objects]
+
+    @classmethod
+    def remove(cls, model, model_id):
+        cls.objects.filter(model=model, model_id=model_id).delete()
+        cls.objects.filter(related_model=model, related_id=model_id).delete()
+
+    @classmethod
+    def similar(cls, key, terms, postings):
+        """Return the (score, other) pairs of the objects most similar to the
+        object `key`, given its `terms` and the `postings` dict mapping terms
+        to lists of (other, weight)."""
+        scores = defaultdict(float)
+        for term, weight in terms:
+            others = postings.get(term, [])
+            if len(others) > cls.MAX_POSTINGS:
+                continue
+            for other, other_weight in others:
+                if other != key:
+                    scores[other] += weight * other_weight
+        return heapq.nlargest(cls.LIMIT,
+                              ((s, o) for o, s in scores.items()))
+
+    @classmethod
+    def refresh(cls, model, model_id, text, public=True):
+        """Incrementally refresh the related items of one object, and insert
+        it in the related items of its neighbours when it ranks high enough.
+
+        Candidates are the best matches of the object terms in the index, so
+        their terms are scored against up to date frequencies. Call `build`
+        to recompute everything."""
+        cls.remove(model, model_id)
+        if not public:
+            return
+        key = (model, model_id)
+        total = Search.objects.count()
+        frequencies = term_frequencies(set(tokenize(text)))
+        terms = distinctive_terms(text, frequencies, total)
+        if not terms:
+            return
+        query = u' OR '.join(t for t, w in terms)
+        candidates = Search.objects.filter(
+            text__match=query, model__in=cls.models(),
+            public=True).order_by_relevancy()[:cls.CANDIDATES]
+        texts = dict(((c.model, int(c.model_id)), c.text) for c in candidates)
+        texts.pop(key, None)
+        tokens = set(t for txt in texts.values() for t in tokenize(txt))
+        frequencies.update(term_frequencies(tokens - set(frequencies)))
+        postings = defaultdict(list)
+        for other, other_text in texts.items():
+            for term, weight in distinctive_terms(other_text, frequencies,
+                                                  total):
+                postings[term].append((other, weight))
+        for score, other in cls.similar(key, terms, postings):
+            cls.objects.create(model=model, model_id=model_id,
+                               related_model=other[0], related_id=other[1],
+                               score=score)
+            neighbours = cls.objects.filter(model=other[0],
+                                            model_id=other[1])
+            weakest = neighbours.order_by('score').first()
+            if weakest and neighbours.count() >= cls.LIMIT:
+                if weakest.score >= score:
+                    continue
+                weakest.delete()
+            cls.objects.create(model=other[0], model_id=other[1],
+                               related_model=model, related_id=model_id,
+                               score=score)
+
+    @classmethod
+    def refresh_many(cls, instances):
+        """Refresh the related items of many objects: one by one when they
+        are only a few, else by rebuilding everything."""
+        instances = [i for i in instances if i.index_related]
+        if len(instances) > cls.REBUILD_THRESHOLD:
+            cls.build()
+            return
+        for instance in instances:
+            cls.refresh(instance.__class__.__name__, instance.pk,
+                        instance.index_text, public=instance.index_public)
+
+    @classmethod
+    def build(cls, batch_size=1000):
+        """Recompute all the related items from the index vocabulary: select
+        the most distinctive terms of each object, then score the objects
+        sharing those terms through an inverted index."""
+        frequencies = term_frequencies()
+        total = Search.objects.count()
+        rows = Search.objects.filter(model__in=cls.models(), public=True)
+        items = {}
+        postings = defaultdict(list)
+        for model, model_id, text in rows.values_list(
+                'model', 'model_id', 'text').iterator():
+            key = (model, int(model_id))
+            items[key] = distinctive_terms(text, frequencies, total)
+            for term, weight in items[key]:
+                postings[term].append((key, weight))
+        with transaction.atomic():
+            cls.objects.all().delete()
+            batch = []
+            for key, terms in items.items():
+                for score, other in cls.similar(key, terms, postings):
+                    batch.append(cls(model=key[0], model_id=key[1],
+                                     related_model=other[0],
+                                     related_id=other[1], score=score))
+                if len(batch) >= batch_size:
+                    cls.objects.bulk_create(batch)
+                    batch = []
+            cls.objects.bulk_create(batch)
+
+
+class QueryLogQuerySet(models.QuerySet):
+    def zero_hit(self):
+        return self.filter(hits=0)
+
+    def top(self, limit=20):
+        """Return the most frequent queries, with their count."""
+        qs = self.values('query').annotate(count=models.Count('pk'),
+                                           hits=models.Max('hits'))
+        return qs.order_by('-count', 'query')[:limit]
+
+    def percentile(self, pct):
+        """Return the nearest-rank percentile of the duration, letting the
+        database do the sort."""
+        count = self.count()
+        if not count:
+            return None
+        index = max(int(math.ceil(pct / 100.0 * count)) - 1, 0)
+        durations = self.order_by('duration').values_list('duration',
+                                                          flat=True)
+        return durations[index]
+
+
+class QueryLog(models.Model):
+    """A search made by a user. Written by batches, see querylog.py."""
+    PUBLIC = 'public'
+    ALL = 'all'
+    SCOPES = (
+        (PUBLIC, 'public'),
+        (ALL, 'all'),
+    )
+
+    query = models.CharField(max_length=255, db_index=True)
+    hits = models.PositiveIntegerField()
+    duration = models.FloatField(db_index=True)  # In milliseconds.
+    scope = models.CharField(max_length=6, choices=SCOPES)
+    created_at = models.DateTimeField(db_index=True)
+
+    objects = QueryLogQuerySet.as_manager()
+
+    def __unicode__(self):
+        return self.query
+
 
 class SearchMixin(models.Model):
     """Inherit from this mixin to make your model searchable."""
 
+    # Set to True to compute "more like this" related items.
+    index_related = False
+
     class Meta:
         abstract = True
 
@@ -67,32 +283,56 @@ class SearchMixin(models.Model):
     def index_public(self):
         return True
 
+    @property
+    def index_text(self):
+        return u" ".join([s for s in self.index_strings if s])
+
     def is_indexable(self):
         return True
 
-    def index(self):
+    def index(self, related=True):
         if not self.is_indexable():
             return
-        text = u" ".join([s for s in self.index_strings if s])
+        text = self.index_text
         defaults = dict(text=text, public=self.index_public)
         Search.objects.update_or_create(
             model=self.__class__.__name__,
             model_id=self.pk,
             defaults=defaults
         )
+        if related and self.index_related:
+            RelatedItem.refresh(self.__class__.__name__, self.pk, text,
+                                public=self.index_public)
 
     def deindex(self):
         Search.objects.filter(
             model=self.__class__.__name__,
             model_id=self.pk).delete()
+        if self.index_related:
+            RelatedItem.remove(self.__class__.__name__, self.pk)
 
 
 class SearchableQuerySet(object):
     def search(self, query, **kwargs):
-        kwargs['text__match'] = query
+        """Return the objects matching query, most relevant first.
+
+        The index is joined to the model table, so the ranking and any slice
+        of the queryset are done in SQL: `Book.objects.search(q)[:20]` only
+        loads the 20 best books. Extra kwargs are equality filters on the
+        index columns, eg. `public=True`."""
         kwargs['model'] = self.model.__name__
-        ids = Search.ids(**kwargs)
-        return self.filter(pk__in=ids)
+        where = ['idx.model_id = {0}.{1}'.format(
+            connection.ops.quote_name(self.model._meta.db_table),
+            connection.ops.quote_name(self.model._meta.pk.column)),
+            'idx.text MATCH %s']
+        params = [query]
+        for name, value in sorted(kwargs.items()):
+            column = Search._meta.get_field(name).column
+            where.append('idx.{0} = %s'.format(column))
+            params.append(value)
+        qs = self.extra(select={'relevancy': 'rank(matchinfo(idx))'},
+                        tables=['idx'], where=where, params=params)
+        return qs.order_by('-relevancy')
 
 
 @receiver(post_save)
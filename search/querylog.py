@@ -0,0 +1,63 @@
+"""Buffered log of the searches.
+
+Searches are kept in a bounded in-memory ring buffer and written to the
+database by batches, so logging does not add a write to every search request.
+When the buffer is full, oldest entries are dropped.
+"""
+import atexit
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import QueryLog
+
+
+class QueryLogBuffer(object):
+
+    def __init__(self, size, batch, interval):
+        self.entries = deque(maxlen=size)
+        self.batch = batch
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.last_flush = time.time()
+
+    def record(self, query, hits, duration, scope):
+        entry = QueryLog(query=query.strip().lower()[:255], hits=hits,
+                         duration=duration, scope=scope,
+                         created_at=timezone.now())
+        with self.lock:
+            self.entries.append(entry)
+            due = (len(self.entries) >= self.batch
+                   or time.time() - self.last_flush >= self.interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            entries = list(self.entries)
+            self.entries.clear()
+            self.last_flush = time.time()
+        if entries:
+            QueryLog.objects.bulk_create(entries)
+        return len(entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+buffer = QueryLogBuffer(size=settings.SEARCH_LOG_BUFFER_SIZE,
+                        batch=settings.SEARCH_LOG_BATCH_SIZE,
+                        interval=settings.SEARCH_LOG_FLUSH_INTERVAL)
+
+
+@atexit.register
+def flush_on_exit():
+    try:
+        buffer.flush()
+    except Exception:
+        # Database may already be gone, nothing more we can do.
+        pass
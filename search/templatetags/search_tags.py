@@ -0,0 +1,11 @@
+from django import template
+
+from ..models import RelatedItem
+
+register = template.Library()
+
+
+@register.assignment_tag
+def related_items(instance, limit=RelatedItem.LIMIT):
+    """Return the objects related to instance, most similar first."""
+    return RelatedItem.items(instance, limit)
@@ -0,0 +1,10 @@
+import pytest
+
+from ..querylog import buffer
+
+
+@pytest.yield_fixture(autouse=True)
+def empty_querylog_buffer():
+    buffer.clear()
+    yield
+    buffer.clear()
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+from library.models import Book
+
+from .. import benchmark
+from ..models import Search
+
+pytestmark = pytest.mark.django_db
+
+
+def test_language_generates_reproducible_text():
+    first = benchmark.Language('rn', random.Random(1)).text(10)
+    second = benchmark.Language('rn', random.Random(1)).text(10)
+    assert first == second
+
+
+@pytest.mark.parametrize('values,pct,expected', [
+    [[], 50, 0.0],
+    [[3, 1, 2], 50, 2],
+    [range(1, 101), 95, 95],
+    [range(1, 101), 100, 100],
+])
+def test_percentile(values, pct, expected):
+    assert benchmark.percentile(values, pct) == expected
+
+
+def test_run_reports_every_query_and_rolls_back():
+    report = benchmark.run(40, langs=['fr', 'ar'], repeat=1)
+    assert report['scale'] == 40
+    assert report['index_segments'] > 0
+    # 2 languages * 6 queries * 3 targets.
+    assert len(report['queries']) == 36
+    zero_hits = [r for r in report['queries'] if r['kind'] == 'zero']
+    assert all(r['ranked'] == 0 for r in zero_hits)
+    assert any(r['ranked'] for r in report['queries'])
+    assert not Book.objects.count()
+    assert not Search.objects.count()
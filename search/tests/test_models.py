@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 import pytest
 
+from blog.models import Content
 from blog.tests.factories import ContentFactory
+from library.models import Book
+from library.tests.factories import BookFactory, BookSpecimenFactory
 from ..models import Search
 
 
@@ -37,3 +40,39 @@ def test_ids_only_returns_ids():
 def test_we_can_search_on_non_fts_fields_only():
     content = ContentFactory(title="music")
     assert content in Search.search(public=False)
+
+
+def test_searchable_queryset_search_orders_by_relevancy():
+    second = BookFactory(title="About music and music")
+    third = BookFactory(title="About music")
+    first = BookFactory(title="About music and music but also music")
+    BookFactory(title="About something else")
+    assert list(Book.objects.search("music")) == [first, second, third]
+
+
+def test_searchable_queryset_search_limits_in_sql():
+    for i in range(5):
+        BookFactory(title="music " * (i + 1))
+    qs = Book.objects.search("music")[:2]
+    assert 'LIMIT 2' in str(qs.query)
+    assert [b.title.count('music') for b in qs] == [5, 4]
+
+
+def test_searchable_queryset_search_only_returns_its_model():
+    ContentFactory(title="music")
+    book = BookFactory(title="music")
+    assert list(Book.objects.search("music")) == [book]
+
+
+def test_searchable_queryset_search_is_chainable():
+    BookSpecimenFactory(book__title="music one")
+    BookFactory(title="music two")
+    books = Book.objects.available().search("music")
+    assert [b.title for b in books] == ["music one"]
+    assert Book.objects.search("music").filter(title="music two").count() == 1
+
+
+def test_searchable_queryset_search_filters_index_columns():
+    ContentFactory(title="music", status=Content.DRAFT)
+    assert Content.objects.search("music").count() == 1
+    assert Content.objects.search("music", public=True).count() == 0
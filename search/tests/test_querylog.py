@@ -0,0 +1,61 @@
+import pytest
+
+from ..models import QueryLog
+from ..querylog import QueryLogBuffer
+
+pytestmark = pytest.mark.django_db
+
+
+def test_record_does_not_write_before_batch_is_full():
+    buffer = QueryLogBuffer(size=10, batch=3, interval=60)
+    buffer.record('music', 2, 1.5, QueryLog.PUBLIC)
+    buffer.record('music', 2, 1.5, QueryLog.PUBLIC)
+    assert not QueryLog.objects.count()
+    buffer.record('jazz', 0, 3.5, QueryLog.ALL)
+    assert QueryLog.objects.count() == 3
+    assert not buffer.entries
+
+
+def test_record_writes_when_interval_is_elapsed():
+    buffer = QueryLogBuffer(size=10, batch=3, interval=0)
+    buffer.record('music', 2, 1.5, QueryLog.PUBLIC)
+    assert QueryLog.objects.count() == 1
+
+
+def test_buffer_drops_oldest_entries_when_full():
+    buffer = QueryLogBuffer(size=2, batch=10, interval=60)
+    for query in ('first', 'second', 'third'):
+        buffer.record(query, 1, 1, QueryLog.PUBLIC)
+    assert buffer.flush() == 2
+    assert sorted(QueryLog.objects.values_list('query', flat=True)) == [
+        'second', 'third']
+
+
+def test_record_normalizes_query():
+    buffer = QueryLogBuffer(size=10, batch=10, interval=60)
+    buffer.record(' Music ', 1, 1, QueryLog.PUBLIC)
+    buffer.flush()
+    assert QueryLog.objects.get().query == 'music'
+
+
+def test_top_and_zero_hit():
+    buffer = QueryLogBuffer(size=10, batch=10, interval=60)
+    for query, hits in [('music', 3), ('music', 3), ('jazz', 0),
+                        ('ikinyugunyugu', 0), ('jazz', 0), ('jazz', 0)]:
+        buffer.record(query, hits, 1, QueryLog.PUBLIC)
+    buffer.flush()
+    top = [(r['query'], r['count']) for r in QueryLog.objects.top()]
+    assert top == [('jazz', 3), ('music', 2), ('ikinyugunyugu', 1)]
+    zero = [r['query'] for r in QueryLog.objects.zero_hit().top()]
+    assert zero == ['jazz', 'ikinyugunyugu']
+
+
+def test_percentile():
+    assert QueryLog.objects.percentile(50) is None
+    buffer = QueryLogBuffer(size=100, batch=100, interval=60)
+    for duration in range(1, 101):
+        buffer.record('music', 1, duration, QueryLog.PUBLIC)
+    buffer.flush()
+    assert QueryLog.objects.percentile(50) == 50
+    assert QueryLog.objects.percentile(95) == 95
+    assert QueryLog.objects.percentile(100) == 100
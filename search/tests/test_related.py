@@ -0,0 +1,85 @@
+import pytest
+
+from django.core.urlresolvers import reverse
+
+from blog.tests.factories import ContentFactory
+from library.tests.factories import BookFactory
+from mediacenter.tests.factories import DocumentFactory
+
+from ..models import RelatedItem
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def books():
+    return [
+        BookFactory(title='Jazz trumpet', summary='Louis Armstrong trumpet'),
+        BookFactory(title='Trumpet for jazz bands', summary='Armstrong'),
+        BookFactory(title='Gardening', summary='Tomatoes and potatoes'),
+        BookFactory(title='Vegetable garden', summary='Potatoes, tomatoes'),
+    ]
+
+
+def test_related_items_are_refreshed_on_index(books):
+    jazz, trumpet, gardening, garden = books
+    assert RelatedItem.items(jazz) == [trumpet]
+    assert RelatedItem.items(trumpet) == [jazz]
+    assert RelatedItem.items(gardening) == [garden]
+
+
+def test_related_items_mix_models(books):
+    jazz = books[0]
+    document = DocumentFactory(title='Armstrong jazz concert',
+                               summary='trumpet')
+    assert document in RelatedItem.items(jazz)
+    assert jazz in RelatedItem.items(document)
+
+
+def test_non_related_models_are_ignored(books):
+    ContentFactory(title='Jazz trumpet Armstrong')
+    assert len(RelatedItem.items(books[0])) == 1
+
+
+def test_deindex_removes_related_items(books):
+    jazz, trumpet = books[:2]
+    trumpet.delete()
+    assert RelatedItem.items(jazz) == []
+
+
+def test_build_computes_the_same_items(books):
+    jazz, trumpet, gardening, garden = books
+    before = list(RelatedItem.objects.order_by('pk').values_list(
+        'model_id', 'related_id'))
+    RelatedItem.objects.all().delete()
+    RelatedItem.build()
+    after = list(RelatedItem.objects.order_by('pk').values_list(
+        'model_id', 'related_id'))
+    assert sorted(before) == sorted(after)
+
+
+def test_items_are_limited(books, monkeypatch):
+    monkeypatch.setattr(RelatedItem, 'LIMIT', 1)
+    jazz = books[0]
+    BookFactory(title='Jazz trumpet Armstrong', summary='trumpet jazz')
+    assert len(RelatedItem.objects.filter(model_id=jazz.pk)) == 1
+
+
+def test_book_detail_shows_related_items(app, books):
+    jazz, trumpet = books[:2]
+    url = reverse('library:book_detail', kwargs={'pk': jazz.pk})
+    response = app.get(url)
+    assert response.pyquery.find('.related')
+    assert trumpet.title in response.content
+
+
+def test_document_detail_shows_related_items(app):
+    first = DocumentFactory(title='Armstrong jazz concert', summary='jazz',
+                            credits='Satchmo')
+    second = DocumentFactory(title='Armstrong trumpet', summary='jazz',
+                             credits='Satchmo')
+    DocumentFactory(title='Potatoes', summary='tomatoes', credits='Farm')
+    url = reverse('mediacenter:document_detail', kwargs={'pk': first.pk})
+    response = app.get(url)
+    assert second.title in response.content
+    assert 'Potatoes' not in response.content
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from ..utils import distinctive_terms, tokenize
+
+
+@pytest.mark.parametrize('given,expected', [
+    [u'Hello World', [u'hello', u'world']],
+    [u"l'École, 1789!", [u'l', u'École', u'1789']],
+    [u'النبي (كتاب)', [u'النبي', u'كتاب']],
+])
+def test_tokenize_behaves_like_fts_simple_tokenizer(given, expected):
+    assert tokenize(given) == expected
+
+
+def test_distinctive_terms_prefers_rare_terms():
+    frequencies = {'music': 50, 'jazz': 2, 'trumpet': 3}
+    terms = distinctive_terms(u'music jazz trumpet music', frequencies, 100)
+    assert [t for t, w in terms] == ['jazz', 'trumpet', 'music']
+
+
+def test_distinctive_terms_ignores_unique_terms():
+    frequencies = {'music': 100, 'jazz': 1}
+    terms = distinctive_terms(u'music jazz other', frequencies, 100)
+    assert [t for t, w in terms] == ['music']
+
+
+def test_distinctive_terms_are_limited():
+    frequencies = {'music': 50, 'jazz': 2, 'trumpet': 3}
+    terms = distinctive_terms(u'music jazz trumpet', frequencies, 100,
+                              limit=2)
+    assert [t for t, w in terms] == ['jazz', 'trumpet']
+
+
+def test_distinctive_terms_weights_are_normalized():
+    frequencies = {'music': 50, 'jazz': 2, 'trumpet': 3}
+    terms = distinctive_terms(u'music jazz trumpet', frequencies, 100)
+    assert round(sum(w * w for t, w in terms), 6) == 1
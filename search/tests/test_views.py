@@ -6,6 +6,9 @@ from blog.tests.factories import ContentFactory
 from blog.models import Content
 from library.tests.factories import BookFactory
 
+from .. import querylog
+from ..models import QueryLog
+
 pytestmark = pytest.mark.django_db
 
 
@@ -73,3 +76,37 @@ def test_search_view_should_return_mixed_content(app):
     page = form.submit()
     assert content.title in page.content
     assert book.title in page.content
+
+
+def test_search_view_logs_queries(app):
+    ContentFactory(title='test content', status=Content.PUBLISHED)
+    app.get(reverse('search:search'), {'q': 'test'})
+    app.get(reverse('search:search'), {'q': 'nothing'})
+    assert querylog.buffer.flush() == 2
+    logs = QueryLog.objects.order_by('pk')
+    assert [(l.query, l.hits, l.scope) for l in logs] == [
+        ('test', 1, QueryLog.PUBLIC), ('nothing', 0, QueryLog.PUBLIC)]
+
+
+def test_search_view_logs_staff_scope(staffapp):
+    staffapp.get(reverse('search:search'), {'q': 'test'})
+    querylog.buffer.flush()
+    assert QueryLog.objects.get().scope == QueryLog.ALL
+
+
+def test_anonymous_should_not_access_stats(app):
+    assert app.get(reverse('search:stats'), status=302)
+
+
+def test_non_staff_should_not_access_stats(loggedapp):
+    assert loggedapp.get(reverse('search:stats'), status=302)
+
+
+def test_stats_show_top_and_zero_hit_queries(staffapp):
+    ContentFactory(title='music', status=Content.PUBLISHED)
+    for query in ('music', 'music', 'ikinyugunyugu'):
+        staffapp.get(reverse('search:search'), {'q': query})
+    response = staffapp.get(reverse('search:stats'))
+    assert 'music' in response.pyquery.find('.top').text()
+    assert 'music' not in response.pyquery.find('.zero-hit').text()
+    assert 'ikinyugunyugu' in response.pyquery.find('.zero-hit').text()
@@ -4,4 +4,5 @@ from . import views
 
 urlpatterns = [
     url(r'^$', views.search, name='search'),
+    url(r'^stats/$', views.stats, name='stats'),
 ]
@@ -1,13 +1,72 @@
+# -*- coding: utf-8 -*-
+import heapq
+import math
+import re
+import string
 import struct
+from collections import Counter
 
 from django.db import connection
 
+# Position of the "text" column in the idx table.
+TEXT_COLUMN = 4
+# Same definition of a term as the FTS "simple" tokenizer: ASCII
+# alphanumerics and any non ASCII character.
+TERM = re.compile(u'[0-9A-Za-z\u0080-\uffff]+')
+ASCII_LOWERCASE = {ord(c): ord(c.lower()) for c in string.ascii_uppercase}
+
 
 def create_index_table():
     cursor = connection.cursor()
+    cursor.execute("DROP TABLE IF EXISTS idx_terms")
     cursor.execute("DROP TABLE IF EXISTS idx")
     cursor.execute("CREATE VIRTUAL TABLE idx using "
                    "FTS4(id, model, model_id, public, text)")
+    # Read only view on the idx vocabulary, with documents count by term.
+    cursor.execute("CREATE VIRTUAL TABLE idx_terms using fts4aux(idx)")
+
+
+def tokenize(text):
+    """Split text into terms, the way the FTS "simple" tokenizer does: only
+    ASCII chars are lowercased (so "École" stays "École")."""
+    return [t.translate(ASCII_LOWERCASE) for t in TERM.findall(text)]
+
+
+def term_frequencies(terms=None):
+    """Return a dict mapping terms to the number of indexed rows whose text
+    contains them. Return the whole vocabulary if `terms` is None."""
+    cursor = connection.cursor()
+    sql = "SELECT term, documents FROM idx_terms WHERE col = {0}".format(
+        TEXT_COLUMN)
+    if terms is None:
+        cursor.execute(sql)
+        return dict(cursor.fetchall())
+    terms = list(terms)
+    frequencies = {}
+    for i in range(0, len(terms), 500):  # SQLite limits variables count.
+        chunk = terms[i:i + 500]
+        cursor.execute('{0} AND term IN ({1})'.format(
+            sql, ', '.join(['%s'] * len(chunk))), chunk)
+        frequencies.update(cursor.fetchall())
+    return frequencies
+
+
+def distinctive_terms(text, frequencies, total, limit=10):
+    """Return the `limit` terms of `text` with the highest tf-idf, as a list
+    of (term, weight), with weights normalized to a unit vector.
+    `frequencies` maps terms to the number of rows containing them, out of
+    `total` rows."""
+    weights = []
+    for term, count in Counter(tokenize(text)).items():
+        documents = frequencies.get(term, 0)
+        # A term found in only one row can't relate it to another one.
+        if documents < 2:
+            continue
+        # Smoothed idf, so small indexes still get positive weights.
+        weights.append((count * math.log(1 + float(total) / documents), term))
+    weights = heapq.nlargest(limit, weights)
+    norm = math.sqrt(sum(w * w for w, t in weights))
+    return [(t, w / norm) for w, t in weights]
 
 
 def rank(match_info):
@@ -33,8 +92,8 @@ def rank(match_info):
     if not match_info:
         return score
     bufsize = len(match_info)  # length in bytes
-    match_info = [struct.unpack('@I', match_info[i:i+4])[0]
-                  for i in range(0, bufsize, 4)]
+    # Unpack all the 32 bits unsigned integers at once.
+    match_info = struct.unpack('@{0}I'.format(bufsize // 4), match_info)
     p, c = match_info[:2]
     for phrase_num in range(p):  # For earch word in the search query.
         phrase_info_idx = 2 + (phrase_num * c * 3)
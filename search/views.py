@@ -1,6 +1,10 @@
+import time
+
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
 
-from .models import Search
+from . import querylog
+from .models import QueryLog, Search
 
 
 def search(request):
@@ -8,11 +12,29 @@ def search(request):
     results = []
     if query:
         search_kwargs = {'text__match': query}
+        scope = QueryLog.ALL
         if not request.user.is_staff:
             search_kwargs['public'] = True
-        results = Search.search(**search_kwargs)
+            scope = QueryLog.PUBLIC
+        start = time.time()
+        results = list(Search.search(**search_kwargs))
+        duration = (time.time() - start) * 1000
+        querylog.buffer.record(query, len(results), duration, scope)
     context = {
         'results': results,
         'q': query
     }
     return render(request, 'search/search.html', context)
+
+
+@staff_member_required
+def stats(request):
+    querylog.buffer.flush()  # Show up to date figures.
+    logs = QueryLog.objects.all()
+    context = {
+        'total': logs.count(),
+        'top': logs.top(),
+        'zero_hit': logs.zero_hit().top(),
+        'percentiles': [(pct, logs.percentile(pct)) for pct in (50, 95, 99)],
+    }
+    return render(request, 'search/stats.html', context)
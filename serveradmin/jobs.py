@@ -0,0 +1,16 @@
+from django.core.urlresolvers import reverse
+from django.utils.translation import ugettext as _
+
+from ideasbox.jobs import register
+
+from .backup import Backup
+
+
+@register('serveradmin.backup')
+def create_backup(job):
+    backup = Backup.create()
+    return {
+        'message': _('Succesfully created backup {filename}').format(
+            filename=backup.name),
+        'url': reverse('server:backup'),
+    }
@@ -1,5 +1,6 @@
 import os
 import zipfile
+from collections import Counter
 
 import pytest
 from webtest.forms import Upload
@@ -7,6 +8,9 @@ from webtest.forms import Upload
 from django.core.urlresolvers import reverse
 from django.core.files.base import ContentFile
 
+from ideasbox.http_client import Breaker, client
+from ideasbox.models import Job
+
 from ..backup import Backup
 from .test_backup import BACKUPS_ROOT, DATA_ROOT
 
@@ -17,6 +21,7 @@ pytestmark = pytest.mark.django_db
     ("services"),
     ("power"),
     ("backup"),
+    ("network"),
 ])
 def test_anonymous_user_should_not_access_server(app, page):
     response = app.get(reverse("server:" + page), status=302)
@@ -27,6 +32,7 @@ def test_anonymous_user_should_not_access_server(app, page):
     ("services"),
     ("power"),
     ("backup"),
+    ("network"),
 ])
 def test_normals_user_should_not_access_server(loggedapp, page):
     response = loggedapp.get(reverse("server:" + page), status=302)
@@ -74,7 +80,10 @@ def test_backup_button_should_save_a_new_backup(staffapp, monkeypatch,
     proof_file = os.path.join(settings.BACKUPED_ROOT, 'backup.me')
     open(proof_file, mode='w')
     form = staffapp.get(reverse('server:backup')).forms['backup']
-    form.submit('do_create')
+    response = form.submit('do_create')
+    job = Job.objects.get()
+    assert job.name == 'serveradmin.backup'
+    assert response.location.endswith(job.get_absolute_url())
     assert os.path.exists(filepath)
     assert zipfile.is_zipfile(filepath)
     archive = zipfile.ZipFile(filepath)
@@ -163,3 +172,15 @@ def test_upload_button_do_not_create_backup_with_bad_file_name(staffapp,
         resp = form.submit('do_upload')
         assert resp.status_code == 200
         assert not os.path.exists(backup_path)
+
+
+def test_staff_user_should_access_network(staffapp):
+    client.reset()
+    client.breakers['openlibrary.org'] = Breaker(1, 60)
+    client.counters['openlibrary.org'] = Counter(requests=3, failures=1)
+    client.breakers['openlibrary.org'].failure()
+    response = staffapp.get(reverse('server:network'))
+    row = response.pyquery('table.hosts tr').eq(1).text()
+    assert 'openlibrary.org' in row
+    assert 'open' in row
+    client.reset()
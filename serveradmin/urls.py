@@ -6,4 +6,5 @@ urlpatterns = [
     url(r'^power/$', views.power, name='power'),
     url(r'^services/$', views.services, name='services'),
     url(r'^backup/$', views.backup, name='backup'),
+    url(r'^network/$', views.network, name='network'),
 ]
@@ -4,9 +4,12 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
 from django.http import StreamingHttpResponse
-from django.shortcuts import render
+from django.shortcuts import redirect, render
 from django.utils.translation import ugettext as _
 
+from ideasbox.http_client import client
+from ideasbox.jobs import enqueue
+
 from .utils import call_service
 from .backup import Backup
 
@@ -52,11 +55,8 @@ def power(request):
 def backup(request):
     if request.POST:
         if 'do_create' in request.POST:
-            backup = Backup.create()
-            msg = _('Succesfully created backup {filename}').format(
-                filename=backup.name
-            )
-            messages.add_message(request, messages.SUCCESS, msg)
+            job = enqueue('serveradmin.backup', user=request.user)
+            return redirect(job)
         elif 'do_upload' in request.POST:
             if 'upload' in request.FILES:
                 file_ = request.FILES['upload']
@@ -97,3 +97,11 @@ def backup(request):
         'backups': Backup.list()
     }
     return render(request, 'serveradmin/backup.html', context)
+
+
+@staff_member_required
+def network(request):
+    context = {
+        'hosts': client.metrics(),
+    }
+    return render(request, 'serveradmin/network.html', context)